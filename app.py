@@ -1,64 +1,28 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from src.components.EmbeddingManager import EmbeddingManager
-from src.components.RagRetriever import RAGRetriever
-from src.components.VectorStore import VectorStore
-from langchain_groq import ChatGroq
-from pathlib import Path
-
-db_path = Path(__file__).resolve().parent / "data" / "vector_store"
 
-# Load environment variables
+# Load environment variables (before src.logger reads LOG_FORMAT/LOG_DIR)
 load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
-
-# Initialize once in session_state
-if "llm" not in st.session_state:
-    st.session_state.llm = ChatGroq(
-        groq_api_key=groq_api_key,
-        model_name="gemma2-9b-it",
-        temperature=0.1,
-        max_tokens=1024
-    )
-
-if "embedding_manager" not in st.session_state:
-    st.session_state.embedding_manager = EmbeddingManager()
-
-if "vectorstore" not in st.session_state:
-    # Use a safe path inside current directory for Streamlit Cloud
-    st.session_state.vectorstore = VectorStore(
-    collection_name="pdf_documents",
-    persist_directory=db_path
-    )
-
-#st.write(f"Persist directory: {db_path}")
-#st.write(f"Collection count: {st.session_state.vectorstore.collection.count()}")
 
-if "retriever" not in st.session_state:
-    st.session_state.retriever = RAGRetriever(
-        st.session_state.vectorstore,
-        st.session_state.embedding_manager
-    )
+import src.logger  # noqa: F401 - configures structured logging and request IDs
+from src.pipeline import rag_stream
+from src.instrumentation import metrics
+from src.resources import registry, register_default_resources
+from pathlib import Path
 
-# RAG helper
-def rag_simple(query, retriever, llm, top_k=3):
-    results = retriever.retrieve(query, top_k=top_k)
-    context = "\n\n".join([doc['content'] for doc in results]) if results else ""
-    
-    if not context:
-        return "No relevant context found to answer the question."
-    
-    prompt = f"""Use the following context to answer the question concisely.
-    Context:
-    {context}
+data_path = Path(__file__).resolve().parent / "data"
 
-    Question: {query}
+# The model, store and LLM client are built once per process and shared by every
+# browser session, instead of one copy per session in st.session_state
+register_default_resources(data_path)
+if "warm_up_started" not in st.session_state:
+    # Load the model and store in the background while the first page renders
+    registry.warm_up(["embedding_manager", "retriever", "llm"], background=True)
+    st.session_state.warm_up_started = True
 
-    Answer:"""
-    
-    response = llm.invoke([prompt])
-    return response.content
+#st.write(f"Data directory: {data_path}")
+#st.write(f"Collection count: {registry.get('vector_store').count()}")
 
 # ---------------- UI -----------------
 st.title("RAG Application 🔍")
@@ -95,14 +59,31 @@ st.sidebar.markdown(
 query = st.text_input("Enter your query:")
 
 if st.button("Search") and query.strip() != "":
-    with st.spinner("Retrieving relevant documents..."):
-        results = rag_simple(
-            query=query,
-            retriever=st.session_state.retriever,
-            llm=st.session_state.llm
-        )
+    timings = {}
+    st.markdown("### Results:")
+    # Tokens are rendered as they arrive instead of after the whole answer is generated
+    results = st.write_stream(rag_stream(
+        query=query,
+        retriever=registry.get("retriever"),
+        llm=registry.get("llm"),
+        cache=registry.get("answer_cache"),
+        timings=timings,
+        context_builder=registry.get("context_builder")
+    ))
     if results:
-        st.markdown("### Results:")
-        st.write(results)
+        st.caption(f"First token after {timings.get('ttft_s', 0.0):.2f}s · "
+                   f"total {timings.get('total_s', 0.0):.2f}s "
+                   f"(retrieval {timings.get('retrieval_s', 0.0):.2f}s) · "
+                   f"{registry.get('context_builder').stats()['tokens_saved']} prompt tokens saved so far")
     else:
         st.write("No relevant documents found for your query.")
+
+    # Prometheus textfile for a node_exporter style collector
+    if os.getenv("METRICS_EXPORT_PATH"):
+        metrics.export("prometheus", path=os.getenv("METRICS_EXPORT_PATH"))
+
+with st.sidebar.expander("Stage latency"):
+    histograms = metrics.snapshot()['histograms']
+    for name, histogram in sorted(histograms.items()):
+        st.caption(f"{name.removesuffix('_seconds')}: p50 {histogram['p50'] * 1000:.0f} ms · "
+                   f"p95 {histogram['p95'] * 1000:.0f} ms ({histogram['count']} calls)")
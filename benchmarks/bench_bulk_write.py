@@ -0,0 +1,89 @@
+"""
+Measure peak memory and rows/s of vector store bulk writes
+
+Writes --rows synthetic chunks (--dim float32 embeddings) into a fresh
+--backend store, each mode in its own interpreter so peak RSS is clean:
+    lists       the whole matrix as per-row Python lists in one upsert call
+                (what VectorStore.add_documents used to send to Chroma)
+    bulk        the whole matrix, as NumPy, through bulk_upsert (store-sized batches)
+    sequential  embed --embed-batch rows, write them, repeat
+    pipelined   embed the next batch while a BulkWriter thread writes the previous one
+A random projection stands in for the embedding model, so the run needs no
+model download. Peak memory is the growth of the process's maximum RSS
+over the IDs, texts and metadata, which every mode holds.
+Run from the repository root:
+    python -m benchmarks.bench_bulk_write --rows 100000 --backend faiss
+"""
+import json
+import argparse
+from pathlib import Path
+from benchmarks.bench_startup import run_snippet
+
+MODES = ("lists", "bulk", "sequential", "pipelined")
+
+WRITE_SNIPPET = """
+import json, time, shutil, resource, tempfile
+import numpy as np
+from src.components.BaseVectorStore import create_vector_store
+from src.components.BulkWriter import BulkWriter
+rows, dim, batch, mode = {rows}, {dim}, {embed_batch}, {mode!r}
+directory = tempfile.mkdtemp(prefix="bench_bulk_write_")
+store = create_vector_store({backend!r}, persist_directory=directory)
+ids = [f"chunk_{{i}}" for i in range(rows)]
+documents = [f"Synthetic chunk {{i}} of an annual report" for i in range(rows)]
+metadatas = [{{'source_file': f"Filing{{i % 50}}.pdf", 'page': i % 300}} for i in range(rows)]
+projection = np.random.default_rng(0).standard_normal((dim, dim), dtype=np.float32) / dim ** 0.5
+def embed(start, end):
+    features = np.random.default_rng(start).standard_normal((end - start, dim), dtype=np.float32)
+    return np.tanh(features @ projection)
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if mode == "lists":
+    store.upsert(ids, embed(0, rows).tolist(), documents, metadatas)
+elif mode == "bulk":
+    store.bulk_upsert(ids, embed(0, rows), documents, metadatas)
+elif mode == "sequential":
+    for first in range(0, rows, batch):
+        last = min(first + batch, rows)
+        store.bulk_upsert(ids[first:last], embed(first, last), documents[first:last], metadatas[first:last])
+else:
+    with BulkWriter(store, background=True) as writer:
+        for first in range(0, rows, batch):
+            last = min(first + batch, rows)
+            writer.write(ids[first:last], embed(first, last), documents[first:last], metadatas[first:last])
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+count = store.count()
+shutil.rmtree(directory, ignore_errors=True)
+print(json.dumps({{'seconds': elapsed, 'rows_per_s': rows / elapsed, 'peak_mb': (peak - baseline) / 1024,
+                  'count': count}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-batch", type=int, default=5000)
+    parser.add_argument("--backend", default="faiss", choices=("chroma", "faiss", "compressed"))
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {'rows': args.rows, 'dim': args.dim, 'backend': args.backend, 'runs': {}}
+    for mode in args.modes:
+        report['runs'][mode] = run_snippet(WRITE_SNIPPET.format(rows=args.rows, dim=args.dim, mode=mode,
+                                                                embed_batch=args.embed_batch, backend=args.backend))
+
+    print(f"\n{args.rows} rows, {args.dim}-d, {args.backend} backend "
+          f"(embedding matrix {args.rows * args.dim * 4 / 2 ** 20:.0f} MB)")
+    print(f"{'mode':<12}{'rows/s':>10}{'seconds':>10}{'peak MB':>10}{'stored':>10}")
+    for mode, run in report['runs'].items():
+        print(f"{mode:<12}{run['rows_per_s']:>10.0f}{run['seconds']:>10.2f}{run['peak_mb']:>10.0f}{run['count']:>10}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare Langchain's RecursiveCharacterTextSplitter with the offset-based SpanChunker
+
+Both split the same pages (--synthetic-pages generated pages, plus the
+pages of --pdf-dir if it holds PDFs) with the same separators, chunk size
+and overlap. For each the report shows the split time, the time to also
+read every chunk's text (what embedding does), the tracemalloc peak while
+splitting, and for the SpanChunker the share of chunks identical to
+Langchain's. With --model, the embedding model's tokenizer measures how many
+character chunks exceed its max sequence length (and get truncated) and the
+token-aware SpanChunker is timed as well.
+Run from the repository root:
+    python -m benchmarks.bench_chunking --synthetic-pages 2000
+"""
+import io
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+from pathlib import Path
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.bench_suite import synthetic_pages
+from src.components.SpanChunker import DEFAULT_SEPARATORS, SpanChunker
+from src.components.data_ingestion import DataIngestion
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def measure(split, pages) -> dict:
+    """Split time, split + text time and peak traced memory of one splitter"""
+    start = time.perf_counter()
+    chunks = list(split(pages))
+    split_s = time.perf_counter() - start
+    texts = [chunk.page_content for chunk in chunks]
+    total_s = time.perf_counter() - start
+
+    del chunks, texts
+    tracemalloc.start()
+    chunks = list(split(pages))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'chunks': len(chunks), 'split_s': split_s, 'split_and_text_s': total_s,
+            'pages_per_s': len(pages) / split_s if split_s > 0 else 0.0, 'peak_mb': peak / 1e6}, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", default=str(DATA_DIR / "pdf"))
+    parser.add_argument("--synthetic-pages", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--model", default=None,
+                        help="SentenceTransformer whose tokenizer checks and caps chunk lengths")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.synthetic_pages)
+    if any(Path(args.pdf_dir).glob("**/*.pdf")):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pages += DataIngestion().process_all_pdfs(args.pdf_dir)
+
+    langchain = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                               length_function=len, separators=list(DEFAULT_SEPARATORS),
+                                               add_start_index=True)
+    chunker = SpanChunker(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+    report = {'pages': len(pages), 'characters': sum(len(page.page_content) for page in pages), 'runs': {}}
+    report['runs']['langchain'], reference = measure(langchain.split_documents, pages)
+    report['runs']['span'], spans = measure(lambda docs: chunker.split_documents(docs), pages)
+    same_text = sum(left.page_content == right.page_content for left, right in zip(reference, spans))
+    same_start = sum(left.metadata['start_index'] == right.metadata['start_index']
+                     for left, right in zip(reference, spans))
+    report['agreement'] = {'identical_chunks': same_text / max(len(reference), 1),
+                           'identical_start_index': same_start / max(len(reference), 1)}
+
+    if args.model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.model, device="cpu")
+        token_chunker = SpanChunker.for_embedding_model(model, args.chunk_size, args.chunk_overlap)
+        report['runs']['span_token_aware'], token_spans = measure(lambda docs: token_chunker.split_documents(docs),
+                                                                  pages)
+
+        def truncated(chunks):
+            lengths = [len(ids) for ids in model.tokenizer([chunk.page_content for chunk in chunks],
+                                                           add_special_tokens=True, verbose=False)['input_ids']]
+            return sum(length > model.max_seq_length for length in lengths) / max(len(lengths), 1)
+
+        report['truncated_ratio'] = {'character': truncated(spans), 'token_aware': truncated(token_spans),
+                                     'max_seq_length': model.max_seq_length}
+
+    print(f"\n{report['pages']} pages, {report['characters'] / 1e6:.1f}M characters")
+    print(f"{'splitter':<18}{'chunks':>8}{'split s':>10}{'+text s':>10}{'pages/s':>10}{'peak MB':>10}")
+    for name, run in report['runs'].items():
+        print(f"{name:<18}{run['chunks']:>8}{run['split_s']:>10.3f}{run['split_and_text_s']:>10.3f}"
+              f"{run['pages_per_s']:>10.0f}{run['peak_mb']:>10.1f}")
+    print(f"\nIdentical to Langchain: chunks {report['agreement']['identical_chunks']:.3%}, "
+          f"start_index {report['agreement']['identical_start_index']:.3%}")
+    if 'truncated_ratio' in report:
+        ratios = report['truncated_ratio']
+        print(f"Chunks longer than {ratios['max_seq_length']} tokens: character {ratios['character']:.1%}, "
+              f"token-aware {ratios['token_aware']:.1%}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
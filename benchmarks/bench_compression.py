@@ -0,0 +1,82 @@
+"""
+Report memory saved and recall@k of the compressed vector store modes
+
+Uses the embedded chunks of data/pdf by default, or a synthetic clustered
+corpus with --synthetic N. Run from the repository root:
+    python -m benchmarks.bench_compression --synthetic 100000
+"""
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+from src.components.CompressedVectorStore import CompressedVectorStore
+
+PDF_DIR = Path(__file__).resolve().parent.parent / "data" / "pdf"
+
+
+def synthetic_embeddings(count: int, dim: int = 384, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, closer to real embeddings than isotropic noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(0, clusters, count)] + 0.6 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def corpus_embeddings(pdf_directory) -> np.ndarray:
+    """Embed the bundled PDF chunks"""
+    from src.components.data_ingestion import DataIngestion
+    from src.components.EmbeddingManager import EmbeddingManager
+
+    ingestion = DataIngestion()
+    chunks = ingestion.split_documents(ingestion.process_all_pdfs(pdf_directory))
+    return EmbeddingManager(bucketed=True).generate_embeddings([chunk.page_content for chunk in chunks])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of data/pdf")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=8)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    embeddings = synthetic_embeddings(args.synthetic) if args.synthetic else corpus_embeddings(PDF_DIR)
+    rng = np.random.default_rng(1)
+    picked = rng.choice(len(embeddings), min(args.queries, len(embeddings)), replace=False)
+    queries = embeddings[picked] + 0.1 * rng.normal(size=(len(picked), embeddings.shape[1])).astype(np.float32)
+
+    configs = [("int8", None), ("int8", embeddings.shape[1] // 3), ("binary", None)]
+    report = []
+    for mode, pca_dim in configs:
+        directory = tempfile.mkdtemp(prefix="compressed_bench_")
+        try:
+            store = CompressedVectorStore(directory, mode=mode, pca_dim=pca_dim,
+                                          rescore_factor=args.rescore_factor, fit_size=len(embeddings))
+            ids = [f"vec_{i}" for i in range(len(embeddings))]
+            store.add(ids, embeddings, [""] * len(ids), [{}] * len(ids))
+
+            start = time.perf_counter()
+            store.search(queries, args.top_k)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            result = {'mode': mode, 'pca_dim': pca_dim, 'latency_ms': latency_ms,
+                      f'recall@{args.top_k}': store.recall_at_k(queries, args.top_k)}
+            result.update(store.memory_report())
+            report.append(result)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n{'mode':<8}{'pca':>6}{'ratio':>8}{'MB saved':>10}{'recall':>8}{'ms/query':>10}")
+    for result in report:
+        print(f"{result['mode']:<8}{str(result['pca_dim'] or '-'):>6}{result['compression_ratio']:>8.1f}"
+              f"{result['bytes_saved'] / 2 ** 20:>10.1f}{result[f'recall@{args.top_k}']:>8.3f}{result['latency_ms']:>10.2f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
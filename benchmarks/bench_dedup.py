@@ -0,0 +1,239 @@
+"""
+Measure near-duplicate chunk elimination (NearDuplicateIndex) on synthetic filings
+
+Generates annual filings of --companies companies over --years years. Every
+filing repeats its company's --sections boilerplate sections (risk factors,
+controls, legal notes) with minor edits: the fiscal year, and figures
+changed in --edit-rate of the sentences; its --unique-pages pages are new
+each year. Pages are split with the ingestion chunker, then:
+    first run    all years but the last through a persisted index
+    incremental  the last year against the reloaded index, as a later ingest run
+    accuracy     the first --sample chunks through a fresh index, compared
+                 with the same greedy dedup on exact pairwise Jaccard similarity
+                 (a sparse matrix product over all pairs, timed as brute force)
+    filtered     up to --sample dropped chunks of the incremental run searched
+                 under a filter on their own filing (source_file, then company
+                 and year): how often the filter still admits the canonical
+                 chunk (alias_sources metadata) and BM25 ranks it first
+The report shows chunks before and after, index shrink, signature throughput
+in chunks/s, LSH versus brute-force time, precision/recall of the dropped
+chunks and the filtered coverage. Nothing is embedded, so the run needs no model download.
+Run from the repository root:
+    python -m benchmarks.bench_dedup --companies 8 --years 5
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from pathlib import Path
+from langchain_core.documents import Document
+from benchmarks.bench_retrieval import COMPANIES, TOPICS
+from benchmarks.bench_suite import quiet
+from src.components.BaseVectorStore import ALIAS_FIELD, ALIAS_SEPARATOR, matches_where, source_attributes
+from src.components.NearDuplicateIndex import NearDuplicateIndex
+from src.components.SparseIndex import BM25Index
+from src.components.data_ingestion import DataIngestion
+
+BOILERPLATE = ["may adversely affect our business", "could cause actual results to differ materially",
+               "is subject to risks and uncertainties", "was audited by the independent registered firm",
+               "is described in the notes to the consolidated statements", "remains subject to regulatory review"]
+
+
+def make_filings(companies: int, years: int, sections: int, unique_pages: int, edit_rate: float, seed: int):
+    """{year: [page Document]} of filings whose boilerplate repeats across years with minor edits"""
+    rng = np.random.default_rng(seed)
+    names = [f"{COMPANIES[i % len(COMPANIES)]}{i // len(COMPANIES) or ''}" for i in range(companies)]
+    templates = {name: [[f"{name}'s {TOPICS[int(rng.integers(len(TOPICS)))]} "
+                         f"{BOILERPLATE[int(rng.integers(len(BOILERPLATE)))]} ({rng.uniform(1, 90):.1f})."
+                         for _ in range(30)] for _ in range(sections)] for name in names}
+    filings = {}
+    for year in range(2020, 2020 + years):
+        pages = []
+        for name in names:
+            source_file = f"{name}{year}.pdf"
+            texts = []
+            for section in templates[name]:
+                sentences = list(section)
+                for position in np.flatnonzero(rng.random(len(sentences)) < edit_rate):
+                    sentences[position] = sentences[position].replace("(", f"({rng.uniform(1, 90):.1f}, was ")
+                texts.append(f"Fiscal year {year}. " + " ".join(sentences))
+            for _ in range(unique_pages):
+                texts.append(" ".join(f"{name} reported {TOPICS[int(rng.integers(len(TOPICS)))]} of "
+                                      f"${rng.uniform(1, 90):.1f} billion in fiscal {year}." for _ in range(24)))
+            pages.extend(Document(page_content=text, metadata={'source_file': source_file, 'page': page})
+                         for page, text in enumerate(texts))
+        filings[year] = pages
+    return filings
+
+
+def chunk_pages(pages, chunk_size: int, chunk_overlap: int):
+    """(ids, texts, sources) of the pages' chunks"""
+    chunks = list(DataIngestion().iter_chunks(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
+    ids = [f"{chunk.metadata['source_file']}:{chunk.metadata['page']}:{chunk.metadata['start_index']}"
+           for chunk in chunks]
+    return ids, [chunk.page_content for chunk in chunks], [chunk.metadata['source_file'] for chunk in chunks]
+
+
+def run_dedup(index: NearDuplicateIndex, ids, texts, sources, batch_size: int) -> dict:
+    """Feed chunks through the index in ingestion-sized batches"""
+    dropped, originals = [], []
+    start = time.perf_counter()
+    for first in range(0, len(ids), batch_size):
+        last = first + batch_size
+        canonical = index.deduplicate(ids[first:last], texts[first:last], sources[first:last])
+        for offset, original in enumerate(canonical):
+            if original is not None:
+                dropped.append(first + offset)
+                originals.append(original)
+    elapsed = time.perf_counter() - start
+    return {'chunks': len(ids), 'kept': len(ids) - len(dropped), 'dropped': len(dropped),
+            'shrink': len(dropped) / len(ids) if ids else 0.0, 'seconds': elapsed,
+            'chunks_per_s': len(ids) / elapsed if elapsed else 0.0, 'dropped_positions': dropped,
+            'canonical_ids': originals}
+
+
+def filtered_coverage(index: NearDuplicateIndex, chunk_sets, runs, sample: int) -> dict:
+    """Share of dropped chunks whose canonical chunk a filter on their own filing still finds"""
+    metadatas, kept_ids, kept_texts = {}, [], []
+    for (ids, texts, sources), run in zip(chunk_sets, runs):
+        dropped = set(run['dropped_positions'])
+        for position, (chunk_id, text, source) in enumerate(zip(ids, texts, sources)):
+            if position in dropped:
+                continue
+            metadata = {'source_file': source, **source_attributes(source)}
+            aliases = index.alias_sources(chunk_id)
+            if aliases:
+                metadata[ALIAS_FIELD] = ALIAS_SEPARATOR.join(aliases)
+            metadatas[chunk_id] = metadata
+            kept_ids.append(chunk_id)
+            kept_texts.append(text)
+    sparse_index = BM25Index()
+    sparse_index.add(kept_ids, kept_texts, [metadatas[chunk_id] for chunk_id in kept_ids])
+
+    (_, texts, sources), run = chunk_sets[-1], runs[-1]
+    pairs = list(zip(run['dropped_positions'], run['canonical_ids']))[:sample]
+    matched = ranked = 0
+    for position, original in pairs:
+        attributes = source_attributes(sources[position])
+        filters = [{'source_file': sources[position]}]
+        if attributes:
+            filters.append({'$and': [{key: value} for key, value in attributes.items()]})
+        matched += all(matches_where(metadatas[original], where) for where in filters)
+        top = [sparse_index.search([texts[position]], top_k=1, where=where)[0] for where in filters]
+        ranked += all(hits and hits[0][0] == original for hits in top)
+    return {'dropped': len(pairs), 'filter_admits': matched / len(pairs) if pairs else 1.0,
+            'bm25_top1': ranked / len(pairs) if pairs else 1.0}
+
+
+def exact_duplicates(index: NearDuplicateIndex, texts, threshold: float):
+    """Positions greedy dedup drops with exact Jaccard similarity of all pairs, and the time it took"""
+    start = time.perf_counter()
+    shingles = [index.shingles(text) for text in texts]
+    vocabulary, columns = np.unique(np.concatenate(shingles), return_inverse=True)
+    rows = np.repeat(np.arange(len(texts)), [len(row) for row in shingles])
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                           shape=(len(texts), len(vocabulary)))
+    intersection = (matrix @ matrix.T).toarray()
+    sizes = np.asarray([len(row) for row in shingles], dtype=np.float32)
+    jaccard = intersection / np.maximum(sizes[:, None] + sizes[None, :] - intersection, 1)
+    kept, dropped = [], set()
+    for position in range(len(texts)):
+        if kept and jaccard[position, kept].max() >= threshold:
+            dropped.add(position)
+        else:
+            kept.append(position)
+    return dropped, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=8)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=6, help="Boilerplate pages per filing")
+    parser.add_argument("--unique-pages", type=int, default=6, help="New pages per filing")
+    parser.add_argument("--edit-rate", type=float, default=0.05, help="Share of boilerplate sentences edited")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--sample", type=int, default=2000, help="Chunks compared against exact Jaccard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    filings = make_filings(args.companies, args.years, args.sections, args.unique_pages, args.edit_rate, args.seed)
+    last_year = max(filings)
+    with quiet():
+        earlier = chunk_pages([page for year, pages in filings.items() if year != last_year for page in pages],
+                              args.chunk_size, args.chunk_overlap)
+        latest = chunk_pages(filings[last_year], args.chunk_size, args.chunk_overlap)
+
+    directory = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        settings = dict(num_perm=args.num_perm, threshold=args.threshold)
+        index = NearDuplicateIndex(**settings)
+        start = time.perf_counter()
+        index.signatures(earlier[1])
+        signature_s = time.perf_counter() - start
+
+        index = NearDuplicateIndex(directory, **settings)
+        first = run_dedup(index, *earlier, args.batch_size)
+        index.persist()
+        start = time.perf_counter()
+        index = NearDuplicateIndex(directory, **settings)
+        load_s = time.perf_counter() - start
+        incremental = run_dedup(index, *latest, args.batch_size)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    filtered = filtered_coverage(index, [earlier, latest], [first, incremental], args.sample)
+
+    ids, texts, sources = (values[:args.sample] for values in earlier)
+    sample_index = NearDuplicateIndex(**settings)
+    sampled = run_dedup(sample_index, ids, texts, sources, args.batch_size)
+    truth, brute_force_s = exact_duplicates(sample_index, texts, args.threshold)
+    predicted = set(sampled['dropped_positions'])
+    hits = len(predicted & truth)
+
+    report = {
+        'filings': args.companies * args.years, 'threshold': args.threshold, 'num_perm': args.num_perm,
+        'bands': index.bands, 'rows_per_band': index.rows_per_band,
+        'signature_chunks_per_s': len(earlier[1]) / signature_s if signature_s else 0.0,
+        'load_s': load_s,
+        'runs': {name: {key: value for key, value in run.items() if key not in ('dropped_positions', 'canonical_ids')}
+                 for name, run in (('first run', first), ('incremental', incremental), ('sample', sampled))},
+        'accuracy': {'sample': len(texts), 'lsh_s': sampled['seconds'], 'brute_force_s': brute_force_s,
+                     'exact_dropped': len(truth),
+                     'precision': hits / len(predicted) if predicted else 1.0,
+                     'recall': hits / len(truth) if truth else 1.0},
+        'filtered': filtered,
+    }
+    total = first['chunks'] + incremental['chunks']
+    report['total'] = {'chunks': total, 'kept': first['kept'] + incremental['kept'],
+                       'shrink': (first['dropped'] + incremental['dropped']) / total if total else 0.0}
+
+    print(f"\n{report['filings']} filings, threshold {args.threshold}, {args.num_perm} permutations "
+          f"({index.bands} bands x {index.rows_per_band} rows), signatures at "
+          f"{report['signature_chunks_per_s']:.0f} chunks/s")
+    print(f"{'run':<13}{'chunks':>9}{'kept':>9}{'dropped':>9}{'shrink':>9}{'chunks/s':>10}")
+    for name, run in report['runs'].items():
+        print(f"{name:<13}{run['chunks']:>9}{run['kept']:>9}{run['dropped']:>9}{run['shrink']:>9.1%}"
+              f"{run['chunks_per_s']:>10.0f}")
+    print(f"{'total':<13}{total:>9}{report['total']['kept']:>9}{total - report['total']['kept']:>9}"
+          f"{report['total']['shrink']:>9.1%}")
+    accuracy = report['accuracy']
+    print(f"Index reloaded in {load_s * 1000:.0f} ms. On {accuracy['sample']} chunks: LSH {accuracy['lsh_s']:.2f}s "
+          f"vs exact pairwise {accuracy['brute_force_s']:.2f}s, precision {accuracy['precision']:.3f}, "
+          f"recall {accuracy['recall']:.3f} ({accuracy['exact_dropped']} exact duplicates)")
+    print(f"Filtered by their own filing, {filtered['dropped']} dropped chunks: the filter admits the canonical "
+          f"chunk for {filtered['filter_admits']:.1%}, BM25 ranks it first for {filtered['bm25_top1']:.1%}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
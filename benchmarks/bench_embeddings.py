@@ -0,0 +1,85 @@
+"""
+Compare embedding throughput and cosine drift of the encoding modes
+
+Run from the repository root:
+    python -m benchmarks.bench_embeddings --limit 2000
+"""
+import time
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+from src.components.data_ingestion import DataIngestion
+from src.components.EmbeddingManager import EmbeddingManager
+
+PDF_DIR = Path(__file__).resolve().parent.parent / "data" / "pdf"
+
+
+def load_chunk_texts(pdf_directory, limit=None):
+    """Load and split the bundled PDFs, returning chunk texts"""
+    ingestion = DataIngestion()
+    chunks = ingestion.split_documents(ingestion.process_all_pdfs(pdf_directory))
+    texts = [chunk.page_content for chunk in chunks]
+    return texts[:limit] if limit else texts
+
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    """Return mean/max (1 - cosine similarity) between matching rows"""
+    reference = reference.astype(np.float32)
+    candidate = candidate.astype(np.float32)
+    cosine = np.sum(reference * candidate, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12)
+    drift = 1.0 - cosine
+    return {'mean_drift': float(drift.mean()), 'max_drift': float(drift.max())}
+
+
+def run_mode(name, texts, **kwargs):
+    """Encode texts with one EmbeddingManager configuration"""
+    manager = EmbeddingManager(cache_size=0, **kwargs)
+    manager._encode(texts[:32])  # warm-up
+
+    start = time.perf_counter()
+    embeddings = manager.generate_embeddings(texts)
+    elapsed = time.perf_counter() - start
+    return embeddings, {'mode': name, 'seconds': elapsed, 'texts_per_s': len(texts) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", default=str(PDF_DIR))
+    parser.add_argument("--limit", type=int, default=None, help="Only embed the first N chunks")
+    parser.add_argument("--token-budget", type=int, default=16384)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    texts = load_chunk_texts(args.pdf_dir, args.limit)
+    print(f"Benchmarking {len(texts)} chunks")
+
+    modes = [
+        ("default", {}),
+        ("bucketed", {'bucketed': True, 'token_budget': args.token_budget}),
+        ("bucketed_fp16", {'bucketed': True, 'token_budget': args.token_budget, 'output_dtype': "float16"}),
+        ("bucketed_int8", {'bucketed': True, 'token_budget': args.token_budget, 'quantize': True}),
+    ]
+
+    reference = None
+    report = []
+    for name, kwargs in modes:
+        embeddings, result = run_mode(name, texts, **kwargs)
+        if reference is None:
+            reference = embeddings
+        result.update(cosine_drift(reference, embeddings))
+        result['speedup'] = result['texts_per_s'] / report[0]['texts_per_s'] if report else 1.0
+        report.append(result)
+
+    print(f"\n{'mode':<16}{'texts/s':>10}{'speedup':>10}{'mean drift':>14}{'max drift':>12}")
+    for result in report:
+        print(f"{result['mode']:<16}{result['texts_per_s']:>10.1f}{result['speedup']:>10.2f}"
+              f"{result['mean_drift']:>14.2e}{result['max_drift']:>12.2e}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'chunks': len(texts), 'results': report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
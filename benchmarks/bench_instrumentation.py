@@ -0,0 +1,59 @@
+"""
+Measure the per-span cost of the instrumentation layer, enabled and disabled
+
+A disabled registry hands out one shared no-op context manager, so an
+instrumented stage should cost about as much as an empty with block.
+Run from the repository root:
+    python -m benchmarks.bench_instrumentation --iterations 200000
+"""
+import time
+import json
+import argparse
+from pathlib import Path
+from src.instrumentation import Metrics
+
+
+def time_loop(body, iterations: int) -> float:
+    """Nanoseconds per iteration"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body()
+    return (time.perf_counter() - start) * 1e9 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    enabled, disabled = Metrics(enabled=True), Metrics(enabled=False)
+
+    def bare():
+        pass
+
+    def span_with(registry):
+        def body():
+            with registry.span("embed"):
+                pass
+        return body
+
+    baseline_ns = time_loop(bare, args.iterations)
+    report = {'call_ns': baseline_ns,
+              'disabled_span_ns': time_loop(span_with(disabled), args.iterations) - baseline_ns,
+              'enabled_span_ns': time_loop(span_with(enabled), args.iterations) - baseline_ns,
+              'disabled_increment_ns': time_loop(lambda: disabled.increment("queries_total"), args.iterations)
+              - baseline_ns,
+              'enabled_increment_ns': time_loop(lambda: enabled.increment("queries_total"), args.iterations)
+              - baseline_ns}
+
+    print(f"\n{'measurement':<24}{'ns':>10}")
+    for name, value in report.items():
+        print(f"{name:<24}{value:>10.1f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
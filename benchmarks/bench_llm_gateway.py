@@ -0,0 +1,184 @@
+"""
+Measure LLMGateway against a local stub chat completions server
+
+The stub speaks the OpenAI-compatible /chat/completions API (plain and
+streamed), answers after a log-normal delay around --latency-ms and
+enforces its own rate limit of --server-rate requests/s, answering 429 with
+a Retry-After header beyond it (plus --error-rate random 503s). --requests
+questions are sent from --clients threads; --duplicates of them repeat a
+handful of popular prompts, as when many users ask the same question.
+
+Two clients are compared:
+    direct    one blocking call per request: no retries, no dedup, no limits
+    gateway   LLMGateway with retries, single-flight, --max-in-flight and a
+              token bucket at --rate calls/s
+The report shows the share of requests answered, upstream calls, 429s,
+shared (single-flight) answers and client and upstream latency percentiles.
+Run from the repository root:
+    python -m benchmarks.bench_llm_gateway --requests 400 --clients 32
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.bench_suite import latency_summary, quiet
+from src.components.LLMGateway import LLMError, LLMGateway, TokenBucket
+
+
+class StubServer:
+    """Chat completions stub with simulated latency, a rate limit and random failures"""
+
+    def __init__(self, latency_ms: float, rate: float, error_rate: float, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'rate_limited': 0, 'failed': 0}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.counts['requests'] += 1
+                    delay = stub.rng.lognormvariate(0, 0.5) * stub.latency_ms / 1000
+                    fail = stub.rng.random() < stub.error_rate
+                if not stub.bucket.acquire(timeout=0):
+                    with stub.lock:
+                        stub.counts['rate_limited'] += 1
+                    return self._json(429, {'error': {'message': "Rate limit reached"}}, {'Retry-After': "0.2"})
+                time.sleep(delay)
+                if fail:
+                    with stub.lock:
+                        stub.counts['failed'] += 1
+                    return self._json(503, {'error': {'message': "Service unavailable"}})
+
+                answer = f"Answer to: {request['messages'][-1]['content'][:40]}"
+                if not request.get('stream'):
+                    return self._json(200, {'model': request['model'], 'usage': {'completion_tokens': 8},
+                                            'choices': [{'message': {'role': 'assistant', 'content': answer}}]})
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for word in answer.split(" "):
+                    chunk = {'choices': [{'delta': {'content': word + " "}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_load(gateway: LLMGateway, prompts, clients: int) -> dict:
+    """Send every prompt from clients threads; latency and failures per request"""
+    latencies, failures = [], {}
+
+    def send(prompt):
+        start = time.perf_counter()
+        try:
+            gateway.invoke([prompt])
+            latencies.append(time.perf_counter() - start)
+        except LLMError as e:
+            failures[type(e).__name__] = failures.get(type(e).__name__, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(send, prompts))
+    elapsed = time.perf_counter() - start
+    return {'answered': len(latencies) / len(prompts), 'failures': failures, 'elapsed_s': elapsed,
+            **latency_summary(latencies or [0.0])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Share of requests repeating popular prompts")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--server-rate", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=45)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    popular = [f"What was the revenue of company {i} in 2024?" for i in range(5)]
+    prompts = [popular[int(rng.integers(len(popular)))] if rng.random() < args.duplicates
+               else f"Summarise the risk factors of filing {i}." for i in range(args.requests)]
+
+    clients = {
+        'direct': dict(max_retries=0, single_flight=False, max_in_flight=args.clients),
+        'gateway': dict(max_retries=6, backoff_base=0.1, max_in_flight=args.max_in_flight, rate_per_s=args.rate),
+    }
+    report = {'requests': args.requests, 'clients': args.clients, 'runs': {}}
+    for name, settings in clients.items():
+        with StubServer(args.latency_ms, args.server_rate, args.error_rate) as stub, \
+                LLMGateway("stub-model", api_key="stub", base_url=stub.url, **settings) as gateway:
+            with quiet():
+                run = run_load(gateway, prompts, args.clients)
+                streamed = "".join(chunk.content for chunk in gateway.stream(["Stream this answer"]))
+            stats = gateway.stats()
+            run.update(upstream_calls=stub.counts['requests'], rate_limited=stub.counts['rate_limited'],
+                       shared=stats['shared'], retries=stats['retries'], streamed=bool(streamed.strip()),
+                       upstream_p50_ms=stats['upstream_p50_s'] * 1000, upstream_p95_ms=stats['upstream_p95_s'] * 1000,
+                       upstream_p99_ms=stats['upstream_p99_s'] * 1000)
+        report['runs'][name] = run
+
+    print(f"\n{args.requests} requests from {args.clients} clients, stub at {args.server_rate:.0f} req/s, "
+          f"{args.latency_ms:.0f} ms, {args.error_rate:.0%} errors")
+    print(f"{'client':<9}{'answered':>9}{'upstream':>10}{'429s':>7}{'shared':>8}{'retries':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'up p50':>8}{'up p95':>8}{'up p99':>8}")
+    for name, run in report['runs'].items():
+        print(f"{name:<9}{run['answered']:>9.1%}{run['upstream_calls']:>10}{run['rate_limited']:>7}{run['shared']:>8}"
+              f"{run['retries']:>9}{run['p50_ms']:>9.0f}{run['p95_ms']:>9.0f}{run['p99_ms']:>9.0f}"
+              f"{run['upstream_p50_ms']:>8.0f}{run['upstream_p95_ms']:>8.0f}{run['upstream_p99_ms']:>8.0f}")
+    for name, run in report['runs'].items():
+        if run['failures']:
+            print(f"{name} failures: {run['failures']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
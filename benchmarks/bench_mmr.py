@@ -0,0 +1,65 @@
+"""
+Measure the cost of the MMR diversification stage
+
+Candidates are near-duplicate groups (like neighbouring overlapping chunks)
+around a query; the report shows the per-query time of mmr_select and how
+many distinct groups end up in the top_k versus plain similarity ranking.
+Run from the repository root:
+    python -m benchmarks.bench_mmr --candidates 50 100 200 500
+"""
+import time
+import json
+import argparse
+import numpy as np
+from pathlib import Path
+from src.components.RagRetriever import mmr_select
+
+
+def near_duplicate_candidates(count: int, dim: int = 384, group_size: int = 4, seed: int = 0):
+    """Query plus candidates made of groups of near-identical vectors"""
+    rng = np.random.default_rng(seed)
+    query = rng.normal(size=dim).astype(np.float32)
+    centers = query + 1.5 * rng.normal(size=(-(-count // group_size), dim))
+    groups = np.repeat(np.arange(len(centers)), group_size)[:count]
+    candidates = (centers[groups] + 0.05 * rng.normal(size=(count, dim))).astype(np.float32)
+    return query, candidates, groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[50, 100, 200, 500])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = []
+    for count in args.candidates:
+        query, candidates, groups = near_duplicate_candidates(count)
+        mmr_select(query, candidates, args.top_k, args.lambda_mult)
+
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            selected = mmr_select(query, candidates, args.top_k, args.lambda_mult)
+            timings.append(time.perf_counter() - start)
+        timings = np.asarray(timings) * 1e6
+
+        plain = np.argsort(-(candidates @ query))[:args.top_k]
+        report.append({'candidates': count, 'top_k': args.top_k,
+                       'mean_us': float(timings.mean()), 'p99_us': float(np.percentile(timings, 99)),
+                       'distinct_groups_mmr': int(len(set(groups[selected]))),
+                       'distinct_groups_plain': int(len(set(groups[plain])))})
+
+    print(f"\n{'N':>6}{'mean us':>10}{'p99 us':>10}{'groups mmr':>12}{'groups plain':>14}")
+    for result in report:
+        print(f"{result['candidates']:>6}{result['mean_us']:>10.1f}{result['p99_us']:>10.1f}"
+              f"{result['distinct_groups_mmr']:>12}{result['distinct_groups_plain']:>14}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Compare whole-chunk retrieval with small-to-big (parent page) retrieval
+
+Indexes --pages synthetic annual-report pages three ways and runs the same
+--queries queries against each:
+    chunks    --chunk-size chunks with their text in the vector store (today's default)
+    small     --small-size chunks with their text in the vector store
+    parent    --small-size chunks without text, expanded to their page from a PageStore
+    window    as parent, returning a --parent-chars window of the page around the hits
+
+Every query is one sentence of a random page; a query counts as answered
+when a returned text contains that whole sentence. The report shows the
+records and bytes on disk of each index, the bytes of text returned per
+query, the page store reads per query and the retrieval latency. Embeddings
+come from a deterministic hashing embedder, so no model download is needed.
+Run from the repository root:
+    python -m benchmarks.bench_parent_retrieval --pages 2000 --backend compressed
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+from benchmarks.bench_suite import HashingEmbeddings, latency_summary, quiet, synthetic_pages
+from src.components.BaseVectorStore import create_vector_store
+from src.components.PageStore import PageStore
+from src.components.RagRetriever import RAGRetriever
+from src.components.data_ingestion import PARENT_METADATA_KEYS, DataIngestion
+
+
+def disk_bytes(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def build(directory: Path, backend: str, pages, embedder, chunk_size: int, page_store=None):
+    """Index the pages' chunks, without their text when a page store holds the pages"""
+    chunks = list(DataIngestion().iter_chunks(pages, chunk_size=chunk_size, chunk_overlap=chunk_size // 5))
+    store = create_vector_store(backend, persist_directory=str(directory / "store"))
+    for start in range(0, len(chunks), 2000):
+        batch = chunks[start:start + 2000]
+        store.add_documents(batch, embedder.generate_embeddings([chunk.page_content for chunk in batch]),
+                            store_text=page_store is None,
+                            metadata_keys=PARENT_METADATA_KEYS if page_store is not None else None)
+    store.persist()
+    if page_store is not None:
+        page_store.add_pages(pages)
+        page_store.persist()
+    return store
+
+
+def run_queries(retriever, queries, answers, top_k: int, page_store=None) -> dict:
+    latencies, payload, answered = [], 0, 0
+    reads = page_store.reads if page_store is not None else 0
+    for query, answer in zip(queries, answers):
+        start = time.perf_counter()
+        docs = retriever.retrieve(query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        payload += sum(len(doc['content'].encode('utf-8')) for doc in docs)
+        answered += any(answer in doc['content'] for doc in docs)
+    reads = (page_store.reads - reads) if page_store is not None else 0
+    return dict(latency_summary(latencies), payload_bytes_per_query=payload / len(queries),
+                page_reads_per_query=reads / len(queries), answered=answered / len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--small-size", type=int, default=300)
+    parser.add_argument("--parent-chars", type=int, default=1000)
+    parser.add_argument("--backend", default="compressed", choices=("faiss", "compressed"))
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    rng = np.random.default_rng(1)
+    answers = []
+    for index in rng.choice(len(pages), args.queries):
+        sentences = [s.strip().rstrip(".") for s in pages[index].page_content.split(". ") if s.strip()]
+        answers.append(sentences[int(rng.integers(len(sentences)))])
+    queries = [answer.split(",")[0] for answer in answers]
+    embedder = HashingEmbeddings(args.dim)
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_parent_retrieval_"))
+    report = {'pages': args.pages, 'queries': args.queries, 'top_k': args.top_k, 'runs': {}}
+    try:
+        variants = {'chunks': (args.chunk_size, False, None), 'small': (args.small_size, False, None),
+                    'parent': (args.small_size, True, None), 'window': (args.small_size, True, args.parent_chars)}
+        for name, (chunk_size, parent, parent_chars) in variants.items():
+            directory = work_dir / name
+            page_store = PageStore(str(directory / "pages")) if parent else None
+            with quiet():
+                store = build(directory, args.backend, pages, embedder, chunk_size, page_store)
+                retriever = RAGRetriever(store, embedder, page_store=page_store, parent_chars=parent_chars)
+                run = run_queries(retriever, queries, answers, args.top_k, page_store)
+            run.update(records=store.count(), store_bytes=disk_bytes(directory / "store"),
+                       page_store_bytes=disk_bytes(directory / "pages") if parent else 0)
+            report['runs'][name] = run
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{args.pages} pages, {args.queries} queries, top_k={args.top_k}, {args.backend} backend")
+    print(f"{'index':<8}{'records':>9}{'store MB':>10}{'pages MB':>10}{'bytes/query':>13}"
+          f"{'reads/query':>13}{'p50 ms':>9}{'p95 ms':>9}{'answered':>10}")
+    for name, run in report['runs'].items():
+        print(f"{name:<8}{run['records']:>9}{run['store_bytes'] / 1e6:>10.2f}{run['page_store_bytes'] / 1e6:>10.2f}"
+              f"{run['payload_bytes_per_query']:>13.0f}{run['page_reads_per_query']:>13.2f}"
+              f"{run['p50_ms']:>9.2f}{run['p95_ms']:>9.2f}{run['answered']:>10.1%}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
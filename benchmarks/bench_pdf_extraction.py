@@ -0,0 +1,85 @@
+"""
+Compare PDF extraction throughput and text equivalence of the backends
+
+Every backend extracts --pdf-dir in-process (one worker), then PyMuPDF runs
+again with page-level parallelism for each --workers count. Equivalence is
+checked page by page between pypdf and PyMuPDF: the share of pages whose
+text is identical after whitespace normalization, and the word overlap F1
+(insensitive to the two libraries' different reading order and spacing).
+Run from the repository root:
+    python -m benchmarks.bench_pdf_extraction --workers 2 4 8
+"""
+import os
+import re
+import time
+import json
+import argparse
+from collections import Counter
+from pathlib import Path
+from src.components.PdfExtractor import PdfExtractor
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def extract(pdf_files, backend: str, workers: int, pages_per_task: int):
+    """Pages and seconds for one full extraction"""
+    extractor = PdfExtractor(backend=backend, fallback=None, pages_per_task=pages_per_task, max_workers=workers)
+    start = time.perf_counter()
+    pages = list(extractor.iter_pages(pdf_files))
+    return pages, time.perf_counter() - start
+
+
+def word_f1(left: str, right: str) -> float:
+    left_words, right_words = Counter(re.findall(r"\w+", left.lower())), Counter(re.findall(r"\w+", right.lower()))
+    if not left_words and not right_words:
+        return 1.0
+    shared = sum((left_words & right_words).values())
+    return 2 * shared / (sum(left_words.values()) + sum(right_words.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf-dir", default=str(DATA_DIR / "pdf"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, os.cpu_count() or 1])
+    parser.add_argument("--pages-per-task", type=int, default=16)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    pdf_files = sorted(Path(args.pdf_dir).glob("**/*.pdf"))
+    size_mb = sum(path.stat().st_size for path in pdf_files) / 1e6
+
+    report, texts = {'files': len(pdf_files), 'mb': size_mb, 'runs': []}, {}
+    runs = [("pypdf", 1), ("pymupdf", 1)] + [("pymupdf", workers) for workers in sorted(set(args.workers))
+                                             if workers > 1]
+    for backend, workers in runs:
+        pages, seconds = extract(pdf_files, backend, workers, args.pages_per_task)
+        texts.setdefault(backend, {(page.metadata['source_file'], page.metadata['page']): page.page_content
+                                   for page in pages})
+        report['runs'].append({'backend': backend, 'workers': workers, 'pages': len(pages), 'seconds': seconds,
+                               'pages_per_s': len(pages) / seconds, 'mb_per_s': size_mb / seconds})
+
+    keys = sorted(set(texts["pypdf"]) | set(texts["pymupdf"]))
+    scores = [word_f1(texts["pypdf"].get(key, ""), texts["pymupdf"].get(key, "")) for key in keys]
+    identical = sum(" ".join(texts["pypdf"].get(key, "").split()) == " ".join(texts["pymupdf"].get(key, "").split())
+                    for key in keys)
+    report['equivalence'] = {'pages': len(keys), 'missing_pages': len(set(texts["pypdf"]) ^ set(texts["pymupdf"])),
+                             'identical_ratio': identical / len(keys) if keys else 1.0,
+                             'mean_word_f1': sum(scores) / len(scores) if scores else 1.0,
+                             'min_word_f1': min(scores, default=1.0),
+                             'pages_below_0.95': sum(score < 0.95 for score in scores)}
+
+    print(f"\n{len(pdf_files)} files, {size_mb:.1f} MB")
+    print(f"{'backend':<10}{'workers':>8}{'pages':>8}{'seconds':>10}{'pages/s':>10}{'MB/s':>8}")
+    for run in report['runs']:
+        print(f"{run['backend']:<10}{run['workers']:>8}{run['pages']:>8}{run['seconds']:>10.2f}"
+              f"{run['pages_per_s']:>10.1f}{run['mb_per_s']:>8.2f}")
+    print("\nEquivalence (pypdf vs pymupdf): " + ", ".join(f"{key} {value:.3f}" if isinstance(value, float)
+                                                         else f"{key} {value}"
+                                                         for key, value in report['equivalence'].items()))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Compare dense-only, BM25-only and hybrid (RRF) retrieval latency and recall
+
+The corpus is synthetic annual-report style chunks: many chunks per company
+and topic that differ only in exact terms (fiscal year, product code,
+dollar figure), and one question per chunk naming those terms. By default
+dense retrieval is simulated: query and chunk embeddings share their
+company/topic direction and only a weak chunk-specific component, so the
+exact terms barely register. That blindness is built in, so hybrid beating
+dense on simulated embeddings is a given: the default run is a plumbing
+and latency test only, not a quality comparison. Pass --real to embed the
+corpus with the real MiniLM model, and --pdf-dir to replace the synthetic
+corpus with the ingestion chunks of real filings, each picked chunk queried
+with a 12-word window of its own text (known-item search). Only --real
+numbers say whether hybrid retrieval should be turned on (RETRIEVAL_MODE).
+Run from the repository root:
+    python -m benchmarks.bench_retrieval --chunks 5000 --top-k 5
+    python -m benchmarks.bench_retrieval --real --pdf-dir data/pdf
+"""
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+from src.components.FaissVectorStore import FaissVectorStore
+from src.components.RagRetriever import RAGRetriever
+from src.components.SparseIndex import BM25Index
+
+COMPANIES = ["Apple", "Nvidia", "Microsoft", "Alphabet", "Amazon", "Meta", "Tesla", "Intel"]
+TOPICS = ["data center revenue", "gaming revenue", "services margin", "research and development expense",
+          "share repurchases", "supply chain commitments", "operating income", "cloud segment growth"]
+
+
+def synthetic_corpus(count: int, seed: int = 0):
+    """Chunks, one question per chunk, and the (company, topic) group of each chunk"""
+    rng = np.random.default_rng(seed)
+    texts, queries, groups = [], [], []
+    for i in range(count):
+        company = int(rng.integers(len(COMPANIES)))
+        topic = int(rng.integers(len(TOPICS)))
+        year = 2015 + int(rng.integers(10))
+        code = f"{'ABHGX'[int(rng.integers(5))]}{100 + i}"
+        figure = f"{rng.uniform(1, 90):.1f}"
+        texts.append(f"{COMPANIES[company]} reported {TOPICS[topic]} of ${figure} billion in fiscal {year}, "
+                     f"driven by the {code} product line and continued investment across the segment.")
+        queries.append(f"What {TOPICS[topic]} did {COMPANIES[company]} report for {code} in fiscal {year}?")
+        groups.append(company * len(TOPICS) + topic)
+    return texts, queries, np.asarray(groups)
+
+
+class SimulatedEmbeddings:
+    """Embeds texts by their (company, topic) group plus noise, nearly blind to exact terms"""
+
+    def __init__(self, texts, queries, groups, dim: int = 384, specific: float = 0.1, noise: float = 0.3,
+                 seed: int = 1):
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(groups.max() + 1, dim))
+        shared = centers[groups] + specific * rng.normal(size=(len(groups), dim))
+        self.vectors = {}
+        for text_list in (texts, queries):
+            noisy = shared + noise * rng.normal(size=(len(groups), dim))
+            self.vectors.update(zip(text_list, noisy.astype(np.float32)))
+
+    def generate_embeddings(self, texts):
+        return np.stack([self.vectors[text] for text in texts])
+
+
+def pdf_corpus(directory: str, count: int, chunk_size: int, chunk_overlap: int, seed: int = 2):
+    """Ingestion chunks of the PDFs, the positions of count picked chunks, and a query for each"""
+    from benchmarks.bench_suite import quiet
+    from src.components.data_ingestion import DataIngestion
+    ingestion = DataIngestion()
+    with quiet():
+        pages = ingestion.process_all_pdfs(directory)
+        texts = [chunk.page_content for chunk in ingestion.iter_chunks(pages, chunk_size=chunk_size,
+                                                                       chunk_overlap=chunk_overlap)]
+    if not texts:
+        raise ValueError(f"No PDF text found in {directory}")
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(texts), min(count, len(texts)), replace=False)
+    queries = []
+    for index in picked:
+        words = texts[index].split()
+        start = int(rng.integers(max(len(words) - 12, 1)))
+        queries.append(" ".join(words[start:start + 12]))
+    return texts, picked, queries
+
+
+def build_embedding_manager(real: bool, texts, queries, groups):
+    if not real:
+        return SimulatedEmbeddings(texts, queries, groups)
+    from src.components.EmbeddingManager import EmbeddingManager
+    return EmbeddingManager(bucketed=True)
+
+
+def evaluate(retriever, queries, ids, mode: str, top_k: int) -> dict:
+    """Recall@k and MRR of the chunk each question was written from, and per-query latency"""
+    latencies, hits, reciprocal_ranks = [], 0, 0.0
+    for query, relevant_id in zip(queries, ids):
+        start = time.perf_counter()
+        results = retriever.retrieve_batch([query], top_k=top_k, mode=mode)[0]
+        latencies.append(time.perf_counter() - start)
+
+        ranked = [doc['id'] for doc in results]
+        if relevant_id in ranked:
+            hits += 1
+            reciprocal_ranks += 1.0 / (ranked.index(relevant_id) + 1)
+
+    latencies = np.asarray(latencies) * 1000
+    return {'mode': mode, f'recall@{top_k}': hits / len(queries), 'mrr': reciprocal_ranks / len(queries),
+            'p50_ms': float(np.percentile(latencies, 50)), 'p95_ms': float(np.percentile(latencies, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--real", action="store_true", help="Embed the corpus with the real embedding model")
+    parser.add_argument("--pdf-dir", default=None, help="Use the chunks of these PDFs as the corpus (needs --real)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+    if args.pdf_dir and not args.real:
+        parser.error("--pdf-dir needs --real, simulated embeddings only exist for the synthetic corpus")
+
+    if args.pdf_dir:
+        texts, picked, queries = pdf_corpus(args.pdf_dir, args.queries, args.chunk_size, args.chunk_overlap)
+        embedding_manager = build_embedding_manager(True, texts, queries, None)
+    else:
+        texts, all_queries, groups = synthetic_corpus(args.chunks)
+        embedding_manager = build_embedding_manager(args.real, texts, all_queries, groups)
+        picked = np.random.default_rng(2).choice(len(texts), min(args.queries, len(texts)), replace=False)
+        queries = [all_queries[i] for i in picked]
+    ids = [f"chunk_{i}" for i in range(len(texts))]
+
+    directory = tempfile.mkdtemp(prefix="retrieval_bench_")
+    try:
+        store = FaissVectorStore(str(Path(directory) / "store"), index_type="flat")
+        store.add(ids, embedding_manager.generate_embeddings(texts), texts, [{} for _ in ids])
+
+        sparse_index = BM25Index(str(Path(directory) / "bm25"))
+        start = time.perf_counter()
+        sparse_index.add(ids, texts)
+        sparse_index.search(["warm up"])
+        index_seconds = time.perf_counter() - start
+
+        retriever = RAGRetriever(store, embedding_manager, sparse_index=sparse_index)
+        report = [evaluate(retriever, queries, [ids[i] for i in picked], mode, args.top_k)
+                  for mode in ("dense", "sparse", "hybrid")]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    corpus = f"chunks of {args.pdf_dir}" if args.pdf_dir else "synthetic chunks"
+    embeddings = "real" if args.real else "simulated"
+    print(f"\nBM25 index over {len(texts)} {corpus} built in {index_seconds:.2f}s, {embeddings} embeddings")
+    if not args.real:
+        print("Simulated embeddings ignore exact terms: plumbing and latency test only, not a quality comparison")
+    print(f"{'mode':<8}{'recall':>8}{'mrr':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for result in report:
+        print(f"{result['mode']:<8}{result[f'recall@{args.top_k}']:>8.3f}{result['mrr']:>8.3f}"
+              f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'corpus': corpus, 'embeddings': embeddings, 'index_seconds': index_seconds,
+                                                  'results': report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
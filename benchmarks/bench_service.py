@@ -0,0 +1,85 @@
+"""
+Measure AsyncRAGService throughput as client concurrency grows
+
+Offline by default: retrieval is simulated with a fixed per-call cost plus a
+small per-query cost (like one model forward pass and one store query), and
+the LLM is a FakeListChatModel with a fixed latency. Pass --real to retrieve
+from the configured vector store with the real embedding model instead.
+Run from the repository root:
+    python -m benchmarks.bench_service --concurrency 1 4 16 64
+"""
+import time
+import json
+import asyncio
+import argparse
+from pathlib import Path
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.components.RagService import AsyncRAGService
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+class SimulatedRetriever:
+    """retrieve_batch whose cost is dominated by a fixed per-call overhead"""
+
+    def __init__(self, call_overhead_s: float = 0.02, per_query_s: float = 0.001):
+        self.call_overhead_s = call_overhead_s
+        self.per_query_s = per_query_s
+
+    def retrieve_batch(self, queries, top_k=5, score_threshold=0.0, where=None):
+        time.sleep(self.call_overhead_s + self.per_query_s * len(queries))
+        return [[{'id': f"doc_{i}", 'content': f"context for {query}", 'metadata': {},
+                  'similarity_score': 1.0, 'distance': 0.0, 'rank': i + 1} for i in range(top_k)]
+                for query in queries]
+
+
+def build_retriever(real: bool):
+    if not real:
+        return SimulatedRetriever()
+    from src.components.BaseVectorStore import vector_store_from_env
+    from src.components.EmbeddingManager import EmbeddingManager
+    from src.components.RagRetriever import RAGRetriever
+    return RAGRetriever(vector_store_from_env(DATA_DIR), EmbeddingManager())
+
+
+async def run_level(retriever, concurrency: int, requests_per_client: int, llm_latency_s: float) -> dict:
+    """Run concurrency clients, each issuing requests back to back"""
+    llm = FakeListChatModel(responses=["stub answer"], sleep=llm_latency_s)
+    async with AsyncRAGService(retriever, llm, max_concurrent_llm=max(concurrency, 1)) as service:
+        async def client(client_id):
+            for i in range(requests_per_client):
+                await service.answer(f"question {client_id}-{i}", timeout=60)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c) for c in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        total = concurrency * requests_per_client
+        stats = service.stats()
+
+    return {'concurrency': concurrency, 'requests': total, 'seconds': elapsed,
+            'requests_per_s': total / elapsed, 'avg_batch_size': stats['avg_batch_size']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--requests-per-client", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call")
+    parser.add_argument("--real", action="store_true", help="Use the real embedding model and vector store")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    retriever = build_retriever(args.real)
+    report = [asyncio.run(run_level(retriever, level, args.requests_per_client, args.llm_latency))
+              for level in args.concurrency]
+
+    print(f"\n{'clients':>8}{'req/s':>10}{'avg batch':>11}")
+    for result in report:
+        print(f"{result['concurrency']:>8}{result['requests_per_s']:>10.1f}{result['avg_batch_size']:>11.1f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare filtered query latency of one store against a store sharded per filing
+
+Each synthetic filing contributes --chunks-per-filing vectors tagged with a
+source_file, company and year. Queries target one company and year, so the
+single store has to filter the whole corpus while the sharded store only
+searches the matching shard. Run from the repository root:
+    python -m benchmarks.bench_sharding --filings 10 50 200 --backend faiss
+"""
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+from src.components.BaseVectorStore import create_vector_store
+
+
+def synthetic_filings(filings: int, chunks_per_filing: int, dim: int = 384, seed: int = 0):
+    """Vectors and metadata for filings of filings // 10 + 1 companies over ten years"""
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(filings * chunks_per_filing, dim)).astype(np.float32)
+    metadatas = []
+    for filing in range(filings):
+        company, year = f"company{filing // 10}", 2015 + filing % 10
+        metadatas.extend({'source_file': f"Company{filing // 10}{year}.pdf", 'company': company, 'year': year}
+                         for _ in range(chunks_per_filing))
+    return embeddings, metadatas
+
+
+def time_queries(store, queries, where, top_k: int) -> float:
+    """Mean milliseconds per filtered query"""
+    store.search(queries[:1], top_k=top_k, where=where)
+    start = time.perf_counter()
+    for query in queries:
+        store.search(query.reshape(1, -1), top_k=top_k, where=where)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filings", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--chunks-per-filing", type=int, default=500)
+    parser.add_argument("--backend", default="faiss", help="Backend of the store and of every shard")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = []
+    for filings in args.filings:
+        embeddings, metadatas = synthetic_filings(filings, args.chunks_per_filing)
+        ids = [f"chunk_{i}" for i in range(len(embeddings))]
+        documents = [""] * len(ids)
+        queries = np.random.default_rng(1).normal(size=(args.queries, embeddings.shape[1])).astype(np.float32)
+        where = {"$and": [{"company": "company0"}, {"year": 2015}]}
+
+        directory = tempfile.mkdtemp(prefix="sharding_bench_")
+        try:
+            single = create_vector_store(args.backend, persist_directory=str(Path(directory) / "single"))
+            sharded = create_vector_store("sharded", persist_directory=str(Path(directory) / "sharded"),
+                                          shard_backend=args.backend)
+            for store in (single, sharded):
+                for start in range(0, len(ids), 5000):
+                    store.add(ids[start:start + 5000], embeddings[start:start + 5000],
+                              documents[start:start + 5000], metadatas[start:start + 5000])
+
+            report.append({'filings': filings, 'chunks': len(ids), 'shards_searched': len(sharded.route(where)),
+                           'single_ms': time_queries(single, queries, where, args.top_k),
+                           'sharded_ms': time_queries(sharded, queries, where, args.top_k),
+                           'unfiltered_sharded_ms': time_queries(sharded, queries, None, args.top_k)})
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"\n{'filings':>8}{'chunks':>9}{'shards':>8}{'single ms':>11}{'sharded ms':>12}{'all shards ms':>15}")
+    for result in report:
+        print(f"{result['filings']:>8}{result['chunks']:>9}{result['shards_searched']:>8}{result['single_ms']:>11.2f}"
+              f"{result['sharded_ms']:>12.2f}{result['unfiltered_sharded_ms']:>15.2f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
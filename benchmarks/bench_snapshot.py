@@ -0,0 +1,81 @@
+"""
+Measure cold start of a vector store from its own files versus from a snapshot
+
+Builds --docs random records in a --backend store, exports a snapshot, then
+opens each in a fresh interpreter and reports the time to open, the latency
+of the first query and the process RSS afterwards. The snapshot is opened
+with and without checksum verification.
+Run from the repository root:
+    python -m benchmarks.bench_snapshot --docs 100000 --backend faiss
+"""
+import json
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+from benchmarks.bench_startup import run_snippet
+from src.components.BaseVectorStore import create_vector_store
+from src.components.Snapshot import export_snapshot
+
+OPEN_SNIPPET = """
+import time, json, resource
+import numpy as np
+start = time.perf_counter()
+from src.components.BaseVectorStore import create_vector_store
+store = create_vector_store({backend!r}, persist_directory={directory!r}, **{kwargs!r})
+opened = time.perf_counter() - start
+query = np.random.default_rng(1).normal(size=(1, {dim})).astype(np.float32)
+start = time.perf_counter()
+store.search(query, top_k=5)
+first_query = time.perf_counter() - start
+rss = int(open("/proc/self/status").read().split("VmRSS:")[1].split()[0]) / 1024
+print(json.dumps({{'open_s': opened, 'first_query_s': first_query, 'rss_mb': rss}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--backend", default="faiss", choices=("faiss", "compressed"))
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_snapshot_"))
+    try:
+        rng = np.random.default_rng(0)
+        store = create_vector_store(args.backend, persist_directory=str(work_dir / "store"))
+        for start in range(0, args.docs, 10000):
+            count = min(10000, args.docs - start)
+            store.upsert([f"chunk_{start + i}" for i in range(count)],
+                         rng.normal(size=(count, args.dim)).astype(np.float32),
+                         [f"Synthetic chunk {start + i} " * 20 for i in range(count)],
+                         [{'source_file': f"Filing{(start + i) % 50}.pdf", 'page': (start + i) % 300}
+                          for i in range(count)])
+        store.persist()
+        export_snapshot(store, work_dir / "snapshot", "synthetic")
+
+        runs = {
+            args.backend: (args.backend, work_dir / "store", {}),
+            'snapshot': ("snapshot", work_dir / "snapshot", {'verify': True}),
+            'snapshot (no verify)': ("snapshot", work_dir / "snapshot", {'verify': False}),
+        }
+        report = {'docs': args.docs, 'dim': args.dim, 'runs': {}}
+        for name, (backend, directory, kwargs) in runs.items():
+            report['runs'][name] = run_snippet(OPEN_SNIPPET.format(backend=backend, directory=str(directory),
+                                                                   kwargs=kwargs, dim=args.dim))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{args.docs} records, {args.dim}-d")
+    print(f"{'store':<22}{'open s':>10}{'1st query s':>13}{'RSS MB':>10}")
+    for name, run in report['runs'].items():
+        print(f"{name:<22}{run['open_s']:>10.3f}{run['first_query_s']:>13.3f}{run['rss_mb']:>10.0f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
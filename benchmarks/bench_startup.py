@@ -0,0 +1,111 @@
+"""
+Measure import time and per-session memory of the query-side components
+
+Import times are taken in a fresh interpreter per module, so nothing is
+cached by earlier imports. The session test opens --sessions UI sessions in
+one process: "per-session" builds an embedding model and a vector store for
+every session (what keeping them in st.session_state did), "shared" gets
+them from the process-wide resource registry. The report shows RSS after
+each session and the time a new session waits before it can answer.
+Run from the repository root:
+    python -m benchmarks.bench_startup --sessions 4
+"""
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["src.pipeline", "src.resources", "src.components.RagRetriever", "src.components.SparseIndex",
+           "src.components.EmbeddingManager", "src.components.FaissVectorStore", "src.components.VectorStore"]
+
+IMPORT_SNIPPET = """
+import time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps(time.perf_counter() - start))
+"""
+
+SESSION_SNIPPET = """
+import os, json, time, resource
+from pathlib import Path
+
+def rss_mb():
+    try:
+        for line in open("/proc/self/status"):
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+report = {{'baseline_rss_mb': rss_mb(), 'sessions': []}}
+if {shared}:
+    from src.resources import registry, register_default_resources
+    register_default_resources(Path({data_dir!r}))
+for session in range({sessions}):
+    start = time.perf_counter()
+    if {shared}:
+        embedding_manager = registry.get("embedding_manager")
+        store = registry.get("vector_store")
+    else:
+        from src.components.EmbeddingManager import EmbeddingManager
+        from src.components.BaseVectorStore import vector_store_from_env
+        embedding_manager = EmbeddingManager()
+        store = vector_store_from_env(Path({data_dir!r}))
+        globals().setdefault('sessions', []).append((embedding_manager, store))
+    embedding_manager.generate_embeddings(["What was Apple's revenue in 2024?"])
+    report['sessions'].append({{'ready_s': time.perf_counter() - start, 'rss_mb': rss_mb()}})
+print(json.dumps(report))
+"""
+
+
+def run_snippet(code: str):
+    """Run code in a fresh interpreter from the repository root and parse its last output line as JSON"""
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters per module import (best kept)")
+    parser.add_argument("--data-dir", default=str(ROOT / "data"))
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {'imports': {}, 'sessions': {}}
+    for module in MODULES:
+        try:
+            report['imports'][module] = min(run_snippet(IMPORT_SNIPPET.format(module=module))
+                                            for _ in range(args.repeats))
+        except RuntimeError as e:
+            report['imports'][module] = None
+            print(f"Could not import {module}: {e}")
+
+    for mode, shared in (("per-session", False), ("shared", True)):
+        try:
+            report['sessions'][mode] = run_snippet(SESSION_SNIPPET.format(
+                shared=shared, sessions=args.sessions, data_dir=args.data_dir))
+        except RuntimeError as e:
+            print(f"Skipping the {mode} session test: {e}")
+
+    print(f"\n{'module':<36}{'import s':>10}")
+    for module, seconds in report['imports'].items():
+        print(f"{module:<36}{seconds:>10.3f}" if seconds is not None else f"{module:<36}{'n/a':>10}")
+
+    for mode, result in report['sessions'].items():
+        print(f"\n{mode}: interpreter RSS {result['baseline_rss_mb']:.0f} MB")
+        print(f"{'session':>8}{'ready s':>10}{'RSS MB':>10}")
+        for session, stats in enumerate(result['sessions'], start=1):
+            print(f"{session:>8}{stats['ready_s']:>10.2f}{stats['rss_mb']:>10.0f}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
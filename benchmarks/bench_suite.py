@@ -0,0 +1,387 @@
+"""
+Reproducible end-to-end performance suite: parse, split, embed, retrieve, RAG
+
+Stages (select with --stages):
+    parse     process_all_pdfs pages/s and MB/s on --pdf-dir and on generated PDFs
+    split     split_documents pages/s and chunks/s on the parsed and synthetic pages
+    embed     generate_embeddings texts/s per call batch size with the real model
+    retrieve  RAGRetriever.retrieve p50/p95/p99 latency and recall@k against an
+              exact brute-force search over the same embeddings
+    e2e       rag_simple latency with a deterministic fake LLM
+
+Everything runs offline on CPU. The retrieval corpus is the chunks of
+--pdf-dir plus --synthetic-pages generated annual-report pages, embedded with
+a deterministic hashing embedder so latency and recall do not depend on a
+model download (the embed stage measures the real model and is skipped if it
+is not cached locally). Write a report with --output and compare a later run
+against it with --baseline; throughput, recall and latency metrics that got
+worse by more than --tolerance are flagged and the exit status is 1.
+Run from the repository root:
+    python -m benchmarks.bench_suite --output baseline.json
+    python -m benchmarks.bench_suite --baseline baseline.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import textwrap
+import subprocess
+import contextlib
+import numpy as np
+from pathlib import Path
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from benchmarks.bench_retrieval import COMPANIES, TOPICS
+from src.components.BaseVectorStore import create_vector_store
+from src.components.ContextBuilder import ContextBuilder
+from src.components.RagRetriever import RAGRetriever
+from src.components.SparseIndex import tokenize
+from src.components.data_ingestion import DataIngestion
+from src.pipeline import rag_simple
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+STAGES = ("parse", "split", "embed", "retrieve", "e2e")
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the progress prints and bars of the code under test"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def latency_summary(seconds) -> dict:
+    samples = np.asarray(seconds) * 1000
+    return {'mean_ms': float(samples.mean()), 'p50_ms': float(np.percentile(samples, 50)),
+            'p95_ms': float(np.percentile(samples, 95)), 'p99_ms': float(np.percentile(samples, 99))}
+
+
+def timed(function, repeats: int):
+    """Median wall time of repeated calls, and the result of the last call"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)), result
+
+
+### Synthetic corpora
+
+def synthetic_pages(count: int, seed: int = 0, sentences_per_page: int = 24):
+    """Annual-report style pages spread over filings of COMPANIES x ten years"""
+    rng = np.random.default_rng(seed)
+    pages = []
+    for page in range(count):
+        company = COMPANIES[page % len(COMPANIES)]
+        year = 2015 + (page // len(COMPANIES)) % 10
+        sentences = []
+        for _ in range(sentences_per_page):
+            topic = TOPICS[int(rng.integers(len(TOPICS)))]
+            sentences.append(f"{company} reported {topic} of ${rng.uniform(1, 90):.1f} billion in fiscal {year}, "
+                             f"{rng.uniform(-20, 40):.1f}% compared with the prior year.")
+            if rng.random() < 0.2:
+                sentences.append("\n\n")
+        source_file = f"{company}{year}.pdf"
+        pages.append(Document(page_content=" ".join(sentences),
+                              metadata={'source_file': source_file, 'file_type': 'pdf', 'page': page,
+                                        'company': company.lower(), 'year': year}))
+    return pages
+
+
+def _pdf_string(line: str) -> str:
+    line = line.encode('latin-1', 'replace').decode('latin-1')
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, texts):
+    """Write a minimal PDF with one Helvetica text page per string"""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for text in texts:
+        lines = [line for paragraph in text.split("\n\n") for line in textwrap.wrap(paragraph, 100)]
+        stream = "BT /F1 8 Tf 10 TL 36 806 Td\n" + "\n".join(f"T* ({_pdf_string(line)}) Tj" for line in lines) + "\nET"
+        stream = stream.encode('latin-1')
+        content, page = len(objects) + 2, len(objects) + 3
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                         f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>").encode('latin-1')
+        kids.append(page)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] /Count {len(kids)} >>".encode()
+
+    body, offsets = bytearray(b"%PDF-1.4\n"), {}
+    for number in sorted(objects):
+        offsets[number] = len(body)
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offsets[number] for number in sorted(objects))
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(body))
+
+
+class HashingEmbeddings:
+    """Deterministic signed feature-hashing embeddings of BM25 terms (no model needed)"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def generate_embeddings(self, texts):
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in tokenize(text):
+                code = zlib.crc32(term.encode('utf-8'))
+                embeddings[row, code % self.dim] += 1.0 if code & 1 << 31 else -1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+
+def sample_queries(chunks, count: int, seed: int):
+    """Questions made of a word window from randomly picked chunks"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for index in rng.choice(len(chunks), min(count, len(chunks)), replace=False):
+        words = chunks[index].page_content.split()
+        start = int(rng.integers(max(len(words) - 12, 1)))
+        queries.append(" ".join(words[start:start + 12]) or "revenue")
+    return queries
+
+
+### Stages
+
+def bench_parse(ingestion, directory: Path, repeats: int):
+    """Parse throughput of a PDF directory, and the parsed pages"""
+    files = list(directory.glob("**/*.pdf"))
+    size_mb = sum(path.stat().st_size for path in files) / 1e6
+    with quiet():
+        seconds, pages = timed(lambda: ingestion.process_all_pdfs(directory), repeats)
+    return {'files': len(files), 'pages': len(pages), 'seconds': seconds,
+            'pages_per_s': len(pages) / seconds, 'mb_per_s': size_mb / seconds}, pages
+
+
+def bench_split(ingestion, pages, args) -> dict:
+    with quiet():
+        seconds, chunks = timed(lambda: ingestion.split_documents(pages, args.chunk_size, args.chunk_overlap),
+                                args.repeats)
+    return {'pages': len(pages), 'chunks': len(chunks), 'seconds': seconds,
+            'pages_per_s': len(pages) / seconds, 'chunks_per_s': len(chunks) / seconds}
+
+
+def bench_embed(texts, batch_sizes) -> dict:
+    from src.components.EmbeddingManager import EmbeddingManager
+
+    with quiet():
+        embedding_manager = EmbeddingManager(cache_size=0)
+        embedding_manager.generate_embeddings(texts[:8])
+        report = {}
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            for offset in range(0, len(texts), batch_size):
+                embedding_manager.generate_embeddings(texts[offset:offset + batch_size])
+            seconds = time.perf_counter() - start
+            report[f"batch_{batch_size}"] = {'texts': len(texts), 'texts_per_s': len(texts) / seconds}
+    return report
+
+
+def build_store(directory: str, chunks, embeddings, args):
+    kwargs = {'persist_directory': directory}
+    if args.backend == "faiss":
+        kwargs['index_type'] = args.index_type
+    with quiet():
+        store = create_vector_store(args.backend, **kwargs)
+        ids = [f"chunk_{i}" for i in range(len(chunks))]
+        for start in range(0, len(ids), 5000):
+            store.add(ids[start:start + 5000], embeddings[start:start + 5000],
+                      [chunk.page_content for chunk in chunks[start:start + 5000]],
+                      [dict(chunk.metadata) for chunk in chunks[start:start + 5000]])
+    return store
+
+
+def bench_retrieve(retriever, embeddings, queries, top_k: int) -> dict:
+    """Latency of retrieve, and recall@k against exact cosine search (ties count as hits)"""
+    exact_scores = retriever.embedding_manager.generate_embeddings(queries) @ embeddings.T
+    with quiet():
+        for query in queries[:5]:
+            retriever.retrieve(query, top_k=top_k, score_threshold=-1.0)
+
+    latencies, recalls = [], []
+    for query, scores in zip(queries, exact_scores):
+        with quiet():
+            start = time.perf_counter()
+            results = retriever.retrieve(query, top_k=top_k, score_threshold=-1.0)
+            latencies.append(time.perf_counter() - start)
+        kth_score = np.partition(scores, -top_k)[-top_k]
+        found = sum(scores[int(doc['id'].split("_")[1])] >= kth_score - 1e-5 for doc in results)
+        recalls.append(found / top_k)
+    return {'queries': len(queries), f'recall_at_{top_k}': float(np.mean(recalls)), **latency_summary(latencies)}
+
+
+def bench_e2e(retriever, queries, top_k: int, llm_latency_s: float) -> dict:
+    llm = FakeListChatModel(responses=["Deterministic benchmark answer."], sleep=llm_latency_s or None)
+    context_builder = ContextBuilder()
+    latencies = []
+    for query in queries:
+        with quiet():
+            start = time.perf_counter()
+            rag_simple(query, retriever, llm, top_k=top_k, context_builder=context_builder)
+            latencies.append(time.perf_counter() - start)
+    return {'queries': len(queries), 'context_tokens_mean': context_builder.stats()['context_tokens'] / len(queries),
+            **latency_summary(latencies)}
+
+
+### Reporting
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def metric_direction(name: str):
+    """+1 if higher is better, -1 if lower is better, None for informational metrics"""
+    metric = name.rsplit(".", 1)[-1]
+    if metric.endswith("_per_s") or metric.startswith("recall"):
+        return 1
+    if metric.endswith("_ms"):
+        return -1
+    return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Rows of (metric, baseline, current, relative change, regressed)"""
+    current, previous = flatten(results), flatten(baseline)
+    rows = []
+    for name, value in current.items():
+        direction = metric_direction(name)
+        if direction is None or name not in previous or not previous[name]:
+            continue
+        change = (value - previous[name]) / abs(previous[name])
+        rows.append((name, previous[name], value, change, direction * change < -tolerance))
+    return rows
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent).stdout.strip()
+    except OSError:
+        commit = ""
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpus': os.cpu_count(), 'numpy': np.__version__}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--pdf-dir", default=str(DATA_DIR / "pdf"), help="Real filings to parse and index")
+    parser.add_argument("--synthetic-pdfs", type=int, default=4, help="Generated PDFs for the parse stage")
+    parser.add_argument("--pages-per-pdf", type=int, default=50)
+    parser.add_argument("--synthetic-pages", type=int, default=2000, help="Generated pages added to the corpus")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--embed-texts", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--backend", default="faiss", help="Vector store backend for retrieve and e2e")
+    parser.add_argument("--index-type", default="flat", help="FAISS index type (faiss backend only)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Sleep of the fake LLM per answer")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per throughput measurement (median kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+
+    ingestion = DataIngestion()
+    pdf_dir = Path(args.pdf_dir)
+    has_pdfs = pdf_dir.is_dir() and any(pdf_dir.glob("**/*.pdf"))
+    results, real_pages = {}, None
+
+    directory = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        if "parse" in args.stages:
+            results['parse'] = {}
+            if has_pdfs:
+                results['parse']['pdf_dir'], real_pages = bench_parse(ingestion, pdf_dir, args.repeats)
+            if args.synthetic_pdfs > 0:
+                generated = Path(directory) / "pdf"
+                generated.mkdir()
+                pages = synthetic_pages(args.synthetic_pdfs * args.pages_per_pdf, seed=args.seed + 1)
+                for index in range(args.synthetic_pdfs):
+                    batch = pages[index * args.pages_per_pdf:(index + 1) * args.pages_per_pdf]
+                    write_pdf(generated / f"Synthetic{2000 + index}.pdf", [page.page_content for page in batch])
+                results['parse']['synthetic'], _ = bench_parse(ingestion, generated, args.repeats)
+
+        if real_pages is None and has_pdfs:
+            with quiet():
+                real_pages = ingestion.process_all_pdfs(pdf_dir)
+        corpora = {'pdf_dir': real_pages or [], 'synthetic': synthetic_pages(args.synthetic_pages, seed=args.seed)}
+        corpora = {name: pages for name, pages in corpora.items() if pages}
+
+        if "split" in args.stages:
+            results['split'] = {name: bench_split(ingestion, pages, args) for name, pages in corpora.items()}
+
+        with quiet():
+            chunks = [chunk for pages in corpora.values()
+                      for chunk in ingestion.split_documents(pages, args.chunk_size, args.chunk_overlap)]
+        texts = [chunk.page_content for chunk in chunks]
+
+        if "embed" in args.stages:
+            try:
+                results['embed'] = bench_embed(texts[:args.embed_texts], args.batch_sizes)
+            except Exception as e:
+                print(f"Skipping embed stage, the embedding model is not available offline: {e}")
+
+        if {"retrieve", "e2e"} & set(args.stages) and chunks:
+            embedding_manager = HashingEmbeddings()
+            embeddings = embedding_manager.generate_embeddings(texts)
+            store = build_store(str(Path(directory) / "store"), chunks, embeddings, args)
+            retriever = RAGRetriever(store, embedding_manager)
+            queries = sample_queries(chunks, args.queries, seed=args.seed + 2)
+            if "retrieve" in args.stages:
+                results['retrieve'] = bench_retrieve(retriever, embeddings, queries, args.top_k)
+            if "e2e" in args.stages:
+                results['e2e'] = bench_e2e(retriever, queries, args.top_k, args.llm_latency_ms / 1000)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {'environment': environment(), 'config': vars(args),
+              'corpus': {'pages': sum(len(pages) for pages in corpora.values()), 'chunks': len(chunks)},
+              'results': results}
+
+    print(f"\nCorpus: {report['corpus']['pages']} pages, {report['corpus']['chunks']} chunks")
+    for name, value in flatten(results).items():
+        print(f"{name:<45}{value:>14.3f}")
+
+    regressions = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get('corpus') != report['corpus']:
+            print(f"\nWarning: baseline corpus {baseline.get('corpus')} differs from this run's")
+        rows = compare(results, baseline.get('results', {}), args.tolerance)
+        print(f"\n{'metric':<45}{'baseline':>12}{'current':>12}{'change':>9}")
+        for name, previous, value, change, regressed in rows:
+            print(f"{name:<45}{previous:>12.3f}{value:>12.3f}{change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+        regressions = [row[0] for row in rows if row[4]]
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
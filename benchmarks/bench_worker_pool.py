@@ -0,0 +1,145 @@
+"""
+Measure RetrievalWorkerPool throughput and memory per worker count
+
+Publishes a snapshot generation of --docs synthetic chunks (hashing
+embeddings, so no model download is needed and each worker does real
+per-query CPU work), then for each --workers count runs --queries queries
+from --clients concurrent client threads and reports queries/s, the summed
+RSS of the workers and their summed PSS (proportional set size, which
+counts the shared memory-mapped index once instead of once per worker).
+Finally a new generation is published while queries run, and the report
+shows how long the pool took to serve it and whether any query failed.
+Run from the repository root:
+    python -m benchmarks.bench_worker_pool --docs 200000 --workers 1 2 4
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.bench_suite import HashingEmbeddings, quiet, synthetic_pages
+from src.components.BaseVectorStore import create_vector_store
+from src.components.RetrievalWorkerPool import RetrievalWorkerPool
+from src.components.Snapshot import publish_generation
+
+
+def memory_mb(pid: int) -> dict:
+    """RSS and PSS of a process in MB (PSS needs /proc/<pid>/smaps_rollup)"""
+    stats = {'rss_mb': 0.0, 'pss_mb': 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as file_obj:
+            for line in file_obj:
+                if line.startswith("Rss:"):
+                    stats['rss_mb'] = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    stats['pss_mb'] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return stats
+
+
+def publish(root: Path, docs: int, dim: int, seed: int):
+    """Publish a generation of synthetic chunks embedded with HashingEmbeddings"""
+    pages = synthetic_pages(max(1, docs // 4), seed=seed)
+    texts = [sentence for page in pages for sentence in page.page_content.split(". ")][:docs]
+    embedder = HashingEmbeddings(dim)
+    with quiet():
+        store = create_vector_store("compressed", persist_directory=str(root.parent / f"build_{seed}"))
+        for start in range(0, len(texts), 10000):
+            batch = texts[start:start + 10000]
+            store.upsert([f"chunk_{seed}_{start + i}" for i in range(len(batch))], embedder.generate_embeddings(batch),
+                         batch, [{'source_file': f"Filing{(start + i) % 50}.pdf"} for i in range(len(batch))])
+        publish_generation(store, root, "hashing")
+    return texts
+
+
+def run_queries(pool, queries, clients: int):
+    """Queries/s and failure count with clients threads each sending one query at a time"""
+    failures = []
+
+    def send(query):
+        try:
+            pool.retrieve(query, top_k=5)
+        except Exception as e:
+            failures.append(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(send, queries))
+    return len(queries) / (time.perf_counter() - start), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_worker_pool_"))
+    root = work_dir / "generations"
+    report = {'docs': args.docs, 'dim': args.dim, 'runs': []}
+    try:
+        texts = publish(root, args.docs, args.dim, seed=0)
+        rng = np.random.default_rng(1)
+        queries = [" ".join(texts[i].split()[:8]) for i in rng.choice(len(texts), args.queries)]
+        factory = partial(HashingEmbeddings, args.dim)
+
+        for workers in args.workers:
+            with quiet(), RetrievalWorkerPool(root, workers=workers, model_name="hashing",
+                                              embedding_factory=factory) as pool:
+                pool.retrieve_batch(queries[:workers * 4])   # start the workers and map the index
+                qps, failures = run_queries(pool, queries, args.clients)
+                memory = [memory_mb(pid) for pid in pool.worker_pids()]
+            report['runs'].append({'workers': workers, 'qps': qps, 'failures': len(failures),
+                                   'rss_mb': sum(stats['rss_mb'] for stats in memory),
+                                   'pss_mb': sum(stats['pss_mb'] for stats in memory)})
+
+        with quiet(), RetrievalWorkerPool(root, workers=max(args.workers), model_name="hashing",
+                                          embedding_factory=factory, poll_interval=0.1) as pool:
+            pool.retrieve_batch(queries[:max(args.workers) * 4])
+            done = threading.Event()
+            failures = []
+
+            def load():
+                while not done.is_set():
+                    failures.extend(run_queries(pool, queries[:50], args.clients)[1])
+
+            thread = threading.Thread(target=load)
+            thread.start()
+            publish(root, args.docs, args.dim, seed=2)
+            published = time.perf_counter()
+            while not pool.generation.endswith("gen-000002"):
+                time.sleep(0.01)
+            swap_s = time.perf_counter() - published
+            served = pool.retrieve(queries[0], top_k=1)
+            done.set()
+            thread.join()
+        report['hot_swap'] = {'swap_s': swap_s, 'failures': len(failures),
+                              'new_generation_served': bool(served) and served[0]['id'].startswith("chunk_2_")}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{args.docs} records, {args.dim}-d, {args.clients} clients")
+    print(f"{'workers':>8}{'queries/s':>12}{'RSS MB':>10}{'PSS MB':>10}{'failures':>10}")
+    for run in report['runs']:
+        print(f"{run['workers']:>8}{run['qps']:>12.1f}{run['rss_mb']:>10.0f}{run['pss_mb']:>10.0f}"
+              f"{run['failures']:>10}")
+    swap = report['hot_swap']
+    print(f"\nHot swap: served the new generation after {swap['swap_s']:.2f}s, {swap['failures']} failed queries, "
+          f"new generation served: {swap['new_generation_served']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
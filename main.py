@@ -1,47 +1,35 @@
 import os
 from dotenv import load_dotenv
-from src.components.EmbeddingManager import EmbeddingManager
-from src.components.RagRetriever import RAGRetriever
-from langchain_groq import ChatGroq
-from src.components.VectorStore import VectorStore
 
+# Environment first, src.logger reads LOG_FORMAT/LOG_DIR when imported
 load_dotenv()
 
+import src.logger  # noqa: F401 - configures structured logging and request IDs
+from src.components.EmbeddingManager import EmbeddingManager
+from src.components.RagRetriever import RAGRetriever
+from src.components.LLMGateway import llm_gateway_from_env
+from src.components.BaseVectorStore import vector_store_from_env
+from src.components.SparseIndex import BM25Index
+from src.pipeline import rag_simple
+from pathlib import Path
+
 groq_api_key = os.getenv("GROQ_API_KEY")
 
-llm=ChatGroq(groq_api_key=groq_api_key,model_name="gemma2-9b-it",temperature=0.1,max_tokens=1024)
+llm=llm_gateway_from_env("gemma2-9b-it",api_key=groq_api_key,temperature=0.1,max_tokens=1024)
 
 def main():
     print("Hello from rag!")
 
-def rag_simple(query,retriever,llm,top_k=3):
-    ## retriever the context
-    results=retriever.retrieve(query,top_k=top_k)
-    context="\n\n".join([doc['content'] for doc in results]) if results else ""
-    
-    if not context:
-        return "No relevant context found to answer the question."
-    
-    ## generate the answwer using GROQ LLM
-    prompt=f"""Use the following context to answer the question concisely.
-        Context:
-        {context}
-
-        Question: {query}
-
-        Answer:"""
-    
-    response=llm.invoke([prompt.format(context=context,query=query)])
-    return response.content
-
 if __name__ == "__main__":
     embedding_manager=EmbeddingManager()
-    vectorstore = VectorStore(
-                                    collection_name="pdf_documents",
-                                    persist_directory="../data/vector_store"  # same path you used when creating
+    vectorstore = vector_store_from_env(
+                                    Path(__file__).resolve().parent / "data"  # same store the ingestion wrote to
                                 )
     
-    rag_retriever=RAGRetriever(vectorstore,embedding_manager)
+    ## RETRIEVAL_MODE=hybrid opts in to BM25 + dense retrieval when ingestion built the sparse index
+    sparse_index=BM25Index(Path(vectorstore.persist_directory) / "bm25")
+    rag_retriever=RAGRetriever(vectorstore,embedding_manager,sparse_index=sparse_index if len(sparse_index) else None,
+                               auto_route=True,default_mode=os.getenv("RETRIEVAL_MODE","dense"))
 
     
 
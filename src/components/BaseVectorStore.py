@@ -0,0 +1,366 @@
+import os
+import re
+import numpy as np
+from pathlib import Path
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.components.IngestionManifest import make_chunk_id
+from src.components.BulkWriter import BulkWriter
+
+# Metadata field of a canonical chunk listing the sources of the near-duplicates dropped in its favour
+ALIAS_FIELD = "alias_sources"
+# Separator of the alias_sources value (lists are not valid metadata in every backend)
+ALIAS_SEPARATOR = ";"
+# Routing metadata source_attributes derives from a file name
+SOURCE_ATTRIBUTE_KEYS = ("company", "year")
+
+
+def source_attributes(file_name: str) -> dict:
+    """
+    Routing metadata derived from a filing's file name
+
+    "Apple2024.pdf" gives {'company': 'apple', 'year': 2024}; names without
+    a company/year pattern give {}.
+    """
+    match = re.match(r"([A-Za-z][A-Za-z&.]*?)[\s_-]*((?:19|20)\d{2})", Path(file_name).stem)
+    if not match:
+        return {}
+    return {'company': match.group(1).lower(), 'year': int(match.group(2))}
+
+
+def metadata_views(metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The metadata a record is filtered by: its own, plus one view per alias source
+
+    A canonical chunk stands in for the near-duplicates dropped from its
+    alias sources, so each view swaps in an alias as source_file, with the
+    company and year that source's file name implies.
+    """
+    aliases = [alias for alias in str(metadata.get(ALIAS_FIELD) or "").split(ALIAS_SEPARATOR) if alias]
+    views = [metadata]
+    for alias in aliases:
+        view = {key: value for key, value in metadata.items() if key not in SOURCE_ATTRIBUTE_KEYS}
+        view.update(source_attributes(alias), source_file=alias)
+        views.append(view)
+    return views
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Chroma-style metadata filter against one metadata dict
+
+    Supports field equality, $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte and
+    the $and / $or combinators, e.g. {"$and": [{"company": "apple"}, {"year": {"$gte": 2023}}]}.
+    A record with alias_sources also matches as any of its alias sources
+    (see metadata_views).
+
+    Args:
+        metadata: Metadata of a stored document
+        where: Filter expression (None matches everything)
+
+    Returns:
+        True if the metadata satisfies the filter
+    """
+    if not where:
+        return True
+    return any(_matches_view(view, where) for view in metadata_views(metadata))
+
+
+def _matches_view(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_view(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_view(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq":
+                    ok = value == operand
+                elif operator == "$ne":
+                    ok = value != operand
+                elif operator == "$in":
+                    ok = value in operand
+                elif operator == "$nin":
+                    ok = value not in operand
+                elif operator in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    ok = {"$gt": value > operand, "$gte": value >= operand,
+                          "$lt": value < operand, "$lte": value <= operand}[operator]
+                else:
+                    raise ValueError(f"Unsupported where operator: {operator}")
+                if not ok:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def may_match(attributes: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Decide whether any record of a group could satisfy a filter
+
+    Used to prune shards (or index row groups) that share the given
+    attributes: conditions on a field the group has an attribute for are
+    evaluated, conditions on any other field are assumed to be satisfiable.
+    Alias sources in the attributes are expanded as in matches_where.
+
+    Args:
+        attributes: Metadata values every record of the group shares
+        where: Chroma-style filter (None matches everything)
+
+    Returns:
+        False only if no record of the group can match
+    """
+    if not where:
+        return True
+    return any(_may_match_view(view, where) for view in metadata_views(attributes))
+
+
+def _may_match_view(attributes: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_may_match_view(attributes, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_may_match_view(attributes, clause) for clause in condition):
+                return False
+        elif key in attributes and not _matches_view(attributes, {key: condition}):
+            return False
+    return True
+
+
+class BaseVectorStore(ABC):
+    """
+    Interface shared by all vector store backends
+
+    Backends store (id, embedding, document, metadata) records and answer
+    cosine-similarity searches. search returns, for every query, a list of
+    hits shaped {'id', 'content', 'metadata', 'distance'} ordered best first,
+    where distance is the cosine distance (1 - similarity).
+    """
+
+    # Whether where filters see alias sources (metadata_views); backends filtering natively do not
+    filters_aliases = True
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert new records (IDs must not exist yet)"""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert records, replacing any existing record with the same ID"""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Delete records by ID (unknown IDs are ignored)"""
+
+    @abstractmethod
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Find the nearest records for each query embedding
+
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return each hit's stored vector under 'embedding'
+
+        Returns:
+            One list of hits per query
+        """
+
+    @abstractmethod
+    def get(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch {'id', 'content', 'metadata'} records by ID (None for unknown IDs)"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored records"""
+
+    @abstractmethod
+    def persist(self):
+        """Flush the store to disk"""
+
+    @abstractmethod
+    def load(self):
+        """(Re)load the store from disk"""
+
+    def iter_records(self, batch_size: int = 1024) -> Iterator[Tuple[List[str], np.ndarray, List[str],
+                                                                      List[Dict[str, Any]]]]:
+        """
+        Yield every stored record in batches, e.g. to export a snapshot
+
+        Args:
+            batch_size: Records per batch
+
+        Yields:
+            (ids, embeddings, documents, metadatas) batches
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot enumerate its records")
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Replace the metadata of existing records, keeping their vectors and documents
+
+        Args:
+            ids: Record IDs (unknown IDs are ignored)
+            metadatas: New metadata dict per record
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot update metadata")
+
+    def max_batch_size(self) -> Optional[int]:
+        """Most records one add/upsert call accepts (None if unbounded)"""
+        return None
+
+    def bulk_upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str],
+                    metadatas: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """
+        Upsert any number of records in store-sized batches
+
+        The embedding matrix is sliced, not converted row by row (see BulkWriter,
+        which also pipelines writes on a background thread).
+
+        Args:
+            ids: Record IDs
+            embeddings: Matrix of shape (len(ids), dim)
+            documents: Record texts
+            metadatas: Record metadata dicts
+            batch_size: Rows per upsert call (the store's limit or a memory budget by default)
+
+        Returns:
+            Number of records written
+        """
+        with BulkWriter(self, batch_size=batch_size) as writer:
+            writer.write(ids, embeddings, documents, metadatas)
+        return len(ids)
+
+    def add_documents(self, documents: List[Any], embeddings: np.ndarray, ids: Optional[List[str]] = None,
+                      store_text: bool = True, metadata_keys: Optional[Tuple[str, ...]] = None):
+        """
+        Add documents and their embeddings to the vector store
+
+        Documents are upserted under deterministic chunk IDs, so adding the
+        same chunk twice overwrites it instead of duplicating it.
+
+        Args:
+            documents: List of Langchain documents
+            embeddings: Corresponding embeddings for the documents
+            ids: Optional chunk IDs (derived from source, page, offset and content by default)
+            store_text: Store each chunk's text (off when the text is read back from a PageStore)
+            metadata_keys: Only store these metadata fields (all of them by default)
+        """
+
+        if len(documents) != len(embeddings):
+            raise ValueError("Number of documents must match number of embeddings")
+        if ids is not None and len(ids) != len(documents):
+            raise ValueError("Number of ids must match number of documents")
+
+        print(f"Adding {len(documents)} documents to vectore store..")
+
+        ids_list = []
+        metadatas = []
+        documents_text = []
+
+        for i, doc in enumerate(documents):
+            ids_list.append(ids[i] if ids is not None else make_chunk_id(doc))
+
+            if metadata_keys is None:
+                metadata = dict(doc.metadata)
+            else:
+                metadata = {key: doc.metadata[key] for key in metadata_keys if key in doc.metadata}
+            metadata['doc_index'] = i
+            metadata['content_length'] = len(doc.page_content)
+            metadatas.append(metadata)
+
+            documents_text.append(doc.page_content if store_text else "")
+
+        try:
+            self.bulk_upsert(ids_list, embeddings, documents_text, metadatas)
+            print(f"Sucessfully added {len(documents)} documents to vector store.")
+            print(f"Total documents in collection: {self.count()}")
+
+        except Exception as e:
+            print(f"Error adding documents to vector store: {e}")
+            raise
+
+
+def create_vector_store(backend: str = "chroma", **kwargs) -> BaseVectorStore:
+    """
+    Build a vector store backend by name
+
+    Args:
+        backend: "chroma", "faiss", "compressed", "sharded" or "snapshot" (read-only)
+        **kwargs: Passed to the backend constructor
+
+    Returns:
+        Vector store implementing BaseVectorStore
+    """
+    backend = backend.lower()
+    if backend == "sharded":
+        from src.components.ShardedVectorStore import ShardedVectorStore
+        return ShardedVectorStore(**kwargs)
+    if backend == "chroma":
+        from src.components.VectorStore import VectorStore
+        return VectorStore(**kwargs)
+    if backend == "faiss":
+        from src.components.FaissVectorStore import FaissVectorStore
+        return FaissVectorStore(**kwargs)
+    if backend == "compressed":
+        from src.components.CompressedVectorStore import CompressedVectorStore
+        return CompressedVectorStore(**kwargs)
+    if backend == "snapshot":
+        from src.components.Snapshot import SnapshotVectorStore
+        return SnapshotVectorStore(**kwargs)
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def vector_store_from_env(data_dir, model_name: Optional[str] = None) -> BaseVectorStore:
+    """
+    Build the vector store selected by environment variables
+
+    VECTOR_STORE_BACKEND picks "chroma" (default, data_dir/vector_store),
+    "faiss" (data_dir/faiss_store, index type from FAISS_INDEX_TYPE),
+    "compressed" (data_dir/compressed_store, codes from COMPRESSION_MODE and
+    optional PCA_DIM) or "snapshot" (read-only, memory-mapped from
+    SNAPSHOT_DIR or data_dir/snapshot; SNAPSHOT_VERIFY=0 skips the
+    checksums). Setting SHARD_BY to a metadata field (e.g. source_file)
+    splits the store into one such backend per field value under
+    data_dir/sharded_store.
+
+    Args:
+        data_dir: Project data directory
+        model_name: Embedding model the queries will use; a snapshot built with another model is refused
+
+    Returns:
+        Vector store implementing BaseVectorStore
+    """
+    backend = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+    shard_by = os.getenv("SHARD_BY")
+    if backend == "snapshot":
+        # A snapshot is served as exported, sharded or not
+        directory = os.getenv("SNAPSHOT_DIR", str(Path(data_dir) / "snapshot"))
+        return create_vector_store("snapshot", persist_directory=directory, model_name=model_name,
+                                   verify=os.getenv("SNAPSHOT_VERIFY", "1") != "0")
+    if backend == "faiss":
+        directory, kwargs = "faiss_store", {'index_type': os.getenv("FAISS_INDEX_TYPE", "flat")}
+    elif backend == "compressed":
+        pca_dim = os.getenv("PCA_DIM")
+        directory, kwargs = "compressed_store", {'mode': os.getenv("COMPRESSION_MODE", "int8"),
+                                                 'pca_dim': int(pca_dim) if pca_dim else None}
+    else:
+        directory, kwargs = "vector_store", {'collection_name': "pdf_documents"}
+
+    if shard_by:
+        return create_vector_store(
+            "sharded",
+            persist_directory=str(Path(data_dir) / "sharded_store"),
+            shard_backend=backend,
+            shard_key=shard_by,
+            **kwargs
+        )
+    return create_vector_store(backend, persist_directory=str(Path(data_dir) / directory), **kwargs)
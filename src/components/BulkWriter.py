@@ -0,0 +1,137 @@
+import time
+import queue
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+# Embedding bytes per upsert call when neither the caller nor the store sets a batch size
+DEFAULT_BATCH_BYTES = 32 * 1024 * 1024
+
+
+class BulkWriter:
+    """
+    Bulk upserts into a vector store, in store-sized batches
+
+    write() takes the embedding matrix as is and hands the store row slices
+    of it (views, not copies, when it already is float32), never per-row
+    Python lists. Batches hold at most batch_size rows: the caller's choice,
+    else the store's own limit (max_batch_size(), e.g. Chroma's), else as
+    many rows as fit in batch_bytes of embeddings.
+
+    With background=True the upserts run on a writer thread behind a
+    bounded queue, so the caller can embed its next batch while the previous
+    one is written. Errors of the writer thread are raised by the next
+    write() or by close().
+
+    Usage:
+        with BulkWriter(store, background=True) as writer:
+            for ids, texts, metadatas in batches:
+                writer.write(ids, embedding_manager.generate_embeddings(texts), texts, metadatas)
+    """
+
+    def __init__(self, store, batch_size: Optional[int] = None, background: bool = False, queue_size: int = 2,
+                 batch_bytes: int = DEFAULT_BATCH_BYTES):
+        """
+        Initialize the writer
+
+        Args:
+            store: Vector store implementing BaseVectorStore
+            batch_size: Rows per upsert call (derived from the store and batch_bytes by default)
+            background: Upsert on a writer thread while the caller carries on
+            queue_size: Batches waiting for the writer thread before write() blocks
+            batch_bytes: Embedding bytes per upsert call when no batch size applies
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.rows = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self._error = None
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, name="bulk-writer", daemon=True)
+            self._thread.start()
+
+    def _rows_per_batch(self, embeddings: np.ndarray) -> int:
+        if self.batch_size:
+            return self.batch_size
+        rows = max(1, self.batch_bytes // max(1, embeddings[:1].nbytes))
+        limit = self.store.max_batch_size()
+        return min(rows, limit) if limit else rows
+
+    def _upsert(self, ids, embeddings, documents, metadatas):
+        start = time.perf_counter()
+        self.store.upsert(ids, embeddings, documents, metadatas)
+        self.write_seconds += time.perf_counter() - start
+        self.rows += len(ids)
+        self.batches += 1
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a dead writer
+                continue
+            try:
+                self._upsert(*batch)
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def write(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Upsert records, split into batches
+
+        Args:
+            ids: Record IDs
+            embeddings: Matrix of shape (len(ids), dim); float32 input is sliced without copying
+            documents: Record texts
+            metadatas: Record metadata dicts
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or not len(ids) == len(embeddings) == len(documents) == len(metadatas):
+            raise ValueError("ids, embeddings, documents and metadatas must have one entry per record")
+
+        size = self._rows_per_batch(embeddings)
+        for start in range(0, len(ids), size):
+            batch = (ids[start:start + size], embeddings[start:start + size],
+                     documents[start:start + size], metadatas[start:start + size])
+            if self._queue is None:
+                self._upsert(*batch)
+            else:
+                self._raise_error()
+                self._queue.put(batch)
+
+    def close(self):
+        """Wait for queued batches to be written (raising the writer thread's error, if any)"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+    def stats(self) -> Dict[str, float]:
+        """Rows and batches written and the time spent in upsert calls"""
+        return {'rows': self.rows, 'batches': self.batches, 'write_seconds': self.write_seconds,
+                'rows_per_s': self.rows / self.write_seconds if self.write_seconds else 0.0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        elif self._thread is not None:
+            # Already failing: let queued batches finish, but do not mask the original error
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
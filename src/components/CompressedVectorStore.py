@@ -0,0 +1,453 @@
+import os
+import json
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.components.BaseVectorStore import BaseVectorStore, matches_where
+from src.components.DocumentStore import DocumentStore
+
+# Number of set bits for every byte value, used for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class EmbeddingQuantizer:
+    """Optional PCA projection followed by int8 scalar or 1-bit binary quantization"""
+
+    MODES = ("int8", "binary")
+
+    def __init__(self, mode: str = "int8", pca_dim: Optional[int] = None):
+        """
+        Initialize an unfitted quantizer
+
+        Args:
+            mode: "int8" (one signed byte per dimension) or "binary" (one bit per dimension)
+            pca_dim: Reduce to this many principal components before quantizing (None keeps all)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown compression mode: {mode}, expected one of {self.MODES}")
+        self.mode = mode
+        self.pca_dim = pca_dim
+        self.mean = None
+        self.components = None
+        self.low = None
+        self.scale = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.mean is not None
+
+    def fit(self, vectors: np.ndarray):
+        """Fit the mean, PCA basis and int8 ranges on a sample of full-precision vectors"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.mean = vectors.mean(axis=0)
+        centered = vectors - self.mean
+
+        if self.pca_dim and self.pca_dim < vectors.shape[1]:
+            if len(vectors) < self.pca_dim:
+                raise ValueError(f"PCA to {self.pca_dim} dimensions needs at least {self.pca_dim} vectors, "
+                                 f"got {len(vectors)}")
+            _, _, vt = np.linalg.svd(centered, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[:self.pca_dim].T)
+        else:
+            self.components = None
+
+        projected = self.project(vectors)
+        # Clip the rare outliers so they do not waste int8 resolution
+        self.low = np.percentile(projected, 0.1, axis=0).astype(np.float32)
+        high = np.percentile(projected, 99.9, axis=0).astype(np.float32)
+        self.scale = np.maximum(high - self.low, 1e-6) / 255.0
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """Center (and PCA-reduce) vectors"""
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        return centered @ self.components if self.components is not None else centered
+
+    @property
+    def code_dim(self) -> int:
+        return self.components.shape[1] if self.components is not None else self.mean.shape[0]
+
+    @property
+    def code_bytes(self) -> int:
+        """Bytes per stored code"""
+        return self.code_dim if self.mode == "int8" else (self.code_dim + 7) // 8
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return int8 codes (n, code_dim) or packed bits (n, code_bytes)"""
+        projected = self.project(vectors)
+        if self.mode == "binary":
+            return np.packbits(projected > 0, axis=1)
+        codes = np.clip(np.rint((projected - self.low) / self.scale), 0, 255) - 128
+        return codes.astype(np.int8)
+
+    def approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Score codes against queries, higher is better
+
+        int8: inner product with the dequantized vectors. binary: negated
+        Hamming distance between the sign bits of queries and codes.
+        """
+        if self.mode == "binary":
+            query_codes = np.packbits(self.project(queries) > 0, axis=1)
+            # numpy >= 2.0 has a native popcount, older versions use the lookup table
+            popcount = np.bitwise_count if hasattr(np, "bitwise_count") else _POPCOUNT.__getitem__
+            return -np.stack([popcount(np.bitwise_xor(codes, code)).sum(axis=1, dtype=np.int32)
+                              for code in query_codes]).astype(np.float32)
+
+        # x ~= mean + P((code + 128) * scale + low), so q.x is affine in code
+        reduced = queries @ self.components if self.components is not None else queries
+        weights = (reduced * self.scale).astype(np.float32)
+        offset = queries @ self.mean + reduced @ (self.low + 128.0 * self.scale)
+        return weights @ codes.astype(np.float32).T + offset[:, None]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        arrays = {'mean': self.mean, 'low': self.low, 'scale': self.scale}
+        if self.components is not None:
+            arrays['components'] = self.components
+        return arrays
+
+    def load_state(self, arrays):
+        self.mean = arrays['mean']
+        self.low = arrays['low']
+        self.scale = arrays['scale']
+        self.components = arrays['components'] if 'components' in arrays else None
+
+
+class CompressedVectorStore(BaseVectorStore):
+    """
+    Vector store that searches compact codes and rescores with full-precision vectors
+
+    Normalized float32 vectors are appended to a memory-mapped file on disk;
+    only the int8 or binary codes live in RAM. A search scans the codes,
+    keeps a shortlist of rescore_factor * top_k candidates and ranks them
+    exactly by reading their full vectors from the memory map.
+    """
+
+    def __init__(self, persist_directory: str = "../data/compressed_store", mode: str = "int8",
+                 pca_dim: Optional[int] = None, rescore_factor: int = 8, fit_size: int = 4096,
+                 block_size: int = 65536):
+        """
+        Initialize the vector store, loading it from persist_directory if it exists
+
+        Args:
+            persist_directory: Directory holding the vectors, codes and sidecar files
+            mode: "int8" or "binary" codes
+            pca_dim: Optional PCA dimension applied before quantization
+            rescore_factor: Shortlist size as a multiple of top_k
+            fit_size: Number of vectors after which the quantizer is fitted (searches are exact before);
+                raised to pca_dim if smaller
+            block_size: Rows scanned per block, bounds temporary memory during search
+        """
+        self.persist_directory = persist_directory
+        self.quantizer = EmbeddingQuantizer(mode, pca_dim)
+        self.rescore_factor = rescore_factor
+        self.fit_size = max(fit_size, pca_dim or 0)
+        self.block_size = block_size
+
+        directory = Path(persist_directory)
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = directory / "vectors.f32"
+        self.dim = None
+        self.docstore = DocumentStore()
+        self._row_labels = np.zeros(0, dtype=np.int64)   # label per row, -1 once deleted
+        self._label_rows: Dict[int, int] = {}
+        self._codes = None
+        self._vectors = None
+        self._fit_rows = 0   # vectors the quantizer was fitted on
+
+        if (directory / "store.json").exists():
+            self.load()
+        elif self.vectors_path.exists():
+            # Vectors without settings are leftovers of an unpersisted run
+            os.remove(self.vectors_path)
+        print(f"Compressed vector store initialized ({mode}). Existing documents: {self.count()}")
+
+    ### Full-precision vectors
+
+    @property
+    def _rows(self) -> int:
+        return len(self._row_labels)
+
+    def _full_vectors(self) -> np.ndarray:
+        """Read-only memory map of all rows (remapped after appends)"""
+        if self._vectors is None or self._vectors.shape[0] != self._rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self._rows, self.dim))
+        return self._vectors
+
+    def _alive_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._row_labels >= 0)
+
+    def fit(self, sample_size: int = 100000):
+        """(Re)fit the quantizer on live vectors and re-encode every row"""
+        alive = self._alive_rows()
+        if len(alive) == 0:
+            return
+        sample = alive if len(alive) <= sample_size else \
+            np.sort(np.random.default_rng(0).choice(alive, sample_size, replace=False))
+        vectors = self._full_vectors()
+        self.quantizer.fit(vectors[sample])
+        self._fit_rows = len(sample)
+
+        self._codes = np.empty((self._rows, self.quantizer.code_bytes),
+                               dtype=np.int8 if self.quantizer.mode == "int8" else np.uint8)
+        for start in range(0, self._rows, self.block_size):
+            self._codes[start:start + self.block_size] = self.quantizer.encode(vectors[start:start + self.block_size])
+        print(f"Fitted {self.quantizer.mode} quantizer on {len(sample)} vectors "
+              f"({self.quantizer.code_bytes} bytes per vector)")
+
+    def _maybe_fit(self):
+        """Fit once fit_size vectors exist, and refit a quantizer that was fitted on fewer"""
+        if len(self.docstore) >= self.fit_size and self._fit_rows < self.fit_size:
+            self.fit()
+
+    @staticmethod
+    def _normalize(embeddings: np.ndarray) -> np.ndarray:
+        vectors = np.array(embeddings, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    ### BaseVectorStore interface
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert new records (IDs must not exist yet)"""
+        if len(ids) == 0:
+            return
+        vectors = self._normalize(embeddings)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+        labels = self.docstore.add(ids, documents, metadatas)
+        with open(self.vectors_path, 'ab') as file_obj:
+            file_obj.write(vectors.tobytes())
+
+        first_row = self._rows
+        self._row_labels = np.concatenate([self._row_labels, np.asarray(labels, dtype=np.int64)])
+        for offset, label in enumerate(labels):
+            self._label_rows[label] = first_row + offset
+
+        if self.quantizer.fitted:
+            self._codes = np.concatenate([self._codes, self.quantizer.encode(vectors)])
+        self._maybe_fit()
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert records, replacing existing records with the same ID"""
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.delete([chunk_id for chunk_id in last if chunk_id in self.docstore])
+        if len(last) == len(ids):
+            # No repeated IDs: pass the batch through instead of gathering a copy of it
+            self.add(ids, embeddings, documents, metadatas)
+            return
+        keep = sorted(last.values())
+        self.add([ids[i] for i in keep], np.asarray(embeddings)[keep],
+                 [documents[i] for i in keep], [metadatas[i] for i in keep])
+
+    def delete(self, ids: List[str]):
+        """Delete records by ID; their rows are dropped on the next compaction"""
+        for label in self.docstore.remove(ids):
+            row = self._label_rows.pop(label, None)
+            if row is not None:
+                self._row_labels[row] = -1
+
+    def _candidate_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Boolean mask of rows that are alive and match the filter"""
+        mask = self._row_labels >= 0
+        if where:
+            for row in np.flatnonzero(mask):
+                _, _, metadata = self.docstore.get(self._row_labels[row])
+                mask[row] = matches_where(metadata, where)
+        return mask
+
+    def _shortlist(self, queries: np.ndarray, size: int, mask: np.ndarray) -> np.ndarray:
+        """Return per-query candidate rows ranked by the compact codes"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, self._rows, self.block_size):
+            rows = np.arange(start, min(start + self.block_size, self._rows))
+            rows = rows[mask[rows]]
+            if len(rows) == 0:
+                continue
+            scores = self.quantizer.approximate_scores(queries, self._codes[rows])
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+            if best_scores.shape[1] > size:
+                keep = np.argpartition(-best_scores, size - 1, axis=1)[:, :size]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return best_rows
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing records"""
+        self.docstore.update_metadata(ids, metadatas)
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Two-phase search: scan compact codes, then rescore a shortlist exactly
+
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return each hit's full-precision vector under 'embedding'
+
+        Returns:
+            One list of {'id','content','metadata','distance'} hits per query
+        """
+        queries = self._normalize(query_embeddings)
+        results = [[] for _ in range(len(queries))]
+        if self.count() == 0 or top_k <= 0:
+            return results
+
+        mask = self._candidate_mask(where)
+        if self.quantizer.fitted:
+            shortlist = self._shortlist(queries, top_k * self.rescore_factor, mask)
+        else:
+            shortlist = np.broadcast_to(np.flatnonzero(mask), (len(queries), int(mask.sum())))
+
+        vectors = self._full_vectors()
+        for query_index, rows in enumerate(shortlist):
+            if len(rows) == 0:
+                continue
+            rows = np.sort(rows)  # sequential reads from the memory map
+            candidates = vectors[rows]
+            exact = candidates @ queries[query_index]
+            order = np.argsort(-exact)[:top_k]
+            for position in order:
+                chunk_id, document, metadata = self.docstore.get(self._row_labels[rows[position]])
+                results[query_index].append({'id': chunk_id, 'content': document, 'metadata': metadata,
+                                             'distance': 1.0 - float(exact[position])})
+                if include_embeddings:
+                    results[query_index][-1]['embedding'] = np.array(candidates[position])
+        return results
+
+    def exact_search_rows(self, query_embeddings: np.ndarray, top_k: int) -> np.ndarray:
+        """Brute-force top_k rows over the full-precision vectors (ground truth for recall)"""
+        queries = self._normalize(query_embeddings)
+        if self._rows == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64)
+        alive = self._alive_rows()
+        scores = queries @ self._full_vectors()[alive].T
+        top = np.argsort(-scores, axis=1)[:, :top_k]
+        return alive[top]
+
+    def get(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch records by ID (None for unknown IDs)"""
+        return [self.docstore.record(chunk_id) for chunk_id in ids]
+
+    def count(self) -> int:
+        """Number of stored records"""
+        return len(self.docstore)
+
+    def iter_records(self, batch_size: int = 1024):
+        """Yield (ids, embeddings, documents, metadatas) batches with the full-precision vectors"""
+        if self._rows == 0:
+            return
+        alive = self._alive_rows()
+        vectors = self._full_vectors()
+        for start in range(0, len(alive), batch_size):
+            rows = alive[start:start + batch_size]
+            records = [self.docstore.get(self._row_labels[row]) for row in rows]
+            yield ([chunk_id for chunk_id, _, _ in records], np.array(vectors[rows]),
+                   [document for _, document, _ in records], [metadata for _, _, metadata in records])
+
+    ### Reporting
+
+    def memory_report(self) -> Dict[str, float]:
+        """Compare the in-RAM code size with storing full float32 vectors"""
+        count = self.count()
+        full_bytes = count * (self.dim or 0) * 4
+        code_bytes = count * self.quantizer.code_bytes if self.quantizer.fitted else full_bytes
+        return {
+            'documents': count,
+            'full_precision_bytes': full_bytes,
+            'code_bytes': code_bytes,
+            'bytes_saved': full_bytes - code_bytes,
+            'compression_ratio': full_bytes / code_bytes if code_bytes else 0.0,
+        }
+
+    def recall_at_k(self, query_embeddings: np.ndarray, top_k: int = 10) -> float:
+        """Fraction of the exact top_k neighbours that the two-phase search returns"""
+        truth = self.exact_search_rows(query_embeddings, top_k)
+        found = self.search(query_embeddings, top_k)
+        hits = 0
+        for rows, hits_for_query in zip(truth, found):
+            expected = {self.docstore.get(self._row_labels[row])[0] for row in rows}
+            hits += len(expected & {hit['id'] for hit in hits_for_query})
+        return hits / truth.size if truth.size else 0.0
+
+    ### Persistence
+
+    def _compact(self):
+        """Rewrite the vector file and codes without deleted rows"""
+        alive = self._alive_rows()
+        vectors = self._full_vectors()
+        tmp_path = self.vectors_path.with_suffix(".f32.tmp")
+        with open(tmp_path, 'wb') as file_obj:
+            for start in range(0, len(alive), self.block_size):
+                file_obj.write(np.ascontiguousarray(vectors[alive[start:start + self.block_size]]).tobytes())
+        self._vectors = None
+        os.replace(tmp_path, self.vectors_path)
+
+        if self._codes is not None:
+            self._codes = self._codes[alive]
+        self._row_labels = self._row_labels[alive]
+        self._label_rows = {int(label): row for row, label in enumerate(self._row_labels)}
+
+    def persist(self):
+        """
+        Write codes, quantizer, row mapping and documents next to the vector file
+
+        A store smaller than fit_size is persisted without codes (it is
+        searched exactly) rather than fitting the quantizer on a small sample.
+        """
+        if self.dim is None:
+            return
+        if self._rows - self.count() > 0.2 * max(self.count(), 1):
+            self._compact()
+
+        directory = Path(self.persist_directory)
+        if self.quantizer.fitted:
+            np.save(directory / "codes.npy", self._codes)
+            np.savez(directory / "quantizer.npz", **self.quantizer.state())
+        else:
+            for name in ("codes.npy", "quantizer.npz"):
+                (directory / name).unlink(missing_ok=True)
+        np.save(directory / "row_labels.npy", self._row_labels)
+        self.docstore.save(directory / "documents.jsonl")
+        settings = {'dim': self.dim, 'mode': self.quantizer.mode, 'pca_dim': self.quantizer.pca_dim,
+                    'fit_rows': self._fit_rows}
+        with open(directory / "store.json.tmp", 'w', encoding='utf-8') as file_obj:
+            json.dump(settings, file_obj)
+        os.replace(directory / "store.json.tmp", directory / "store.json")
+        print(f"Persisted compressed vector store with {self.count()} documents to {directory}")
+
+    def load(self):
+        """(Re)load the store from persist_directory"""
+        directory = Path(self.persist_directory)
+        with open(directory / "store.json", 'r', encoding='utf-8') as file_obj:
+            settings = json.load(file_obj)
+        if settings['mode'] != self.quantizer.mode or settings['pca_dim'] != self.quantizer.pca_dim:
+            raise ValueError(f"Store at {directory} uses {settings['mode']} codes with pca_dim={settings['pca_dim']}")
+
+        self.dim = settings['dim']
+        self._row_labels = np.load(directory / "row_labels.npy")
+        self.quantizer = EmbeddingQuantizer(self.quantizer.mode, self.quantizer.pca_dim)
+        self._codes = None
+        if (directory / "quantizer.npz").exists():
+            self._codes = np.load(directory / "codes.npy")
+            with np.load(directory / "quantizer.npz") as arrays:
+                self.quantizer.load_state(arrays)
+        # Stores written before fit_rows was recorded may have been fitted on a handful of vectors
+        self._fit_rows = settings.get('fit_rows', 0)
+        self.docstore = DocumentStore.load(directory / "documents.jsonl")
+        self._label_rows = {int(label): row for row, label in enumerate(self._row_labels) if label >= 0}
+        self._vectors = None
+
+        # Drop vectors appended after the last persist
+        persisted_bytes = self._rows * self.dim * 4
+        if self.vectors_path.stat().st_size > persisted_bytes:
+            with open(self.vectors_path, 'r+b') as file_obj:
+                file_obj.truncate(persisted_bytes)
+        self._maybe_fit()
@@ -0,0 +1,204 @@
+import re
+import math
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token for English text)"""
+    return math.ceil(len(text) / 4)
+
+
+class ContextBuilder:
+    """
+    Packs retrieved chunks into an LLM context under a token budget
+
+    Chunks of the same source_file and page whose start_index ranges overlap
+    or touch are merged into one span, so the chunk_overlap text is sent
+    once. Exact duplicates and near duplicates (word shingle Jaccard above a
+    threshold, or text contained in a span already kept) are dropped, and
+    the best-ranked spans are packed until the token budget is used up.
+    """
+
+    def __init__(self, token_budget: int = 1500, near_duplicate_threshold: float = 0.9, shingle_size: int = 3,
+                 token_counter: Optional[Callable[[str], int]] = None, separator: str = "\n\n"):
+        """
+        Initialize the builder
+
+        Args:
+            token_budget: Maximum context tokens
+            near_duplicate_threshold: Shingle Jaccard similarity at which a span counts as a duplicate
+            shingle_size: Words per shingle for near-duplicate detection
+            token_counter: Function counting the LLM tokens of a text (approximate_tokens by default)
+            separator: Text placed between spans
+        """
+        self.token_budget = token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.count_tokens = token_counter or approximate_tokens
+        self.separator = separator
+        self._lock = threading.Lock()
+        self.totals = {'contexts': 0, 'naive_tokens': 0, 'context_tokens': 0, 'tokens_saved': 0}
+
+    ### Span construction
+
+    @staticmethod
+    def _priority(doc: Dict[str, Any], position: int) -> float:
+        """Higher is better; falls back to retrieval order when no score is present"""
+        for key in ('fusion_score', 'similarity_score'):
+            if doc.get(key) is not None:
+                return float(doc[key])
+        return -float(position)
+
+    def _merge_spans(self, docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Merge overlapping or adjacent chunks of the same page
+
+        Returns:
+            Tuple of (spans with 'text', 'priority' and 'rank', number of chunks merged away)
+        """
+        spans, pages = [], {}
+        for position, doc in enumerate(docs):
+            metadata = doc.get('metadata') or {}
+            span = {'text': doc['content'], 'priority': self._priority(doc, position), 'rank': position}
+            start = metadata.get('start_index')
+            if start is None or start < 0 or 'source_file' not in metadata:
+                spans.append(span)
+                continue
+            span['start'] = int(start)
+            span['end'] = int(start) + len(doc['content'])
+            pages.setdefault((metadata['source_file'], metadata.get('page')), []).append(span)
+
+        merged_away = 0
+        for page_spans in pages.values():
+            page_spans.sort(key=lambda span: (span['start'], -span['end']))
+            current = page_spans[0]
+            for span in page_spans[1:]:
+                if span['start'] <= current['end'] and self._consistent(current, span):
+                    if span['end'] > current['end']:
+                        current['text'] += span['text'][current['end'] - span['start']:]
+                        current['end'] = span['end']
+                    current['priority'] = max(current['priority'], span['priority'])
+                    current['rank'] = min(current['rank'], span['rank'])
+                    merged_away += 1
+                else:
+                    spans.append(current)
+                    current = span
+            spans.append(current)
+        return spans, merged_away
+
+    @staticmethod
+    def _consistent(current: Dict[str, Any], span: Dict[str, Any]) -> bool:
+        """Check that the shared offsets really hold the same text before merging"""
+        overlap = min(current['end'], span['end']) - span['start']
+        offset = span['start'] - current['start']
+        return current['text'][offset:offset + overlap] == span['text'][:overlap]
+
+    ### Deduplication
+
+    def _shingles(self, text: str) -> frozenset:
+        words = WORD_PATTERN.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return frozenset([" ".join(words)])
+        return frozenset(" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1))
+
+    def _drop_duplicates(self, spans: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Keep the best-ranked copy of exact and near-duplicate spans"""
+        kept, fingerprints, shingles = [], set(), []
+        dropped = 0
+        for span in sorted(spans, key=lambda span: (-span['priority'], span['rank'])):
+            normalized = " ".join(span['text'].split()).lower()
+            if not normalized:
+                dropped += 1
+                continue
+            fingerprint = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+            span_shingles = self._shingles(normalized)
+            if fingerprint in fingerprints or any(self._is_near_duplicate(span_shingles, kept_shingles)
+                                                  for kept_shingles in shingles):
+                dropped += 1
+                continue
+            fingerprints.add(fingerprint)
+            shingles.append(span_shingles)
+            kept.append(span)
+        return kept, dropped
+
+    def _is_near_duplicate(self, span_shingles: frozenset, kept_shingles: frozenset) -> bool:
+        shared = len(span_shingles & kept_shingles)
+        if not shared:
+            return False
+        # A span whose shingles all occur in a kept span adds nothing new
+        if shared == len(span_shingles):
+            return True
+        return shared / len(span_shingles | kept_shingles) >= self.near_duplicate_threshold
+
+    ### Packing
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """Cut a text on a word boundary so it fits the token budget"""
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        cut = text[:low]
+        return cut[:cut.rfind(" ")] if " " in cut and low < len(text) else cut
+
+    def build(self, docs: List[Dict[str, Any]]) -> Tuple[str, Dict[str, int]]:
+        """
+        Build the context for a list of retrieved documents
+
+        Args:
+            docs: Retrieved documents ({'content', 'metadata', optional scores}), best first
+
+        Returns:
+            Tuple of (context string, stats dict with naive_tokens, context_tokens,
+            tokens_saved, merged_chunks, duplicates_dropped and spans_dropped)
+        """
+        docs = [doc for doc in docs if doc.get('content')]
+        naive_tokens = self.count_tokens(self.separator.join(doc['content'] for doc in docs)) if docs else 0
+
+        spans, merged = self._merge_spans(docs)
+        spans, duplicates = self._drop_duplicates(spans)
+
+        packed, used, dropped = [], 0, 0
+        separator_tokens = self.count_tokens(self.separator)
+        for span in spans:
+            cost = self.count_tokens(span['text']) + (separator_tokens if packed else 0)
+            if used + cost <= self.token_budget:
+                packed.append(span['text'])
+                used += cost
+            elif not packed:
+                # Never return an empty context because the best span alone is too long
+                packed.append(self._truncate(span['text'], self.token_budget))
+                used = self.count_tokens(packed[0])
+            else:
+                dropped += 1
+
+        context = self.separator.join(packed)
+        context_tokens = self.count_tokens(context) if context else 0
+        stats = {
+            'chunks': len(docs),
+            'merged_chunks': merged,
+            'duplicates_dropped': duplicates,
+            'spans_dropped': dropped,
+            'naive_tokens': naive_tokens,
+            'context_tokens': context_tokens,
+            'tokens_saved': max(naive_tokens - context_tokens, 0),
+        }
+        with self._lock:
+            self.totals['contexts'] += 1
+            for key in ('naive_tokens', 'context_tokens', 'tokens_saved'):
+                self.totals[key] += stats[key]
+        return context, stats
+
+    def stats(self) -> Dict[str, float]:
+        """Return cumulative token counters and the fraction of prompt tokens saved"""
+        with self._lock:
+            stats = dict(self.totals)
+        stats['saved_ratio'] = stats['tokens_saved'] / stats['naive_tokens'] if stats['naive_tokens'] else 0.0
+        return stats
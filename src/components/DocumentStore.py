@@ -0,0 +1,95 @@
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class DocumentStore:
+    """
+    Sidecar store of documents and metadata for index-only vector backends
+
+    Records are addressed by a dense integer label (what the ANN index
+    stores) and by their string chunk ID. Labels are never reused, so a
+    stale label left in an index simply no longer resolves.
+    """
+
+    def __init__(self):
+        self.records: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+        self.labels: Dict[str, int] = {}
+        self.next_label = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.labels
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> List[int]:
+        """Register new records and return the labels assigned to them"""
+        assigned = []
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            if chunk_id in self.labels:
+                raise ValueError(f"Duplicate document ID: {chunk_id}")
+            label = self.next_label
+            self.next_label += 1
+            self.records[label] = (chunk_id, document, dict(metadata or {}))
+            self.labels[chunk_id] = label
+            assigned.append(label)
+        return assigned
+
+    def remove(self, ids: Iterable[str]) -> List[int]:
+        """Forget records by chunk ID and return their labels"""
+        removed = []
+        for chunk_id in ids:
+            label = self.labels.pop(chunk_id, None)
+            if label is not None:
+                del self.records[label]
+                removed.append(label)
+        return removed
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing records (unknown IDs are ignored)"""
+        for chunk_id, metadata in zip(ids, metadatas):
+            label = self.labels.get(chunk_id)
+            if label is not None:
+                stored_id, document, _ = self.records[label]
+                self.records[label] = (stored_id, document, dict(metadata or {}))
+
+    def get(self, label: int) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Return (chunk_id, document, metadata) for a label, or None if it was removed"""
+        return self.records.get(int(label))
+
+    def record(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Return {'id', 'content', 'metadata'} for a chunk ID, or None"""
+        label = self.labels.get(chunk_id)
+        if label is None:
+            return None
+        _, document, metadata = self.records[label]
+        return {'id': chunk_id, 'content': document, 'metadata': metadata}
+
+    def label_of(self, chunk_id: str) -> Optional[int]:
+        """Return the label of a chunk ID, or None"""
+        return self.labels.get(chunk_id)
+
+    def save(self, file_path):
+        """Write the store as JSON lines (atomically)"""
+        file_path = Path(file_path)
+        os.makedirs(file_path.parent, exist_ok=True)
+        tmp_path = file_path.with_suffix(file_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file_obj:
+            file_obj.write(json.dumps({'next_label': self.next_label}) + "\n")
+            for label, (chunk_id, document, metadata) in self.records.items():
+                file_obj.write(json.dumps([label, chunk_id, document, metadata]) + "\n")
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path) -> "DocumentStore":
+        """Read a store written by save"""
+        store = cls()
+        with open(file_path, 'r', encoding='utf-8') as file_obj:
+            store.next_label = json.loads(file_obj.readline())['next_label']
+            for line in file_obj:
+                label, chunk_id, document, metadata = json.loads(line)
+                store.records[label] = (chunk_id, document, metadata)
+                store.labels[chunk_id] = label
+        return store
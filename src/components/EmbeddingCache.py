@@ -0,0 +1,240 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def text_key(model_name: str, text: str) -> str:
+    """Return the cache key for a text embedded with a given model"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk embedding store: SQLite key index plus a memory-mapped float32 array
+
+    Several processes may share a cache directory (e.g. the app and an
+    ingestion run). Writers serialize on SQLite's write lock: under it the
+    next free row is read from the index, the block is written at that
+    row's offset and fsynced, and only then are its keys committed, so a
+    committed row always points at a complete vector.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int):
+        """
+        Open (or create) the disk store for one model
+
+        Args:
+            cache_dir: Root directory of the embedding cache
+            model_name: Embedding model name, each model gets its own subdirectory
+            dim: Embedding dimension
+        """
+        self.dim = dim
+        self.directory = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self._lock = threading.Lock()
+        self._vectors = None
+
+        self._conn = sqlite3.connect(str(self.directory / "index.sqlite"), timeout=60, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        stored_dim = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        if stored_dim is None:
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (str(dim),))
+            self._conn.commit()
+        elif int(stored_dim[0]) != dim:
+            raise ValueError(f"Embedding cache at {self.directory} has dimension {stored_dim[0]}, expected {dim}")
+
+        # Drop rows written past the last committed index entry (a crash can leave a torn, unaligned tail)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.vectors_path.exists():
+                with open(self.vectors_path, 'r+b') as file_obj:
+                    file_obj.truncate(self._committed_rows() * 4 * self.dim)
+        finally:
+            self._conn.commit()
+
+    def _committed_rows(self) -> int:
+        """Rows referenced by the index (the next free row)"""
+        rows = self._conn.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()
+        if rows is not None:
+            return int(rows[0])
+        # Stores written before the row count was kept in meta
+        return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+
+    def _mapped(self, max_row: int) -> np.ndarray:
+        """Return a read-only memory map covering at least max_row + 1 rows"""
+        if self._vectors is None or self._vectors.shape[0] <= max_row:
+            rows = self.vectors_path.stat().st_size // (4 * self.dim)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        return self._vectors
+
+    def _rows_for(self, keys: List[str]) -> Dict[str, int]:
+        """Return {key: row} for the keys present in the index"""
+        found = {}
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(self._conn.execute(
+                f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", part).fetchall())
+        return found
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the stored embeddings for whichever keys are present"""
+        if not keys:
+            return {}
+        with self._lock:
+            found = self._rows_for(keys)
+            if not found:
+                return {}
+            vectors = self._mapped(max(found.values()))
+            return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def put_many(self, keys: List[str], embeddings: np.ndarray):
+        """Append embeddings for keys that are not stored yet"""
+        with self._lock:
+            new = {}
+            for key, embedding in zip(keys, embeddings):
+                if key not in new:
+                    new[key] = embedding
+
+            # The write lock is held from reading the next free row until its keys are committed
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._rows_for(list(new))
+                new = {key: embedding for key, embedding in new.items() if key not in existing}
+                if not new:
+                    self._conn.rollback()
+                    return
+
+                block = np.ascontiguousarray(np.stack(list(new.values())), dtype=np.float32)
+                first_row = self._committed_rows()
+                descriptor = os.open(self.vectors_path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    os.pwrite(descriptor, block.tobytes(), first_row * 4 * self.dim)
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+
+                self._conn.executemany(
+                    "INSERT INTO embeddings (key, row) VALUES (?, ?)",
+                    [(key, first_row + offset) for offset, key in enumerate(new)])
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('rows', ?)",
+                                   (str(first_row + len(new)),))
+            except BaseException:
+                self._conn.rollback()
+                raise
+            else:
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """Close the SQLite index"""
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (model_name, text hash)"""
+
+    def __init__(self, model_name: str, dim: int, cache_dir: Optional[str] = None, lru_size: int = 1024):
+        """
+        Initialize the cache
+
+        Args:
+            model_name: Embedding model name, part of every cache key
+            dim: Embedding dimension
+            cache_dir: Directory of the persistent tier (memory only if None)
+            lru_size: Maximum number of embeddings kept in the in-process LRU
+        """
+        self.model_name = model_name
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskEmbeddingStore(cache_dir, model_name, dim) if cache_dir else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        """Insert into the LRU, evicting the least recently used entries"""
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def lookup(self, texts: List[str]):
+        """
+        Look up cached embeddings for texts
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            Tuple of (list with an embedding or None per text, list of cache keys)
+        """
+        keys = [text_key(self.model_name, text) for text in texts]
+        results = [None] * len(texts)
+        disk_keys = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._lru.get(key)
+                if embedding is not None:
+                    self._lru.move_to_end(key)
+                    results[i] = embedding
+                    self.memory_hits += 1
+                else:
+                    disk_keys.append(key)
+
+        if disk_keys and self.disk is not None:
+            found = self.disk.get_many(disk_keys)
+            with self._lock:
+                for i, key in enumerate(keys):
+                    if results[i] is None and key in found:
+                        results[i] = found[key]
+                        self._remember(key, found[key])
+                        self.disk_hits += 1
+
+        with self._lock:
+            self.misses += sum(1 for embedding in results if embedding is None)
+        return results, keys
+
+    def store(self, keys: List[str], embeddings: np.ndarray, persist: bool = True):
+        """
+        Store freshly computed embeddings
+
+        Args:
+            keys: Cache keys returned by lookup
+            embeddings: Embeddings with one row per key
+            persist: Also write to the disk tier (if configured)
+        """
+        with self._lock:
+            for key, embedding in zip(keys, embeddings):
+                self._remember(key, embedding)
+        if persist and self.disk is not None and len(keys):
+            self.disk.put_many(keys, embeddings)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._lru),
+            }
+        stats['disk_entries'] = len(self.disk) if self.disk is not None else 0
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -1,29 +1,71 @@
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import chromadb
-import torch
-from typing import List
+from typing import List,Optional,Dict
+from src.components.EmbeddingCache import EmbeddingCache
+
+DEFAULT_MODEL_NAME="sentence-transformers/all-MiniLM-L6-v2"
 
 class EmbeddingManager:
     """Handles document embedding generation using Sentence Transformer"""
 
-    def __init__(self,model_name:str="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self,model_name:str=DEFAULT_MODEL_NAME,cache_dir:Optional[str]=None,cache_size:int=1024,
+                 bucketed:bool=False,token_budget:int=16384,quantize:bool=False,output_dtype:str="float32",normalize:bool=False,
+                 show_progress_bar:bool=False):
         """ 
         Initialize the embedding manager
         Args:
             model_name: HuggingFace model name for sentence embeddings
+            cache_dir: Directory for the persistent embedding cache (in-memory only if None)
+            cache_size: Number of embeddings kept in the in-process LRU (0 disables caching)
+            bucketed: Encode with length-sorted, token-budgeted batches (see encode_bucketed)
+            token_budget: Maximum padded tokens per batch in bucketed mode
+            quantize: Apply int8 dynamic quantization to the model's linear layers (CPU only)
+            output_dtype: "float32" or "float16" for the returned embeddings
+            normalize: Return L2-normalized embeddings
+            show_progress_bar: Show a progress bar while encoding (for bulk ingestion, not queries)
             """
+        if output_dtype not in ("float32","float16"):
+            raise ValueError(f"Unsupported output dtype: {output_dtype}")
+
         self.model_name=model_name
         self.model=None
+        self.cache=None
+        self.bucketed=bucketed
+        self.token_budget=token_budget
+        self.quantize=quantize
+        self.output_dtype=np.dtype(output_dtype)
+        self.normalize=normalize
+        self.show_progress_bar=show_progress_bar
         self._load_model()
 
+        if cache_size > 0 or cache_dir:
+            # Quantized or normalized vectors differ from the plain model's, so they get their own namespace
+            cache_namespace=self.model_name+("|int8" if self.quantized else "")+("|normalized" if normalize else "")
+            self.cache=EmbeddingCache(
+                model_name=cache_namespace,
+                dim=self.model.get_sentence_embedding_dimension(),
+                cache_dir=cache_dir,
+                lru_size=cache_size
+            )
+
     def _load_model(self):
         """Load the SentenceTransformer model"""
 
+        # torch and sentence_transformers take seconds to import, so only pay for them when a model is built
+        import torch
+        from sentence_transformers import SentenceTransformer
+
         try:
             print(f"Loading embedding model: {self.model_name}")
             device = "cuda" if torch.cuda.is_available() else "cpu"
             self.model=SentenceTransformer(self.model_name,device=device)
+            self.quantized=False
+            if self.quantize:
+                if device == "cpu":
+                    self.model=torch.quantization.quantize_dynamic(self.model,{torch.nn.Linear},dtype=torch.qint8)
+                    self.quantized=True
+                    print("Applied int8 dynamic quantization to the embedding model")
+                else:
+                    print("Skipping int8 quantization: only supported on CPU")
             print(f"Model loaded successfully. Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
         except Exception as e:
             print(f"Error loading model {self.model_name}: {e}")
@@ -34,6 +76,8 @@ class EmbeddingManager:
         """ 
         Generate embeddings for a list of texts
 
+        Cached embeddings are reused, only cache misses are sent to the model.
+
         Args:
             texts: List of text strings to embed
 
@@ -45,7 +89,92 @@ class EmbeddingManager:
         if not self.model:
             raise ValueError("Model not loaded.")
         
-        print(f"Generate embeddings for {len(texts)} texts...")
-        embeddings=self.model.encode(texts,show_progress_bar=True)
-        print(f"Generated embeddings with shape: {embeddings.shape}")
+        if self.cache is None:
+            return self._encode(texts).astype(self.output_dtype,copy=False)
+
+        cached,keys=self.cache.lookup(texts)
+        missing=[i for i,embedding in enumerate(cached) if embedding is None]
+
+        if missing:
+            # Encode each distinct missing text once
+            unique_texts={}
+            for i in missing:
+                unique_texts.setdefault(texts[i],keys[i])
+            new_embeddings=self._encode(list(unique_texts))
+            self.cache.store(list(unique_texts.values()),new_embeddings)
+            by_text=dict(zip(unique_texts,new_embeddings))
+            for i in missing:
+                cached[i]=by_text[texts[i]]
+
+        if not cached:
+            return np.zeros((0,self.model.get_sentence_embedding_dimension()),dtype=self.output_dtype)
+        return np.stack(cached).astype(self.output_dtype,copy=False)
+
+    def _encode(self,texts:List[str]) ->np.ndarray:
+        """Run the model on texts, returning float32 embeddings"""
+        if self.bucketed:
+            return self.encode_bucketed(texts)
+
+        return self.model.encode(texts,show_progress_bar=self.show_progress_bar,normalize_embeddings=self.normalize)
+
+    def token_lengths(self,texts:List[str]) ->np.ndarray:
+        """Return the number of tokens the model will see for each text (after truncation)"""
+        encoded=self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )
+        return np.fromiter((len(ids) for ids in encoded['input_ids']),dtype=np.int64,count=len(texts))
+
+    def encode_bucketed(self,texts:List[str],token_budget:Optional[int]=None,max_batch_size:int=256) ->np.ndarray:
+        """ 
+        Encode texts in length-sorted batches capped by a padded-token budget
+
+        Texts are sorted by token length (longest first) so each batch pads to
+        a similar length, and a batch grows only while batch_size * longest_length
+        stays within the budget. Embeddings are returned in the input order.
+
+        Args:
+            texts: List of text strings to embed
+            token_budget: Maximum padded tokens per batch (defaults to self.token_budget)
+            max_batch_size: Upper bound on texts per batch
+
+        Returns:
+            float32 numpy array of embeddings with shape (len(texts),embedding_dim)
+        """
+        dim=self.model.get_sentence_embedding_dimension()
+        if not texts:
+            return np.zeros((0,dim),dtype=np.float32)
+
+        token_budget=token_budget or self.token_budget
+        lengths=self.token_lengths(texts)
+        order=np.argsort(-lengths,kind='stable')
+        embeddings=np.empty((len(texts),dim),dtype=np.float32)
+
+        start=0
+        while start < len(order):
+            # Sorted longest first, so the first text of a batch sets its padded length
+            longest=max(int(lengths[order[start]]),1)
+            size=max(1,min(max_batch_size,token_budget//longest))
+            batch_idx=order[start:start+size]
+            embeddings[batch_idx]=self.model.encode(
+                [texts[i] for i in batch_idx],
+                batch_size=len(batch_idx),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize
+            )
+            start+=size
+
         return embeddings
+
+    def warm_up(self):
+        """Run one forward pass so the first real query does not pay for lazy model initialization"""
+        self._encode(["warm up"])
+
+    def cache_stats(self) ->Dict[str,float]:
+        """Return embedding cache hit/miss counters"""
+        return self.cache.stats() if self.cache is not None else {}
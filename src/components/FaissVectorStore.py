@@ -0,0 +1,279 @@
+import os
+import json
+import faiss
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.components.BaseVectorStore import BaseVectorStore, matches_where
+from src.components.DocumentStore import DocumentStore
+
+
+class FaissVectorStore(BaseVectorStore):
+    """Manages document embeddings in a FAISS index with a sidecar document store"""
+
+    INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+
+    def __init__(self, persist_directory: str = "../data/faiss_store", index_type: str = "flat", dim: Optional[int] = None,
+                 nlist: int = 256, pq_m: int = 16, pq_nbits: int = 8, nprobe: int = 16,
+                 hnsw_m: int = 32, ef_construction: int = 200, ef_search: int = 64):
+        """
+        Initialize the vector store, loading it from persist_directory if it exists
+
+        Args:
+            persist_directory: Directory holding the index and its sidecar files
+            index_type: "flat" (exact), "ivfpq" (inverted lists + product quantization) or "hnsw" (graph)
+            dim: Embedding dimension (inferred from the first add if None)
+            nlist: Number of IVF lists
+            pq_m: Number of PQ sub-quantizers (rounded down to a divisor of dim)
+            pq_nbits: Bits per PQ code
+            nprobe: IVF lists visited per query
+            hnsw_m: HNSW graph degree
+            ef_construction: HNSW build-time candidate list size
+            ef_search: HNSW query-time candidate list size
+        """
+        index_type = index_type.lower()
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}, expected one of {self.INDEX_TYPES}")
+
+        self.persist_directory = persist_directory
+        self.index_type = index_type
+        self.dim = dim
+        self.params = {
+            'nlist': nlist, 'pq_m': pq_m, 'pq_nbits': pq_nbits, 'nprobe': nprobe,
+            'hnsw_m': hnsw_m, 'ef_construction': ef_construction, 'ef_search': ef_search,
+        }
+        self.index = None
+        self.docstore = DocumentStore()
+        # Labels deleted from the docstore but still present in an index that cannot remove them (HNSW)
+        self._tombstones = 0
+
+        if (Path(persist_directory) / "store.json").exists():
+            self.load()
+        print(f"FAISS vector store initialized ({self.index_type}). Existing documents: {self.count()}")
+
+    ### Index construction
+
+    @property
+    def _train_size(self) -> int:
+        """Vectors collected in an exact staging index before IVF-PQ is trained"""
+        return 39 * max(self.params['nlist'], 2 ** self.params['pq_nbits'])
+
+    def _new_index(self):
+        """Create an empty index that can accept vectors right away"""
+        if self.index_type == "hnsw":
+            graph = faiss.IndexHNSWFlat(self.dim, self.params['hnsw_m'], faiss.METRIC_INNER_PRODUCT)
+            graph.hnsw.efConstruction = self.params['ef_construction']
+            return faiss.IndexIDMap2(graph)
+        # IVF-PQ needs training data, so it starts out as an exact index (see _maybe_train)
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    def _is_trained_ivf(self) -> bool:
+        return isinstance(self.index, faiss.IndexIVFPQ)
+
+    def _maybe_train(self):
+        """Replace the staging index by a trained IVF-PQ index once enough vectors exist"""
+        if self.index_type != "ivfpq" or self._is_trained_ivf() or self.index.ntotal < self._train_size:
+            return
+
+        flat = faiss.downcast_index(self.index.index)
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+        labels = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+
+        pq_m = max(m for m in range(1, min(self.params['pq_m'], self.dim) + 1) if self.dim % m == 0)
+        quantizer = faiss.IndexFlatIP(self.dim)
+        index = faiss.IndexIVFPQ(quantizer, self.dim, self.params['nlist'], pq_m,
+                                 self.params['pq_nbits'], faiss.METRIC_INNER_PRODUCT)
+        print(f"Training IVF-PQ index (nlist={self.params['nlist']}, m={pq_m}) on {len(vectors)} vectors")
+        index.train(vectors)
+        index.add_with_ids(vectors, labels)
+        # Labels are not sequential, so reconstruct() needs a hashed direct map
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        self._quantizer = quantizer
+        self.index = index
+        self._apply_search_params()
+
+    def _apply_search_params(self):
+        """Set query-time parameters on the active index"""
+        if self._is_trained_ivf():
+            self.index.nprobe = self.params['nprobe']
+        elif self.index_type == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.params['ef_search']
+
+    def _compact(self):
+        """Rebuild an HNSW index without the vectors of deleted documents"""
+        labels = np.fromiter(self.docstore.records.keys(), dtype=np.int64, count=len(self.docstore))
+        vectors = np.vstack([self.index.reconstruct(int(label)) for label in labels]) if len(labels) \
+            else np.zeros((0, self.dim), dtype=np.float32)
+        self.index = self._new_index()
+        if len(labels):
+            self.index.add_with_ids(vectors, labels)
+        self._tombstones = 0
+        self._apply_search_params()
+
+    @staticmethod
+    def _normalize(embeddings: np.ndarray) -> np.ndarray:
+        """Return float32 unit vectors so inner product equals cosine similarity"""
+        vectors = np.array(embeddings, dtype=np.float32, order='C', ndmin=2)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    ### BaseVectorStore interface
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert new records (IDs must not exist yet)"""
+        if len(ids) == 0:
+            return
+        vectors = self._normalize(embeddings)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+        if self.index is None:
+            self.index = self._new_index()
+            self._apply_search_params()
+
+        labels = self.docstore.add(ids, documents, metadatas)
+        self.index.add_with_ids(vectors, np.asarray(labels, dtype=np.int64))
+        self._maybe_train()
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert records, replacing existing records with the same ID"""
+        # If an ID repeats within the batch, the last occurrence wins
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.delete([chunk_id for chunk_id in last if chunk_id in self.docstore])
+        if len(last) == len(ids):
+            # No repeated IDs: pass the batch through instead of gathering a copy of it
+            self.add(ids, embeddings, documents, metadatas)
+            return
+        keep = sorted(last.values())
+        self.add([ids[i] for i in keep], np.asarray(embeddings)[keep],
+                 [documents[i] for i in keep], [metadatas[i] for i in keep])
+
+    def delete(self, ids: List[str]):
+        """Delete records by ID (unknown IDs are ignored)"""
+        labels = self.docstore.remove(ids)
+        if not labels:
+            return
+        if self.index_type == "hnsw":
+            # HNSW graphs cannot drop nodes; deleted labels stop resolving and are compacted on persist
+            self._tombstones += len(labels)
+        else:
+            self.index.remove_ids(np.asarray(labels, dtype=np.int64))
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing records"""
+        self.docstore.update_metadata(ids, metadatas)
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Find the nearest records for each query embedding
+
+        Deleted (tombstoned) labels and records rejected by the where filter
+        are skipped; queries that end up short of top_k are re-searched with
+        a larger candidate count until the whole index has been considered.
+
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return each hit's vector under 'embedding'
+                (reconstructed from the PQ codes once IVF-PQ is trained)
+
+        Returns:
+            One list of {'id','content','metadata','distance'} hits per query
+        """
+        queries = self._normalize(query_embeddings)
+        results = [[] for _ in range(len(queries))]
+        if self.index is None or self.count() == 0 or top_k <= 0:
+            return results
+
+        ntotal = self.index.ntotal
+        fetch = min(ntotal, (top_k * 4 if where else top_k) + self._tombstones)
+        pending = list(range(len(queries)))
+
+        while pending:
+            scores, labels = self.index.search(queries[pending], fetch)
+            short = []
+            for row, query_index in enumerate(pending):
+                hits = []
+                for score, label in zip(scores[row], labels[row]):
+                    if label < 0:
+                        continue
+                    record = self.docstore.get(label)
+                    if record is None:
+                        continue
+                    chunk_id, document, metadata = record
+                    if where and not matches_where(metadata, where):
+                        continue
+                    hits.append({'id': chunk_id, 'content': document, 'metadata': metadata,
+                                 'distance': 1.0 - float(score)})
+                    if include_embeddings:
+                        hits[-1]['embedding'] = self.index.reconstruct(int(label))
+                    if len(hits) == top_k:
+                        break
+
+                results[query_index] = hits
+                if len(hits) < top_k and fetch < ntotal:
+                    short.append(query_index)
+
+            pending = short
+            fetch = min(ntotal, fetch * 4)
+
+        return results
+
+    def get(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch records by ID (None for unknown IDs)"""
+        return [self.docstore.record(chunk_id) for chunk_id in ids]
+
+    def count(self) -> int:
+        """Number of stored records"""
+        return len(self.docstore)
+
+    def iter_records(self, batch_size: int = 1024):
+        """Yield (ids, embeddings, documents, metadatas) batches (vectors are PQ reconstructions once trained)"""
+        labels = list(self.docstore.records)
+        for start in range(0, len(labels), batch_size):
+            batch = labels[start:start + batch_size]
+            records = [self.docstore.get(label) for label in batch]
+            yield ([chunk_id for chunk_id, _, _ in records],
+                   np.vstack([self.index.reconstruct(int(label)) for label in batch]),
+                   [document for _, document, _ in records], [metadata for _, _, metadata in records])
+
+    def persist(self):
+        """Write the index, the document sidecar and the store settings to disk"""
+        if self.index is None:
+            return
+        if self._tombstones and self._tombstones > 0.2 * max(self.count(), 1):
+            self._compact()
+
+        directory = Path(self.persist_directory)
+        os.makedirs(directory, exist_ok=True)
+        faiss.write_index(self.index, str(directory / "index.faiss.tmp"))
+        os.replace(directory / "index.faiss.tmp", directory / "index.faiss")
+        self.docstore.save(directory / "documents.jsonl")
+
+        settings = {'index_type': self.index_type, 'dim': self.dim, 'params': self.params}
+        with open(directory / "store.json.tmp", 'w', encoding='utf-8') as file_obj:
+            json.dump(settings, file_obj)
+        os.replace(directory / "store.json.tmp", directory / "store.json")
+        print(f"Persisted FAISS vector store with {self.count()} documents to {directory}")
+
+    def load(self):
+        """(Re)load the store from persist_directory"""
+        directory = Path(self.persist_directory)
+        with open(directory / "store.json", 'r', encoding='utf-8') as file_obj:
+            settings = json.load(file_obj)
+        if settings['index_type'] != self.index_type:
+            raise ValueError(f"Store at {directory} holds a {settings['index_type']} index, not {self.index_type}")
+
+        self.dim = settings['dim']
+        # Structural parameters come from disk, query-time ones stay as configured
+        for name in ('nlist', 'pq_m', 'pq_nbits', 'hnsw_m', 'ef_construction'):
+            self.params[name] = settings['params'][name]
+        self.index = faiss.read_index(str(directory / "index.faiss"))
+        self.docstore = DocumentStore.load(directory / "documents.jsonl")
+        self._tombstones = max(0, self.index.ntotal - self.count())
+        if self._is_trained_ivf():
+            self.index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        self._apply_search_params()
@@ -1,48 +1,91 @@
 import os
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage, SystemMessage
+from typing import Any, AsyncIterator, Dict, Iterator, List, Union
+from src.components.ContextBuilder import ContextBuilder
+from src.components.IngestionManifest import content_hash
+from src.components.LLMGateway import llm_gateway_from_env
+from src.pipeline import build_context, track_stream, atrack_stream
+from src.instrumentation import metrics
 
 load_dotenv()
 
 class GroqLLM:
-    def __init__(self, model_name: str = "gemma2-9b-it", api_key: str =None):
+    def __init__(self, model_name: str = "gemma2-9b-it", api_key: str =None, cache=None, embedding_manager=None,
+                 context_builder: ContextBuilder = None):
         """
         Initialize Groq LLM
         
         Args:
             model_name: Groq model name (qwen2-72b-instruct, llama3-70b-8192, etc.)
             api_key: Groq API key (or set GROQ_API_KEY environment variable)
+            cache: Optional SemanticCache consulted before calling Groq
+            embedding_manager: EmbeddingManager used to embed queries for the cache
+            context_builder: ContextBuilder packing the context into a token budget
         """
+        if cache is not None and embedding_manager is None:
+            raise ValueError("A semantic cache needs an embedding_manager to embed queries.")
+
         self.model_name = model_name
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.cache = cache
+        self.embedding_manager = embedding_manager
+        self.context_builder = context_builder or ContextBuilder()
         
         if not self.api_key:
             raise ValueError("Groq API key is required. Set GROQ_API_KEY environment variable or pass api_key parameter.")
         
-        self.llm = ChatGroq(
-            groq_api_key=self.api_key,
-            model_name=self.model_name,
-            temperature=0.1,
-            max_tokens=1024
-        )
+        # Pooled, rate-limited and retried calls (LLM_* environment variables tune the limits)
+        self.llm = llm_gateway_from_env(self.model_name, api_key=self.api_key, temperature=0.1, max_tokens=1024)
         
         print(f"Initialized Groq LLM with model: {self.model_name}")
 
-    def generate_response(self, query: str, context: str, max_length: int = 500) -> str:
+    def _build_context(self, context: Union[str, List[Dict[str, Any]]]) -> str:
+        """Pack retrieved documents (or a pre-joined context string) with the context builder"""
+        if isinstance(context, str):
+            # Without offsets only duplicate paragraphs and the token budget apply
+            context = [{'content': part, 'metadata': {}} for part in context.split("\n\n")]
+        return build_context(context, self.context_builder)
+
+    def generate_response(self, query: str, context: Union[str, List[Dict[str, Any]]], max_length: int = 500) -> str:
         """
         Generate response using retrieved context
         
         Args:
             query: User question
-            context: Retrieved document context
+            context: Retrieved documents (as returned by RAGRetriever) or a context string
             max_length: Maximum response length
             
         Returns:
             Generated response string
+
+        Raises:
+            LLMError: If the LLM call failed after its retries
         """
         
+        context = self._build_context(context)
+        formatted_prompt = self._format_prompt(query, context)
+        
+        # Reuse the answer of a near-identical question over the same context
+        if self.cache is not None:
+            query_embedding = self.embedding_manager.generate_embeddings([query])[0]
+            context_ids = [content_hash(context)]
+            cached_answer = self.cache.lookup(query_embedding, context_ids)
+            if cached_answer is not None:
+                metrics.increment("answer_cache_hits_total")
+                return cached_answer
+        
+        # Generate response
+        messages = [HumanMessage(content=formatted_prompt)]
+        with metrics.span("llm", model=self.model_name):
+            response = self.llm.invoke(messages)
+        if self.cache is not None:
+            self.cache.store(query_embedding, context_ids, response.content)
+        return response.content
+        
+    def _format_prompt(self, query: str, context: str) -> str:
+        """Build the RAG prompt for a question and its context"""
         # Create prompt template
         prompt_template = PromptTemplate(
             input_variables=["context", "question"],
@@ -56,17 +99,44 @@ Question: {question}
 Answer: Provide a clear and informative answer based on the context above. If the context doesn't contain enough information to answer the question, say so."""
         )
         
-        # Format the prompt
-        formatted_prompt = prompt_template.format(context=context, question=query)
+        return prompt_template.format(context=context, question=query)
+
+    def generate_response_stream(self, query: str, context: Union[str, List[Dict[str, Any]]],
+                                 timings: dict = None) -> Iterator[str]:
+        """
+        Stream the response token by token
         
-        try:
-            # Generate response
-            messages = [HumanMessage(content=formatted_prompt)]
-            response = self.llm.invoke(messages)
-            return response.content
+        Args:
+            query: User question
+            context: Retrieved documents (as returned by RAGRetriever) or a context string
+            timings: Optional dict receiving 'ttft_s' and 'total_s'
             
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+        Yields:
+            Response text fragments as the model produces them
+        """
+        messages = [HumanMessage(content=self._format_prompt(query, self._build_context(context)))]
+        tokens = (chunk.content for chunk in self.llm.stream(messages))
+        with metrics.span("llm", model=self.model_name, streamed=True):
+            yield from track_stream(tokens, timings)
+
+    async def agenerate_response_stream(self, query: str, context: Union[str, List[Dict[str, Any]]],
+                                        timings: dict = None) -> AsyncIterator[str]:
+        """
+        Async variant of generate_response_stream
+        
+        Args:
+            query: User question
+            context: Retrieved documents (as returned by RAGRetriever) or a context string
+            timings: Optional dict receiving 'ttft_s' and 'total_s'
+            
+        Yields:
+            Response text fragments as the model produces them
+        """
+        messages = [HumanMessage(content=self._format_prompt(query, self._build_context(context)))]
+        tokens = (chunk.content async for chunk in self.llm.astream(messages))
+        with metrics.span("llm", model=self.model_name, streamed=True):
+            async for token in atrack_stream(tokens, timings):
+                yield token
         
     def generate_response_simple(self, query: str, context: str) -> str:
         """
@@ -78,6 +148,9 @@ Answer: Provide a clear and informative answer based on the context above. If th
             
         Returns:
             Generated response
+
+        Raises:
+            LLMError: If the LLM call failed after its retries
         """
         simple_prompt = f"""Based on this context: {context}
 
@@ -85,9 +158,7 @@ Question: {query}
 
 Answer:"""
         
-        try:
-            messages = [HumanMessage(content=simple_prompt)]
+        messages = [HumanMessage(content=simple_prompt)]
+        with metrics.span("llm", model=self.model_name):
             response = self.llm.invoke(messages)
-            return response.content
-        except Exception as e:
-            return f"Error: {str(e)}"
\ No newline at end of file
+        return response.content
\ No newline at end of file
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def file_hash(file_path) -> str:
+    """Return the sha256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    """Return the sha256 hex digest of a chunk's text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_chunk_id(doc: Any) -> str:
+    """
+    Build a deterministic ID for a chunk
+
+    The ID is derived from the chunk's source file, page, start offset and
+    content hash, so the same chunk always maps to the same ID across runs.
+
+    Args:
+        doc: Langchain document produced by the splitter
+
+    Returns:
+        Stable chunk ID string
+    """
+    metadata = doc.metadata
+    key = "|".join([
+        str(metadata.get('source_file', metadata.get('source', ''))),
+        str(metadata.get('page', '')),
+        str(metadata.get('start_index', '')),
+        content_hash(doc.page_content),
+    ])
+    return f"doc_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}"
+
+
+class IngestionManifest:
+    """Tracks which source files and chunks are already in the vector store"""
+
+    VERSION = 1
+
+    def __init__(self, manifest_path: str):
+        """
+        Initialize the manifest
+
+        Args:
+            manifest_path: JSON file holding the manifest (created on first save)
+        """
+        self.manifest_path = Path(manifest_path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        """Load the manifest from disk if it exists"""
+        if not self.manifest_path.exists():
+            return
+        with open(self.manifest_path, 'r', encoding='utf-8') as file_obj:
+            data = json.load(file_obj)
+        if data.get('version') != self.VERSION:
+            raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+        self.files = data.get('files', {})
+
+    def save(self):
+        """Write the manifest atomically"""
+        os.makedirs(self.manifest_path.parent, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(self.manifest_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file_obj:
+            json.dump({'version': self.VERSION, 'files': self.files}, file_obj)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sources(self) -> List[str]:
+        """Return the names of all recorded source files"""
+        return list(self.files)
+
+    def is_unchanged(self, source: str, source_hash: str) -> bool:
+        """Return True if source was ingested with exactly this file hash"""
+        entry = self.files.get(source)
+        return entry is not None and entry['hash'] == source_hash
+
+    def chunk_hashes(self, source: str) -> Dict[str, str]:
+        """Return the recorded {chunk_id: content_hash} mapping for a source"""
+        entry = self.files.get(source)
+        return dict(entry['chunks']) if entry else {}
+
+    def update(self, source: str, source_hash: str, chunk_hashes: Dict[str, str]):
+        """Record the file hash and chunks currently stored for a source (hash None: ingested partially)"""
+        self.files[source] = {'hash': source_hash, 'chunks': dict(chunk_hashes)}
+
+    def remove(self, source: str) -> List[str]:
+        """Forget a source and return the chunk IDs it owned"""
+        entry = self.files.pop(source, None)
+        return list(entry['chunks']) if entry else []
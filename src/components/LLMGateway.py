@@ -0,0 +1,512 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import httpx
+from src.instrumentation import Histogram, metrics, log_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Langchain message types to OpenAI-compatible chat roles
+_ROLES = {'human': 'user', 'ai': 'assistant', 'system': 'system', 'tool': 'tool'}
+
+
+### Errors
+
+class LLMError(Exception):
+    """
+    Base class of the errors raised by LLMGateway
+
+    Attributes:
+        status: HTTP status of the upstream response (None if there was none)
+        attempts: Upstream attempts made before giving up
+        retryable: Whether the gateway retries this error
+    """
+
+    retryable = False
+
+    def __init__(self, message: str, status: Optional[int] = None, attempts: int = 0):
+        super().__init__(message)
+        self.status = status
+        self.attempts = attempts
+
+
+class LLMRateLimitError(LLMError):
+    """Upstream answered 429; retry_after is its Retry-After hint in seconds, if any"""
+
+    retryable = True
+
+    def __init__(self, message: str, status: Optional[int] = 429, attempts: int = 0,
+                 retry_after: Optional[float] = None):
+        super().__init__(message, status, attempts)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(LLMError):
+    """Upstream failed (5xx, 408) or could not be reached"""
+
+    retryable = True
+
+
+class LLMTimeoutError(LLMError):
+    """Upstream did not answer within the timeout"""
+
+    retryable = True
+
+
+class LLMRequestError(LLMError):
+    """Upstream rejected the request (4xx other than 408/429, e.g. a bad key or prompt)"""
+
+
+class LLMOverloadedError(LLMError):
+    """The local in-flight or rate limit could not be acquired within queue_timeout"""
+
+
+### Responses
+
+@dataclass
+class LLMResponse:
+    """A chat completion (content is what Langchain chat models return as .content)"""
+
+    content: str
+    model: str
+    usage: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 1
+    latency_s: float = 0.0
+    shared: bool = False
+
+
+@dataclass
+class LLMChunk:
+    """A streamed completion fragment"""
+
+    content: str
+
+
+### Limits
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, at most capacity saved up"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, waiting for it at most timeout seconds (forever if None)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None,
+                  rng: random.Random = random) -> float:
+    """
+    Full-jitter exponential backoff before retry number attempt + 1
+
+    Args:
+        attempt: Attempts that failed so far, minus one
+        base: Delay scale in seconds
+        cap: Upper bound of the exponential part
+        retry_after: Server hint; the delay is never shorter than it
+
+    Returns:
+        Seconds to sleep
+    """
+    delay = rng.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        # Spread clients told the same Retry-After so they do not come back together
+        delay = retry_after + rng.uniform(0, base)
+    return delay
+
+
+class _Flight:
+    """An upstream call that identical concurrent requests wait on"""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class LLMGateway:
+    """
+    Resilient client for an OpenAI-compatible chat completions API (Groq by default)
+
+    A drop-in for the Langchain chat model where the pipeline calls invoke,
+    stream, ainvoke or astream (results carry .content), with:
+    - one pooled httpx client, reusing keep-alive connections
+    - at most max_in_flight upstream calls at a time and, with rate_per_s,
+      a token bucket pacing the calls (retries included)
+    - retries of 429, 408, 5xx, timeouts and connection errors with
+      full-jitter exponential backoff, honouring Retry-After up to
+      max_retry_after (a longer one is raised at once)
+    - single-flight: identical concurrent requests (same model, messages and
+      parameters) share one upstream call
+    - typed errors (LLMError subclasses) instead of error strings
+    Upstream latency goes to the llm_upstream_seconds histogram and to
+    stats(), which reports its p50/p95/p99.
+
+    Usage:
+        with LLMGateway("gemma2-9b-it", max_in_flight=8, rate_per_s=5) as llm:
+            answer = llm.invoke([prompt]).content
+    """
+
+    def __init__(self, model_name: str = "gemma2-9b-it", api_key: Optional[str] = None,
+                 base_url: str = DEFAULT_BASE_URL, temperature: float = 0.1, max_tokens: int = 1024,
+                 max_in_flight: int = 8, rate_per_s: Optional[float] = None, burst: Optional[float] = None,
+                 max_retries: int = 4, backoff_base: float = 0.5, backoff_cap: float = 20.0,
+                 timeout: float = 60.0, connect_timeout: float = 5.0, queue_timeout: Optional[float] = None,
+                 single_flight: bool = True, transport: Optional[httpx.BaseTransport] = None,
+                 max_retry_after: float = 30.0):
+        """
+        Initialize the gateway
+
+        Args:
+            model_name: Chat model name
+            api_key: API key (or set GROQ_API_KEY environment variable)
+            base_url: API root, the gateway posts to <base_url>/chat/completions
+            temperature: Default sampling temperature
+            max_tokens: Default completion token cap
+            max_in_flight: Maximum concurrent upstream calls (also the connection pool size)
+            rate_per_s: Maximum upstream calls started per second (unlimited if None)
+            burst: Calls that may start at once after an idle period (defaults to rate_per_s)
+            max_retries: Retries of a retryable failure before its error is raised
+            backoff_base: Backoff scale in seconds
+            backoff_cap: Upper bound of one backoff delay (a longer Retry-After up to max_retry_after wins)
+            timeout: Seconds to wait for upstream to answer (between streamed chunks when streaming)
+            connect_timeout: Seconds to wait for a connection
+            queue_timeout: Seconds a call may wait for an in-flight slot or rate token before
+                LLMOverloadedError (waits forever if None)
+            single_flight: Let identical concurrent invoke calls share one upstream call
+            transport: httpx transport override (e.g. httpx.MockTransport in tests)
+            max_retry_after: Longest Retry-After the gateway waits out; a longer one raises
+                LLMRateLimitError right away
+        """
+        self.model_name = model_name
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not self.api_key:
+            raise ValueError("Groq API key is required. Set GROQ_API_KEY environment variable or pass api_key parameter.")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.queue_timeout = queue_timeout
+        self.single_flight = single_flight
+
+        self.client = httpx.Client(
+            base_url=base_url.rstrip("/"), headers={'Authorization': f"Bearer {self.api_key}"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+            transport=transport)
+        self.rate_limiter = TokenBucket(rate_per_s, burst) if rate_per_s else None
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._rng = random.Random()
+
+        self.latency = Histogram()
+        self.counters = {'requests': 0, 'upstream_calls': 0, 'retries': 0, 'rate_limited': 0, 'shared': 0,
+                         'errors': 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name: str, value: int = 1):
+        with self._counters_lock:
+            self.counters[name] += value
+
+    ### Requests
+
+    def _payload(self, messages: List[Any], **overrides) -> Dict[str, Any]:
+        """Chat completions request body for strings, role dicts or Langchain messages"""
+        chat = []
+        for message in messages:
+            if isinstance(message, str):
+                chat.append({'role': 'user', 'content': message})
+            elif isinstance(message, dict):
+                chat.append(message)
+            else:
+                chat.append({'role': _ROLES.get(message.type, 'user'), 'content': message.content})
+        payload = {'model': self.model_name, 'messages': chat, 'temperature': self.temperature,
+                   'max_tokens': self.max_tokens}
+        payload.update(overrides)
+        return payload
+
+    def _acquire(self):
+        """Take an in-flight slot and a rate token"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMOverloadedError(f"No free LLM slot within {self.queue_timeout}s ({self.max_in_flight} in flight)")
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(self.queue_timeout):
+            self._slots.release()
+            raise LLMOverloadedError(f"LLM rate limit: no call slot within {self.queue_timeout}s")
+
+    @staticmethod
+    def _error_for(response: httpx.Response) -> LLMError:
+        """Typed error for an upstream error response"""
+        try:
+            detail = response.json().get('error', {})
+            message = detail.get('message', '') if isinstance(detail, dict) else str(detail)
+        except (ValueError, AttributeError):
+            message = response.text[:200]
+        message = f"LLM upstream returned {response.status_code}: {message}"
+        status = response.status_code
+        if status == 429:
+            retry_after = response.headers.get('retry-after')
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            return LLMRateLimitError(message, status, retry_after=retry_after)
+        if status == 408 or status >= 500:
+            return LLMUnavailableError(message, status)
+        return LLMRequestError(message, status)
+
+    def _send(self, payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+        """
+        One upstream attempt, holding an in-flight slot
+
+        A streamed response keeps its slot; the caller closes it with _finish.
+        """
+        self._acquire()
+        self._count('upstream_calls')
+        start = time.perf_counter()
+        try:
+            request = self.client.build_request("POST", "/chat/completions", json=payload)
+            response = self.client.send(request, stream=stream)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, httpx.TimeoutException):
+                raise LLMTimeoutError(f"LLM upstream timed out: {e}") from e
+            if isinstance(e, httpx.HTTPError):
+                raise LLMUnavailableError(f"LLM upstream failed: {e}") from e
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.latency.observe(elapsed)
+        metrics.observe("llm_upstream_seconds", elapsed)
+        if response.status_code >= 400:
+            try:
+                if stream:
+                    response.read()
+            except httpx.HTTPError:
+                pass  # The status alone describes the error
+            finally:
+                self._finish(response)
+            if response.status_code == 429:
+                self._count('rate_limited')
+                metrics.increment("llm_rate_limited_total")
+            raise self._error_for(response)
+        if not stream:
+            self._slots.release()
+        return response
+
+    def _finish(self, response: httpx.Response):
+        response.close()
+        self._slots.release()
+
+    def _with_retries(self, attempt: Callable[[], Any]):
+        """Run attempt, retrying retryable errors with backoff; returns (result, attempts)"""
+        for number in range(self.max_retries + 1):
+            try:
+                return attempt(), number + 1
+            except LLMError as e:
+                e.attempts = number + 1
+                retry_after = getattr(e, 'retry_after', None)
+                # Waiting out a long Retry-After would block the caller for that long, let it decide
+                too_long = retry_after is not None and retry_after > self.max_retry_after
+                if not e.retryable or number == self.max_retries or too_long:
+                    self._count('errors')
+                    metrics.increment("llm_errors_total")
+                    log_event("llm_error", logging.WARNING, error=type(e).__name__, status=e.status,
+                              attempts=e.attempts)
+                    raise
+                delay = backoff_delay(number, self.backoff_base, self.backoff_cap, retry_after, self._rng)
+                self._count('retries')
+                metrics.increment("llm_retries_total")
+                log_event("llm_retry", logging.INFO, error=type(e).__name__, status=e.status, attempt=number + 1,
+                          delay_s=round(delay, 3))
+                time.sleep(delay)
+
+    def _complete(self, payload: Dict[str, Any]) -> LLMResponse:
+        start = time.perf_counter()
+        response, attempts = self._with_retries(lambda: self._send(payload))
+        try:
+            data = response.json()
+            content = data['choices'][0]['message']['content'] or ""
+            model, usage = data.get('model', self.model_name), data.get('usage') or {}
+        except (ValueError, LookupError, TypeError, AttributeError) as e:
+            self._count('errors')
+            metrics.increment("llm_errors_total")
+            raise LLMError(f"LLM upstream returned a malformed completion: {response.text[:200]}",
+                           response.status_code, attempts) from e
+        return LLMResponse(content=content, model=model, usage=usage, attempts=attempts,
+                           latency_s=time.perf_counter() - start)
+
+    ### Chat model interface
+
+    def invoke(self, messages: List[Any], **overrides) -> LLMResponse:
+        """
+        Complete a chat
+
+        Args:
+            messages: Prompt strings, {'role', 'content'} dicts or Langchain messages
+            **overrides: Request body fields overriding the defaults (e.g. temperature)
+
+        Returns:
+            LLMResponse (shared is True if the answer came from an identical concurrent call)
+
+        Raises:
+            LLMError: A subclass describing why the call failed after its retries
+        """
+        payload = self._payload(messages, **overrides)
+        self._count('requests')
+        if not self.single_flight:
+            with metrics.span("llm_call", model=self.model_name):
+                return self._complete(payload)
+
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self._count('shared')
+            metrics.increment("llm_shared_total")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return replace(flight.response, shared=True)
+
+        try:
+            with metrics.span("llm_call", model=self.model_name):
+                flight.response = self._complete(payload)
+            return flight.response
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stream(self, messages: List[Any], **overrides) -> Iterator[LLMChunk]:
+        """
+        Stream a chat completion (server-sent events)
+
+        Opening the stream is retried like invoke; once the first fragment
+        arrived a failure is raised as is. Streams are never shared.
+        """
+        payload = self._payload(messages, stream=True, **overrides)
+        self._count('requests')
+        response, _ = self._with_retries(lambda: self._send(payload, stream=True))
+        try:
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    choices = json.loads(data).get('choices') or [{}]
+                    content = (choices[0].get('delta') or {}).get('content')
+                except (ValueError, LookupError, TypeError, AttributeError) as e:
+                    raise LLMError(f"LLM stream sent a malformed event: {data[:200]}", response.status_code) from e
+                if content:
+                    yield LLMChunk(content)
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"LLM stream stalled: {e}") from e
+        except httpx.HTTPError as e:
+            raise LLMUnavailableError(f"LLM stream broke off: {e}") from e
+        finally:
+            self._finish(response)
+
+    async def ainvoke(self, messages: List[Any], **overrides) -> LLMResponse:
+        """Async variant of invoke (runs in a worker thread, sharing the limits and the pool)"""
+        return await asyncio.to_thread(self.invoke, messages, **overrides)
+
+    async def astream(self, messages: List[Any], **overrides) -> AsyncIterator[LLMChunk]:
+        """Async variant of stream"""
+        chunks, done = self.stream(messages, **overrides), object()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            chunks.close()
+
+    ### Lifecycle
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, upstream call, retry and sharing counters, and upstream latency percentiles in seconds"""
+        with self._counters_lock:
+            stats = dict(self.counters)
+        stats.update(upstream_p50_s=self.latency.quantile(0.5), upstream_p95_s=self.latency.quantile(0.95),
+                     upstream_p99_s=self.latency.quantile(0.99))
+        return stats
+
+    def close(self):
+        """Close the pooled connections"""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def llm_gateway_from_env(model_name: str = "gemma2-9b-it", **overrides) -> LLMGateway:
+    """
+    Build an LLMGateway configured by the environment
+
+    Environment:
+        LLM_BASE_URL: API root (Groq's OpenAI-compatible endpoint by default)
+        LLM_MAX_IN_FLIGHT: Concurrent upstream calls (default 8)
+        LLM_RATE_PER_S: Upstream calls started per second (unlimited by default)
+        LLM_MAX_RETRIES: Retries of rate-limited or failed calls (default 4)
+        LLM_TIMEOUT_S: Upstream timeout in seconds (default 60)
+        LLM_MAX_RETRY_AFTER_S: Longest Retry-After waited out before failing (default 30)
+
+    Args:
+        model_name: Chat model name
+        **overrides: LLMGateway arguments taking precedence over the environment
+    """
+    settings = {'base_url': os.getenv("LLM_BASE_URL", DEFAULT_BASE_URL),
+                'max_in_flight': int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+                'max_retries': int(os.getenv("LLM_MAX_RETRIES", "4")),
+                'timeout': float(os.getenv("LLM_TIMEOUT_S", "60")),
+                'max_retry_after': float(os.getenv("LLM_MAX_RETRY_AFTER_S", "30"))}
+    if os.getenv("LLM_RATE_PER_S"):
+        settings['rate_per_s'] = float(os.getenv("LLM_RATE_PER_S"))
+    settings.update(overrides)
+    return LLMGateway(model_name, **settings)
@@ -0,0 +1,277 @@
+import os
+import json
+import zlib
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.components.SparseIndex import tokenize
+
+# MinHash permutations are (a * x + b) mod P over 31-bit shingle hashes, so products fit in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_SHINGLE_BASE = np.uint64(1000003)
+# Shingles hashed per vectorized step (num_perm x this many uint64 values live at once)
+_SHINGLES_PER_STEP = 1 << 16
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    LSH banding (bands, rows) of a MinHash signature for a Jaccard threshold
+
+    Picks the split whose S-curve midpoint (1/bands)^(1/rows) is the
+    highest one not above threshold, so pairs at the threshold are likely
+    candidates; candidates are then checked against the threshold itself.
+    """
+    splits = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    below = [split for split in splits if (1 / split[0]) ** (1 / split[1]) <= threshold]
+    return max(below, key=lambda split: (1 / split[0]) ** (1 / split[1])) if below else splits[-1]
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index of chunk texts for near-duplicate elimination at ingest
+
+    Every chunk is reduced to its set of word shingles (shingle_size
+    consecutive BM25 terms) and a num_perm MinHash signature, computed for
+    a whole batch of chunks with numpy. Signatures are split into bands;
+    chunks sharing any band land in the same bucket and become candidates,
+    so a chunk is compared with a handful of candidates instead of the whole
+    corpus. A candidate whose estimated Jaccard similarity reaches threshold
+    is a near-duplicate: the chunk is dropped and its source recorded as an
+    alias of the canonical (first seen) chunk. Where filters then match the
+    canonical chunk for its alias sources too (see metadata_views in
+    BaseVectorStore); for backends that cannot, set cross_source=False.
+
+    The index is persisted next to the store, so later ingestion runs check
+    new filings against every canonical chunk indexed before.
+    """
+
+    def __init__(self, persist_directory: Optional[str] = None, num_perm: int = 128, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 1, cross_source: bool = True):
+        """
+        Initialize the index, loading it from persist_directory if it was saved there
+
+        Args:
+            persist_directory: Directory holding signatures.npy and index.json (in-memory only if None)
+            num_perm: MinHash signature length
+            threshold: Estimated Jaccard similarity from which a chunk counts as a duplicate
+            shingle_size: Terms per shingle
+            seed: Seed of the MinHash permutations (must stay the same across runs)
+            cross_source: Also drop duplicates of another source's chunks (False only drops repeats
+                within a source, so no chunk relies on an alias)
+        """
+        self.persist_directory = persist_directory
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.cross_source = cross_source
+        self.bands, self.rows_per_band = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+        self.ids: List[Optional[str]] = []          # canonical chunk ID per row (None once removed)
+        self.sources: List[Optional[str]] = []      # source file per row
+        self.aliases: Dict[str, List[str]] = {}     # canonical chunk ID -> sources of its dropped duplicates
+        self.rows: Dict[str, int] = {}
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._lock = threading.RLock()
+
+        if persist_directory and (Path(persist_directory) / "index.json").exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    ### Signatures
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 31-bit shingle hashes of a text (empty if it has no terms)"""
+        terms = tokenize(text)
+        if not terms:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(term.encode('utf-8')) for term in terms), dtype=np.uint64,
+                             count=len(terms)) % _PRIME
+        size = min(self.shingle_size, len(hashes))
+        shingles = np.zeros(len(hashes) - size + 1, dtype=np.uint64)
+        for offset in range(size):
+            shingles = (shingles * _SHINGLE_BASE + hashes[offset:offset + len(shingles)]) % _PRIME
+        return np.unique(shingles)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        MinHash signatures of texts
+
+        Args:
+            texts: Chunk texts
+
+        Returns:
+            uint32 array of shape (len(texts), num_perm); texts without terms get an all-max row
+        """
+        result = np.full((len(texts), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        shingles = [self.shingles(text) for text in texts]
+        start = 0
+        while start < len(texts):
+            # Group chunks so that one step hashes about _SHINGLES_PER_STEP shingles
+            end, total = start, 0
+            while end < len(texts) and (end == start or total + len(shingles[end]) <= _SHINGLES_PER_STEP):
+                total += len(shingles[end])
+                end += 1
+            group = [row for row in range(start, end) if len(shingles[row])]
+            if group:
+                values = np.concatenate([shingles[row] for row in group])
+                offsets = np.cumsum([0] + [len(shingles[row]) for row in group[:-1]])
+                hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) % _PRIME
+                result[group] = np.minimum.reduceat(hashed, offsets, axis=1).T.astype(np.uint32)
+            start = end
+        return result
+
+    ### Lookup
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        width = self.rows_per_band
+        return [signature[band * width:(band + 1) * width].tobytes() for band in range(self.bands)]
+
+    def _append(self, chunk_id: str, source: str, signature: np.ndarray, keys: List[bytes]):
+        row = self._count
+        if row == len(self._signatures):
+            grown = np.zeros((max(1024, 2 * row), self.num_perm), dtype=np.uint32)
+            grown[:row] = self._signatures[:row]
+            self._signatures = grown
+        self._signatures[row] = signature
+        self._count += 1
+        self.ids.append(chunk_id)
+        self.sources.append(source)
+        self.rows[chunk_id] = row
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(row)
+
+    def _best_match(self, signature: np.ndarray, keys: List[bytes], source: str) -> Tuple[Optional[int], float]:
+        candidates = {row for band, key in enumerate(keys) for row in self._buckets[band].get(key, ())}
+        candidates = [row for row in candidates
+                      if self.ids[row] is not None and (self.cross_source or self.sources[row] == source)]
+        if not candidates:
+            return None, 0.0
+        similarity = (self._signatures[candidates] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        return candidates[best], float(similarity[best])
+
+    def deduplicate(self, ids: Sequence[str], texts: Sequence[str], sources: Sequence[str]) -> List[Optional[str]]:
+        """
+        Check a batch of chunks against the index, indexing the ones that are new
+
+        Chunks are handled in order, so a batch may also contain duplicates of
+        its own earlier chunks. A chunk ID that is already canonical (e.g. after
+        an interrupted run) is kept.
+
+        Args:
+            ids: Chunk IDs
+            texts: Chunk texts
+            sources: Source file of each chunk
+
+        Returns:
+            Per chunk, None to keep it or the ID of the canonical chunk it duplicates
+        """
+        signatures = self.signatures(texts)
+        canonical = []
+        with self._lock:
+            for chunk_id, text, source, signature in zip(ids, texts, sources, signatures):
+                if chunk_id in self.rows or not text.strip():
+                    canonical.append(None)
+                    continue
+                keys = self._band_keys(signature)
+                row, similarity = self._best_match(signature, keys, source)
+                if row is not None and similarity >= self.threshold:
+                    original = self.ids[row]
+                    # Boilerplate repeated within one filing is dropped too, but is not an alias
+                    if source != self.sources[row] and source not in self.aliases.get(original, []):
+                        self.aliases.setdefault(original, []).append(source)
+                    canonical.append(original)
+                else:
+                    self._append(chunk_id, source, signature, keys)
+                    canonical.append(None)
+        return canonical
+
+    def alias_sources(self, chunk_id: str) -> List[str]:
+        """Sources whose duplicates of a canonical chunk were dropped"""
+        with self._lock:
+            return list(self.aliases.get(chunk_id, []))
+
+    def remove_source(self, source: str) -> Tuple[List[str], List[str]]:
+        """
+        Forget the canonical chunks of a source and its aliases
+
+        Args:
+            source: Source file being deleted or re-ingested
+
+        Returns:
+            (other sources whose dropped chunks pointed at a removed canonical chunk and must be
+            re-ingested, canonical chunks that lost source as an alias)
+        """
+        orphaned, touched = [], []
+        with self._lock:
+            for row, row_source in enumerate(self.sources):
+                if row_source != source or self.ids[row] is None:
+                    continue
+                chunk_id = self.ids[row]
+                for alias in self.aliases.pop(chunk_id, []):
+                    if alias != source and alias not in orphaned:
+                        orphaned.append(alias)
+                del self.rows[chunk_id]
+                self.ids[row] = None
+                self.sources[row] = None
+            for chunk_id, aliases in self.aliases.items():
+                if source in aliases:
+                    aliases.remove(source)
+                    touched.append(chunk_id)
+            self.aliases = {chunk_id: aliases for chunk_id, aliases in self.aliases.items() if aliases}
+        return orphaned, touched
+
+    ### Persistence
+
+    def persist(self):
+        """Write the live rows' signatures and the index (atomically)"""
+        if not self.persist_directory:
+            return
+        directory = Path(self.persist_directory)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            live = [row for row in range(self._count) if self.ids[row] is not None]
+            np.save(directory / "signatures.tmp.npy", self._signatures[live])
+            settings = {'num_perm': self.num_perm, 'threshold': self.threshold, 'shingle_size': self.shingle_size,
+                        'seed': self.seed, 'ids': [self.ids[row] for row in live],
+                        'sources': [self.sources[row] for row in live], 'aliases': self.aliases}
+        with open(directory / "index.json.tmp", 'w', encoding='utf-8') as file_obj:
+            json.dump(settings, file_obj)
+        os.replace(directory / "signatures.tmp.npy", directory / "signatures.npy")
+        os.replace(directory / "index.json.tmp", directory / "index.json")
+
+    def load(self):
+        """(Re)load the index from persist_directory, rebuilding the LSH buckets"""
+        directory = Path(self.persist_directory)
+        with open(directory / "index.json", 'r', encoding='utf-8') as file_obj:
+            settings = json.load(file_obj)
+        if (settings['num_perm'], settings['shingle_size'], settings['seed']) != \
+                (self.num_perm, self.shingle_size, self.seed):
+            raise ValueError(f"Near-duplicate index in {directory} was built with num_perm={settings['num_perm']}, "
+                             f"shingle_size={settings['shingle_size']}, seed={settings['seed']}")
+        signatures = np.load(directory / "signatures.npy")
+        with self._lock:
+            self.ids, self.sources, self.rows = [], [], {}
+            self._signatures = np.zeros((0, self.num_perm), dtype=np.uint32)
+            self._count = 0
+            self._buckets = [{} for _ in range(self.bands)]
+            for chunk_id, source, signature in zip(settings['ids'], settings['sources'], signatures):
+                self._append(chunk_id, source, signature, self._band_keys(signature))
+            self.aliases = {chunk_id: list(aliases) for chunk_id, aliases in settings['aliases'].items()}
+
+    def stats(self) -> Dict[str, int]:
+        """Canonical chunks indexed, how many of them other sources duplicate, and alias links"""
+        with self._lock:
+            return {'canonical_chunks': len(self.rows),
+                    'aliased_chunks': len(self.aliases),
+                    'alias_links': sum(len(aliases) for aliases in self.aliases.values())}
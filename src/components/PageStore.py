@@ -0,0 +1,223 @@
+import os
+import json
+import zlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def page_key(source_file: str, page: Any) -> str:
+    """Address of a page in the PageStore"""
+    return f"{source_file}#{page}"
+
+
+def page_key_of(metadata: Dict[str, Any]) -> Optional[str]:
+    """Page address of a chunk or page from its metadata (None without source_file)"""
+    if not metadata or 'source_file' not in metadata:
+        return None
+    return page_key(metadata['source_file'], metadata.get('page'))
+
+
+class PageStore:
+    """
+    Compact on-disk store of full page texts, addressed by byte offset
+
+    Pages are zlib-compressed and appended back to back to pages.bin; an
+    index in pages.json maps every page key (source_file#page) to its
+    (offset, length). Nothing is loaded up front: get_many reads only the
+    requested pages, each distinct page once, and merges pages that lie
+    close together on disk into a single read. A replaced or removed page
+    leaves garbage behind that persist() compacts once it exceeds
+    compact_ratio of the file.
+    """
+
+    def __init__(self, persist_directory: str = "../data/page_store", compress: bool = True,
+                 cache_size: int = 256, merge_gap: int = 16384, compact_ratio: float = 0.2):
+        """
+        Initialize the store, loading its index from persist_directory if it exists
+
+        Args:
+            persist_directory: Directory holding pages.bin and pages.json
+            compress: zlib-compress page texts
+            cache_size: Decoded pages kept in an in-process LRU (0 disables it)
+            merge_gap: Pages at most this many bytes apart on disk are fetched with one read
+            compact_ratio: Fraction of garbage bytes that triggers compaction on persist
+        """
+        self.persist_directory = persist_directory
+        self.compress = compress
+        self.cache_size = cache_size
+        self.merge_gap = merge_gap
+        self.compact_ratio = compact_ratio
+
+        directory = Path(persist_directory)
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = directory / "pages.bin"
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.size = 0
+        self._writer = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.reads = 0
+
+        if (directory / "pages.json").exists():
+            self.load()
+        elif self.data_path.exists():
+            # Page data without an index is left over from an unpersisted run
+            os.remove(self.data_path)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    ### Writing
+
+    def put(self, key: str, text: str):
+        """Store (or replace) the text of a page"""
+        data = text.encode('utf-8')
+        if self.compress:
+            data = zlib.compress(data, 6)
+        with self._lock:
+            if self._writer is None:
+                self._writer = open(self.data_path, 'ab')
+                self.size = self._writer.seek(0, os.SEEK_END)
+            self._writer.write(data)
+            self.index[key] = (self.size, len(data))
+            self.size += len(data)
+            self._cache.pop(key, None)
+
+    def add_pages(self, pages: Iterable[Any]):
+        """Store Langchain page documents under their source_file#page keys"""
+        for page in pages:
+            key = page_key_of(page.metadata)
+            if key is not None:
+                self.put(key, page.page_content)
+
+    def remove_source(self, source_file: str) -> int:
+        """Forget every page of a source file, returning how many were removed"""
+        prefix = f"{source_file}#"
+        with self._lock:
+            keys = [key for key in self.index if key.startswith(prefix)]
+            for key in keys:
+                del self.index[key]
+                self._cache.pop(key, None)
+        return len(keys)
+
+    ### Reading
+
+    def _decode(self, data: bytes) -> str:
+        return (zlib.decompress(data) if self.compress else data).decode('utf-8')
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Read the texts of pages, each distinct page once
+
+        Args:
+            keys: Page keys (duplicates and unknown keys are fine)
+
+        Returns:
+            {key: page text} for the keys that exist
+        """
+        texts, wanted = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    texts[key] = self._cache[key]
+                elif key in self.index:
+                    wanted.append((self.index[key], key))
+            if not wanted:
+                return texts
+            if self._writer is not None:
+                self._writer.flush()
+
+            # Sorted by offset, pages close together on disk share one read
+            wanted.sort()
+            runs = [[wanted[0]]]
+            run_end = sum(wanted[0][0])
+            for entry in wanted[1:]:
+                offset, length = entry[0]
+                if offset - run_end <= self.merge_gap:
+                    runs[-1].append(entry)
+                    run_end = max(run_end, offset + length)
+                else:
+                    runs.append([entry])
+                    run_end = offset + length
+
+            fd = os.open(self.data_path, os.O_RDONLY)
+            try:
+                for run in runs:
+                    start = run[0][0][0]
+                    end = max(offset + length for (offset, length), _ in run)
+                    block = os.pread(fd, end - start, start)
+                    self.reads += 1
+                    for (offset, length), key in run:
+                        texts[key] = self._decode(block[offset - start:offset - start + length])
+            finally:
+                os.close(fd)
+
+            if self.cache_size:
+                for _, key in wanted:
+                    self._cache[key] = texts[key]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return texts
+
+    def get(self, key: str) -> Optional[str]:
+        """Text of one page, or None"""
+        return self.get_many([key]).get(key)
+
+    ### Persistence
+
+    def _compact(self):
+        """Rewrite pages.bin with only the live pages, in offset order"""
+        tmp_path = self.data_path.with_suffix(".bin.tmp")
+        index, position = {}, 0
+        with open(self.data_path, 'rb') as source, open(tmp_path, 'wb') as target:
+            for key, (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                source.seek(offset)
+                target.write(source.read(length))
+                index[key] = (position, length)
+                position += length
+        os.replace(tmp_path, self.data_path)
+        self.index, self.size = index, position
+
+    def persist(self):
+        """Flush page data and write the index (compacting first if enough of the file is garbage)"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if not self.data_path.exists():
+                return
+            self.size = self.data_path.stat().st_size
+            live = sum(length for _, length in self.index.values())
+            if self.size - live > self.compact_ratio * max(self.size, 1):
+                self._compact()
+
+            directory = Path(self.persist_directory)
+            settings = {'compress': self.compress, 'size': self.size, 'pages': self.index}
+            with open(directory / "pages.json.tmp", 'w', encoding='utf-8') as file_obj:
+                json.dump(settings, file_obj)
+            os.replace(directory / "pages.json.tmp", directory / "pages.json")
+
+    def load(self):
+        """(Re)load the index from persist_directory"""
+        directory = Path(self.persist_directory)
+        with open(directory / "pages.json", 'r', encoding='utf-8') as file_obj:
+            settings = json.load(file_obj)
+        with self._lock:
+            self.compress = settings['compress']
+            self.index = {key: tuple(entry) for key, entry in settings['pages'].items()}
+            self.size = settings['size']
+            self._cache.clear()
+            if self.data_path.exists() and self.data_path.stat().st_size > self.size:
+                # Drop pages appended after the last persist, the index does not know them
+                with open(self.data_path, 'r+b') as file_obj:
+                    file_obj.truncate(self.size)
+
+    def stats(self) -> Dict[str, int]:
+        """Page count, bytes on disk and reads issued so far"""
+        return {'pages': len(self.index), 'bytes': self.size, 'reads': self.reads}
@@ -0,0 +1,183 @@
+import os
+from collections import deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+
+PDF_BACKENDS = ("pymupdf", "pypdf")
+
+# Last document opened by this process, so consecutive page ranges of a file reuse it
+_open_document: Dict[str, object] = {}
+
+
+def _open(pdf_path: str, backend: str):
+    key = f"{backend}|{pdf_path}|{os.path.getmtime(pdf_path)}"
+    document = _open_document.get(key)
+    if document is None:
+        if backend == "pymupdf":
+            import pymupdf
+            # Repairable syntax errors in filings would otherwise be printed to stderr for every page
+            pymupdf.TOOLS.mupdf_display_errors(False)
+            document = pymupdf.open(pdf_path)
+        elif backend == "pypdf":
+            from pypdf import PdfReader
+            document = PdfReader(pdf_path)
+        else:
+            raise ValueError(f"Unknown PDF backend: {backend}, expected one of {PDF_BACKENDS}")
+        _open_document.clear()
+        _open_document[key] = document
+    return document
+
+
+def page_count(pdf_path: str, backend: str = "pymupdf") -> int:
+    """Number of pages of a PDF"""
+    document = _open(str(pdf_path), backend)
+    return document.page_count if backend == "pymupdf" else len(document.pages)
+
+
+def extract_pages(pdf_path: str, start: int, stop: int, backend: str = "pymupdf") -> List[str]:
+    """
+    Extract the text of pages [start, stop) of a PDF (runs inside a worker process)
+
+    Args:
+        pdf_path: PDF file
+        start: First page (0-based)
+        stop: Page after the last one
+        backend: "pymupdf" (MuPDF, fast) or "pypdf" (pure Python)
+
+    Returns:
+        One text per page
+    """
+    document = _open(str(pdf_path), backend)
+    if backend == "pymupdf":
+        return [document.load_page(number).get_text() for number in range(start, stop)]
+    return [document.pages[number].extract_text() for number in range(start, stop)]
+
+
+class PdfExtractor:
+    """
+    Extracts PDF pages with a pluggable backend, in parallel across pages
+
+    Every file is cut into page ranges of pages_per_task pages that are
+    extracted in a process pool, so one large filing is spread over all
+    workers instead of occupying one. Ranges are yielded in submission
+    order, which keeps the pages of a file contiguous and in page order,
+    and at most max_in_flight ranges are parsed or buffered at a time. A
+    file or range the backend cannot read is retried with the fallback
+    backend. Files with a range that neither backend could read are listed
+    in failed_sources (reset by every iter_pages call) by the time the
+    pages after that range are yielded.
+    """
+
+    def __init__(self, backend: str = "pymupdf", fallback: Optional[str] = "pypdf", pages_per_task: int = 16,
+                 max_workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """
+        Initialize the extractor
+
+        Args:
+            backend: "pymupdf" or "pypdf"
+            fallback: Backend retried for files or page ranges the main backend fails on (None disables)
+            pages_per_task: Pages extracted per worker task
+            max_workers: Extraction processes (defaults to CPU count, 1 extracts in-process)
+            max_in_flight: Page ranges submitted or buffered at once (defaults to 2 * max_workers)
+        """
+        for name in (backend, fallback):
+            if name is not None and name not in PDF_BACKENDS:
+                raise ValueError(f"Unknown PDF backend: {name}, expected one of {PDF_BACKENDS}")
+        self.backend = backend
+        self.fallback = fallback if fallback != backend else None
+        self.pages_per_task = max(1, pages_per_task)
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.failed_sources = set()
+
+    def _tasks(self, pdf_files: Iterable) -> Iterator[Tuple[Path, int, int, int, str]]:
+        """(file, start, stop, total pages, backend) page ranges, file by file"""
+        for pdf_file in pdf_files:
+            pdf_file = Path(pdf_file)
+            backend = self.backend
+            try:
+                total = page_count(str(pdf_file), backend)
+            except Exception as e:
+                if self.fallback is None:
+                    print(f"  ✗ Error processing {pdf_file.name}: {e}")
+                    continue
+                print(f"  ! {backend} cannot open {pdf_file.name} ({e}), using {self.fallback}")
+                backend = self.fallback
+                try:
+                    total = page_count(str(pdf_file), backend)
+                except Exception as e:
+                    print(f"  ✗ Error processing {pdf_file.name}: {e}")
+                    continue
+            for start in range(0, total, self.pages_per_task):
+                yield pdf_file, start, min(start + self.pages_per_task, total), total, backend
+
+    def _documents(self, task, texts: Optional[List[str]], error: Optional[Exception] = None) -> List[Document]:
+        """Turn one extracted range into page documents, retrying with the fallback backend on failure"""
+        pdf_file, start, stop, total, backend = task
+        if texts is None and self.fallback is not None and backend != self.fallback:
+            try:
+                texts = extract_pages(str(pdf_file), start, stop, self.fallback)
+                print(f"  ! {backend} failed on pages {start}-{stop - 1} of {pdf_file.name} ({error}), "
+                      f"used {self.fallback}")
+            except Exception as e:
+                error = e
+        if texts is None:
+            print(f"  ✗ Error extracting pages {start}-{stop - 1} of {pdf_file.name}: {error}")
+            self.failed_sources.add(pdf_file.name)
+            return []
+
+        documents = [Document(page_content=text, metadata={'source': str(pdf_file), 'page': number,
+                                                           'total_pages': total, 'source_file': pdf_file.name,
+                                                           'file_type': 'pdf'})
+                     for number, text in enumerate(texts, start=start)]
+        if stop == total:
+            print(f"  ✓ Loaded {total} pages from {pdf_file.name}")
+        return documents
+
+    def iter_pages(self, pdf_files: Iterable, max_workers: Optional[int] = None,
+                   max_in_flight: Optional[int] = None) -> Iterator[Document]:
+        """
+        Yield the pages of PDF files as they are extracted
+
+        Args:
+            pdf_files: PDF paths
+            max_workers: Overrides the extractor's max_workers
+            max_in_flight: Overrides the extractor's max_in_flight
+
+        Yields:
+            Langchain documents, one per page, file by file and in page order
+        """
+        self.failed_sources = set()
+        max_workers = max_workers or self.max_workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or self.max_in_flight or max_workers * 2
+        tasks = self._tasks(pdf_files)
+
+        if max_workers == 1:
+            for task in tasks:
+                pdf_file, start, stop, _, backend = task
+                try:
+                    texts, error = extract_pages(str(pdf_file), start, stop, backend), None
+                except Exception as e:
+                    texts, error = None, e
+                yield from self._documents(task, texts, error)
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            window = deque()
+
+            def finish(task, future):
+                try:
+                    texts, error = future.result(), None
+                except Exception as e:
+                    texts, error = None, e
+                return self._documents(task, texts, error)
+
+            for task in tasks:
+                pdf_file, start, stop, _, backend = task
+                window.append((task, executor.submit(extract_pages, str(pdf_file), start, stop, backend)))
+                if len(window) >= max_in_flight:
+                    yield from finish(*window.popleft())
+            while window:
+                yield from finish(*window.popleft())
@@ -1,20 +1,144 @@
-from typing import List,Dict,Any
+import json
+import logging
+import numpy as np
+from typing import List,Dict,Any,Optional
+from src.components.BaseVectorStore import matches_where
+from src.components.PageStore import page_key_of
+from src.instrumentation import metrics, log_event
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_MODES = ("dense", "sparse", "hybrid")
+
+
+def mmr_select(query_embedding: np.ndarray, candidate_embeddings: np.ndarray, top_k: int,
+               lambda_mult: float = 0.5) -> np.ndarray:
+    """
+    Maximal Marginal Relevance selection over a candidate set
+    
+    Each greedy step is a vectorized update of every candidate's maximum
+    similarity to the already selected ones. Only the similarity rows of
+    selected candidates are computed (top_k x n instead of the full n x n
+    matrix), which keeps the stage well under a millisecond for hundreds
+    of candidates.
+    
+    Args:
+        query_embedding: Query vector of shape (dim,)
+        candidate_embeddings: Candidate vectors of shape (n, dim)
+        top_k: Number of candidates to select
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+        
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    
+    k = min(top_k, len(candidates))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    relevance = candidates @ query
+    
+    selected = np.empty(k, dtype=np.int64)
+    selected[0] = int(np.argmax(relevance))
+    max_similarity = candidates @ candidates[selected[0]]
+    weighted_relevance = lambda_mult * relevance
+    for step in range(1, k):
+        scores = weighted_relevance - (1 - lambda_mult) * max_similarity
+        scores[selected[:step]] = -np.inf
+        selected[step] = int(np.argmax(scores))
+        np.maximum(max_similarity, candidates @ candidates[selected[step]], out=max_similarity)
+    return selected
+
 
 class RAGRetriever:
     """Handles query-based retrieval from the vector store"""
     
-    def __init__(self, vector_store, embedding_manager):
+    def __init__(self, vector_store, embedding_manager, sparse_index=None, rrf_k: int = 60,
+                 candidate_multiplier: int = 4, mmr_lambda: Optional[float] = None, fetch_k: int = 20,
+                 auto_route: bool = False, page_store=None, parent_chars: Optional[int] = None,
+                 default_mode: str = "dense"):
         """
         Initialize the retriever
         
         Args:
-            vector_store: Vector store containing document embeddings
+            vector_store: Vector store implementing BaseVectorStore
             embedding_manager: Manager for generating query embeddings
+            sparse_index: Optional BM25Index over the same chunks, enables hybrid retrieval
+            rrf_k: Reciprocal rank fusion constant (larger flattens the rank weighting)
+            candidate_multiplier: Each ranking contributes top_k * candidate_multiplier candidates to fusion
+            mmr_lambda: Enables MMR diversification of dense hits (1.0 relevance only, 0.0 diversity only)
+            fetch_k: Dense candidates over-fetched (with embeddings) for MMR to choose from
+            auto_route: Derive a where filter from the query when none is given
+                (needs a store with infer_where, e.g. ShardedVectorStore)
+            page_store: Optional PageStore of full pages; hits are then expanded to their parent page
+                (small-to-big retrieval: small chunks are searched, page text is returned)
+            parent_chars: Cap on the parent text per hit, a window around the hit's span (whole page if None)
+            default_mode: Mode used when retrieve gets none: "dense" (cosine similarity scores), or
+                "sparse"/"hybrid" (opt-in, used only when a sparse index is set; their scores are BM25
+                or reciprocal rank fusion scores, on a different scale than score_threshold callers expect)
         """
+        if default_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {default_mode}")
         self.vector_store = vector_store
         self.embedding_manager = embedding_manager
+        self.sparse_index = sparse_index
+        self.rrf_k = rrf_k
+        self.candidate_multiplier = candidate_multiplier
+        self.mmr_lambda = mmr_lambda
+        self.fetch_k = fetch_k
+        self.auto_route = auto_route
+        self.page_store = page_store
+        self.parent_chars = parent_chars
+        self.default_mode = default_mode
+
+    def _resolve_mode(self, mode: Optional[str]) -> str:
+        """Explicit mode, else default_mode (dense when it needs a sparse index that is not set)"""
+        if mode is None:
+            return self.default_mode if self.sparse_index is not None else "dense"
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if mode != "dense" and self.sparse_index is None:
+            raise ValueError(f"Retrieval mode '{mode}' needs a sparse index")
+        return mode
+
+    def _infer_where(self, query: str) -> Optional[Dict[str, Any]]:
+        """Filter implied by the query (e.g. a company and year it names), if routing is enabled"""
+        infer_where = getattr(self.vector_store, 'infer_where', None)
+        if not self.auto_route or infer_where is None:
+            return None
+        return infer_where(query)
+
+    def _dense_search(self, query_embeddings: np.ndarray, top_k: int,
+                      where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Dense store search, followed by MMR when mmr_lambda is set
+        
+        With MMR, fetch_k candidates are fetched together with their stored
+        embeddings and top_k of them are picked for relevance and mutual
+        diversity, so neighbouring overlapping chunks do not crowd the results.
+        """
+        if self.mmr_lambda is None:
+            with metrics.span("store_query"):
+                return self.vector_store.search(query_embeddings, top_k=top_k, where=where)
+        
+        with metrics.span("store_query"):
+            hits_per_query = self.vector_store.search(query_embeddings, top_k=max(self.fetch_k, top_k),
+                                                      where=where, include_embeddings=True)
+        diversified = []
+        for query_embedding, hits in zip(query_embeddings, hits_per_query):
+            if not hits:
+                diversified.append([])
+                continue
+            selected = mmr_select(query_embedding, np.stack([hit['embedding'] for hit in hits]),
+                                  top_k, self.mmr_lambda)
+            diversified.append([hits[i] for i in selected])
+        return diversified
 
-    def retrieve(self, query: str, top_k: int = 5, score_threshold: float = 0.0) -> List[Dict[str, Any]]:
+    def retrieve(self, query: str, top_k: int = 5, score_threshold: float = 0.0,
+                 mode: Optional[str] = None, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents for a query
         
@@ -22,54 +146,39 @@ class RAGRetriever:
             query: The search query
             top_k: Number of top results to return
             score_threshold: Minimum similarity score threshold
+            mode: "dense", "sparse" or "hybrid" (default_mode if None)
+            where: Optional metadata filter, e.g. {"$and": [{"company": "apple"}, {"year": 2024}]};
+                a sharded store only searches the shards that can match it
             
         Returns:
             List of dictionaries containing retrieved documents and metadata
         """
-        print(f"Retrieving documents for query: '{query}'")
-        print(f"Top K: {top_k}, Score threshold: {score_threshold}")
+        if where is None:
+            where = self._infer_where(query)
+        if self._resolve_mode(mode) != "dense":
+            return self.retrieve_batch([query], top_k=top_k, score_threshold=score_threshold,
+                                       where=where, mode=mode)[0]
         
+        metrics.increment("retrieve_queries_total")
         # Generate query embedding
-        query_embedding = self.embedding_manager.generate_embeddings([query])[0]
+        with metrics.span("embed"):
+            query_embedding = self.embedding_manager.generate_embeddings([query])[0]
         
         try:
-            results = self.vector_store.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=top_k
-            )
+            hits = self._dense_search(query_embedding.reshape(1, -1), top_k, where)[0]
             
             # Process results
-            retrieved_docs = []
-            
-            if results['documents'] and results['documents'][0]:
-                documents = results['documents'][0]
-                metadatas = results['metadatas'][0]
-                distances = results['distances'][0]
-                ids = results['ids'][0]
-                
-                for i, (doc_id, document, metadata, distance) in enumerate(zip(ids, documents, metadatas, distances)):
-                    # Convert distance to similarity score (ChromaDB uses cosine distance)
-                    similarity_score = 1 - distance
-                    
-                    if similarity_score >= score_threshold:
-                        retrieved_docs.append({
-                            'id': doc_id,
-                            'content': document,
-                            'metadata': metadata,
-                            'similarity_score': similarity_score,
-                            'distance': distance,
-                            'rank': i + 1
-                        })
-                
-                print(f"Retrieved {len(retrieved_docs)} documents (after filtering)")
-            else:
-                print("No documents found")
-            
+            retrieved_docs = self._process_hits(hits, score_threshold)
+            if self.page_store is not None:
+                retrieved_docs = self._hydrate([retrieved_docs])[0]
+            log_event("retrieved", logging.DEBUG, mode="dense", top_k=top_k, hits=len(hits),
+                      kept=len(retrieved_docs))
             return retrieved_docs
         
         
-        except Exception as e:
-            print(f"Error during retrieval: {e}")
+        except Exception:
+            metrics.increment("retrieve_errors_total")
+            logger.exception("Error during retrieval")
             return []
         
         '''
@@ -95,4 +204,197 @@ class RAGRetriever:
 
             print(f"Retrieved {len(retrieved_docs)} documents (after filtering)")
             return retrieved_docs
-            '''
\ No newline at end of file
+            '''
+
+    @staticmethod
+    def _process_hits(hits: List[Dict[str, Any]], score_threshold: float) -> List[Dict[str, Any]]:
+        """Turn store hits into ranked results above the similarity threshold"""
+        retrieved_docs = []
+        for i, hit in enumerate(hits):
+            # Convert distance to similarity score (stores report cosine distance);
+            # chunks found only by the lexical ranking have no dense score
+            similarity_score = 1 - hit['distance'] if hit['distance'] is not None else None
+            
+            if similarity_score is None or similarity_score >= score_threshold:
+                doc = {
+                    'id': hit['id'],
+                    'content': hit['content'],
+                    'metadata': hit['metadata'],
+                    'similarity_score': similarity_score,
+                    'distance': hit['distance'],
+                    'rank': i + 1
+                }
+                if 'fusion_score' in hit:
+                    doc['fusion_score'] = hit['fusion_score']
+                    doc['bm25_score'] = hit['bm25_score']
+                retrieved_docs.append(doc)
+        return retrieved_docs
+
+    def _parent_window(self, page_length: int, spans: List[tuple]) -> tuple:
+        """Character range of a page returned for hits covering spans"""
+        if self.parent_chars is None or page_length <= self.parent_chars:
+            return 0, page_length
+        low, high = min(start for start, _ in spans), max(end for _, end in spans)
+        if high - low >= self.parent_chars:
+            return low, high
+        start = max(0, low - (self.parent_chars - (high - low)) // 2)
+        end = min(page_length, start + self.parent_chars)
+        return max(0, end - self.parent_chars), end
+
+    def _hydrate(self, results_per_query: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Expand small-chunk hits to their parent page text
+        
+        The pages of all hits of the batch are read from the page store in
+        one call, each distinct page once. Within a query, hits on the same
+        page are coalesced into the best-ranked one (their IDs are kept in
+        'child_ids'), whose content becomes the page, or a parent_chars
+        window around all of those hits. The chunk that matched stays in
+        'chunk_content'. Hits without a stored page are returned unchanged.
+        """
+        with metrics.span("hydrate"):
+            pages = self.page_store.get_many(key for docs in results_per_query for doc in docs
+                                             if (key := page_key_of(doc['metadata'])) is not None)
+        
+        hydrated = []
+        for docs in results_per_query:
+            kept, parents = [], {}
+            for doc in docs:
+                key = page_key_of(doc['metadata'])
+                page = pages.get(key) if key is not None else None
+                if page is None:
+                    kept.append(doc)
+                    continue
+                start = doc['metadata'].get('start_index')
+                start = 0 if start is None or start < 0 else int(start)
+                end = doc['metadata'].get('end_index')
+                end = int(end) if end is not None else start + len(doc['content'] or page)
+                if key in parents:
+                    parents[key][0]['child_ids'].append(doc['id'])
+                    parents[key][1].append((start, end))
+                    continue
+                parent = dict(doc, metadata=dict(doc['metadata']), chunk_content=doc['content'] or page[start:end],
+                              child_ids=[doc['id']])
+                parents[key] = (parent, [(start, end)], page)
+                kept.append(parent)
+            
+            for parent, spans, page in parents.values():
+                window_start, window_end = self._parent_window(len(page), spans)
+                parent['content'] = page[window_start:window_end]
+                parent['metadata']['start_index'] = window_start
+                parent['metadata']['end_index'] = window_end
+            for rank, doc in enumerate(kept, start=1):
+                doc['rank'] = rank
+            hydrated.append(kept)
+        return hydrated
+
+    def _fuse(self, dense_hits: List[Dict[str, Any]], lexical_hits: List[tuple], top_k: int,
+              where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Merge a dense and a lexical ranking with reciprocal rank fusion
+        
+        Every chunk scores sum(1 / (rrf_k + rank)) over the rankings it
+        appears in. Chunks only the lexical ranking found are fetched from the
+        vector store (and checked against where) so they carry their content.
+        """
+        records = {hit['id']: dict(hit) for hit in dense_hits}
+        missing = [chunk_id for chunk_id, _ in lexical_hits if chunk_id not in records]
+        for record in self.vector_store.get(missing) if missing else []:
+            if record is not None and matches_where(record['metadata'], where):
+                records[record['id']] = dict(record, distance=None)
+        
+        scores = {}
+        for rank, hit in enumerate(dense_hits, start=1):
+            scores[hit['id']] = 1.0 / (self.rrf_k + rank)
+        bm25_scores = {}
+        rank = 0
+        for chunk_id, bm25_score in lexical_hits:
+            if chunk_id not in records:
+                continue
+            rank += 1
+            bm25_scores[chunk_id] = bm25_score
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank)
+        
+        fused = []
+        for chunk_id in sorted(scores, key=scores.get, reverse=True)[:top_k]:
+            hit = records[chunk_id]
+            hit['fusion_score'] = scores[chunk_id]
+            hit['bm25_score'] = bm25_scores.get(chunk_id, 0.0)
+            fused.append(hit)
+        return fused
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 5, score_threshold: float = 0.0,
+                       where: Optional[Dict[str, Any]] = None,
+                       mode: Optional[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve relevant documents for many queries at once
+        
+        All queries are embedded in one batched call and sent to the store as
+        a single multi-query search, so per-call model and store overhead is
+        paid once per batch instead of once per query. In hybrid mode the
+        dense and BM25 rankings (each over-fetched by candidate_multiplier)
+        are fused with reciprocal rank fusion; score_threshold then only
+        drops chunks whose dense similarity is known and too low. With
+        mmr_lambda set, the dense ranking is diversified with MMR first.
+        
+        Args:
+            queries: The search queries
+            top_k: Number of top results to return per query
+            score_threshold: Minimum similarity score threshold
+            where: Optional metadata filter applied to every query (inferred per
+                query when None and auto_route is set)
+            mode: "dense", "sparse" or "hybrid" (default_mode if None)
+            
+        Returns:
+            One result list per query, each shaped like retrieve's output
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        mode = self._resolve_mode(mode)
+        
+        if where is None and self.auto_route:
+            # Queries naming different companies/years go to different shards
+            groups = {}
+            for position, query in enumerate(queries):
+                inferred = self._infer_where(query)
+                groups.setdefault(json.dumps(inferred, sort_keys=True), (inferred, []))[1].append(position)
+            if len(groups) > 1 or next(iter(groups.values()))[0] is not None:
+                results = [None] * len(queries)
+                for inferred, positions in groups.values():
+                    group_results = self._retrieve_batch([queries[i] for i in positions], top_k,
+                                                         score_threshold, inferred, mode)
+                    for position, result in zip(positions, group_results):
+                        results[position] = result
+                return results
+        
+        return self._retrieve_batch(queries, top_k, score_threshold, where, mode)
+
+    def _retrieve_batch(self, queries: List[str], top_k: int, score_threshold: float,
+                        where: Optional[Dict[str, Any]], mode: str) -> List[List[Dict[str, Any]]]:
+        """Retrieve a batch of queries that share one filter"""
+        metrics.increment("retrieve_queries_total", len(queries))
+        try:
+            if mode == "dense":
+                with metrics.span("embed", batch_size=len(queries)):
+                    query_embeddings = self.embedding_manager.generate_embeddings(queries)
+                hits_per_query = self._dense_search(query_embeddings, top_k, where)
+            else:
+                candidates = top_k * self.candidate_multiplier
+                with metrics.span("sparse_query", batch_size=len(queries)):
+                    lexical_per_query = self.sparse_index.search(queries, top_k=candidates, where=where)
+                if mode == "sparse":
+                    dense_per_query = [[] for _ in queries]
+                else:
+                    with metrics.span("embed", batch_size=len(queries)):
+                        query_embeddings = self.embedding_manager.generate_embeddings(queries)
+                    dense_per_query = self._dense_search(query_embeddings, candidates, where)
+                with metrics.span("fusion"):
+                    hits_per_query = [self._fuse(dense_hits, lexical_hits, top_k, where)
+                                      for dense_hits, lexical_hits in zip(dense_per_query, lexical_per_query)]
+            results = [self._process_hits(hits, score_threshold) for hits in hits_per_query]
+            return self._hydrate(results) if self.page_store is not None else results
+        except Exception:
+            metrics.increment("retrieve_errors_total")
+            logger.exception("Error during batch retrieval")
+            return [[] for _ in queries]
@@ -0,0 +1,184 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from src.pipeline import NO_CONTEXT_ANSWER, build_rag_prompt, build_context
+from src.instrumentation import metrics, request_context
+
+
+class AsyncRAGService:
+    """
+    Asyncio RAG query service that coalesces concurrent requests
+
+    Queries arriving within max_wait_ms of each other are retrieved together
+    with one RAGRetriever.retrieve_batch call (one embedding pass, one store
+    query). LLM calls go through the chat model's ainvoke and are limited to
+    max_concurrent_llm in flight. Every request can carry its own timeout
+    and can be cancelled; a cancelled request is dropped from its batch.
+
+    Usage:
+        async with AsyncRAGService(retriever, llm) as service:
+            answer = await service.answer("What did Nvidia announce in 2024?", timeout=30)
+    """
+
+    def __init__(self, retriever, llm, top_k: int = 3, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 max_concurrent_llm: int = 8, default_timeout: Optional[float] = None, context_builder=None):
+        """
+        Initialize the service
+
+        Args:
+            retriever: RAGRetriever (anything with retrieve_batch)
+            llm: Langchain chat model (anything with ainvoke)
+            top_k: Number of context chunks per query
+            max_batch_size: Maximum queries coalesced into one retrieval
+            max_wait_ms: How long the first query of a batch waits for company
+            max_concurrent_llm: Maximum LLM calls in flight
+            default_timeout: Per-request timeout in seconds when answer() gets none
+            context_builder: ContextBuilder packing retrieved chunks into the prompt
+        """
+        self.retriever = retriever
+        self.llm = llm
+        self.top_k = top_k
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_llm = max_concurrent_llm
+        self.default_timeout = default_timeout
+        self.context_builder = context_builder
+
+        self._queue = None
+        self._llm_semaphore = None
+        self._batcher = None
+        self._batch = []   # (query, future) pairs the batcher has taken off the queue and not answered yet
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def start(self):
+        """Start the background batcher (must be called from the running event loop)"""
+        if self._batcher is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._llm_semaphore = asyncio.Semaphore(self.max_concurrent_llm)
+        self._batcher = asyncio.create_task(self._run_batcher())
+
+    async def stop(self):
+        """Stop the batcher and fail any queued or in-progress requests"""
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+
+        pending, self._batch = self._batch, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("RAG service stopped"))
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _collect_batch(self) -> List[Any]:
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        # The batch lives on self so stop() can fail it if the batcher is cancelled mid-batch
+        self._batch = batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_batcher(self):
+        """Serve retrieval requests in micro-batches until cancelled"""
+        while True:
+            batch = await self._collect_batch()
+            # Requests cancelled or timed out while queued are not worth retrieving
+            batch = [(query, future) for query, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            queries = [query for query, _ in batch]
+            self.batches += 1
+            self.batched_queries += len(queries)
+            metrics.increment("retrieve_batches_total")
+            try:
+                with metrics.span("retrieve_batch", batch_size=len(queries)):
+                    results = await asyncio.to_thread(self.retriever.retrieve_batch, queries, self.top_k)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._batch = []
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._batch = []
+
+    async def retrieve(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Retrieve context for one query through the micro-batcher
+
+        Args:
+            query: The search query
+
+        Returns:
+            Retrieved documents shaped like RAGRetriever.retrieve's output
+        """
+        if self._batcher is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _answer(self, query: str) -> str:
+        # Each request runs in its own task, so the request ID does not leak between requests
+        with request_context(), metrics.span("request"):
+            metrics.increment("requests_total")
+            results = await self.retrieve(query)
+            context = build_context(results, self.context_builder)
+
+            if not context:
+                return NO_CONTEXT_ANSWER
+
+            async with self._llm_semaphore:
+                with metrics.span("llm"):
+                    response = await self.llm.ainvoke([build_rag_prompt(query, context)])
+            return response.content
+
+    async def answer(self, query: str, timeout: Optional[float] = None) -> str:
+        """
+        Answer a question with retrieved context
+
+        Args:
+            query: User question
+            timeout: Seconds before the request is abandoned (defaults to default_timeout)
+
+        Returns:
+            The LLM's answer
+
+        Raises:
+            asyncio.TimeoutError: If the request did not finish in time
+        """
+        timeout = timeout if timeout is not None else self.default_timeout
+        return await asyncio.wait_for(self._answer(query), timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """Return batching counters"""
+        return {
+            'batches': self.batches,
+            'queries': self.batched_queries,
+            'avg_batch_size': self.batched_queries / self.batches if self.batches else 0.0,
+        }
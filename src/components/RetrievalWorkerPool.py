@@ -0,0 +1,199 @@
+import os
+import math
+import logging
+import threading
+from pathlib import Path
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from src.components.EmbeddingManager import DEFAULT_MODEL_NAME, EmbeddingManager
+from src.components.PageStore import PageStore
+from src.components.RagRetriever import RAGRetriever
+from src.components.Snapshot import SnapshotVectorStore, current_generation, read_manifest
+from src.components.SparseIndex import BM25Index, MappedBM25Index
+from src.instrumentation import metrics, log_event
+
+logger = logging.getLogger(__name__)
+
+# Per worker process: the embedding manager, and the retriever of the generation it last served
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(embedding_factory: Callable[[], Any], retriever_kwargs: Dict[str, Any], threads: int):
+    """Build the worker's embedding model once, when the process starts"""
+    if threads:
+        # One worker per core scales better than every worker spreading over all cores
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    _worker_state['embedding_manager'] = embedding_factory()
+    _worker_state['retriever_kwargs'] = retriever_kwargs
+    _worker_state['generation'] = None
+
+
+def _worker_retriever(generation: str):
+    """Retriever over a generation's snapshot, reopened only when the dispatcher moved to a new one"""
+    if _worker_state['generation'] != generation:
+        # The dispatcher verified the checksums before switching, the worker only maps the files
+        store = SnapshotVectorStore(generation, verify=False)
+        sparse_index = None
+        sparse_directory = Path(generation) / "bm25"
+        if MappedBM25Index.exists(sparse_directory):
+            # Shared through the page cache like the vectors, instead of one BM25 copy per worker
+            sparse_index = MappedBM25Index(str(sparse_directory)) or None
+        elif sparse_directory.is_dir():
+            sparse_index = BM25Index(str(sparse_directory)) or None
+        page_store = None
+        if (Path(generation) / "pages" / "pages.json").exists():
+            page_store = PageStore(str(Path(generation) / "pages"))
+        _worker_state['retriever'] = RAGRetriever(store, _worker_state['embedding_manager'],
+                                                  sparse_index=sparse_index, page_store=page_store,
+                                                  **_worker_state['retriever_kwargs'])
+        _worker_state['generation'] = generation
+    return _worker_state['retriever']
+
+
+def _worker_retrieve_batch(generation: str, queries: List[str], kwargs: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    """Embed and search a batch of queries inside a worker process"""
+    return _worker_retriever(generation).retrieve_batch(queries, **kwargs)
+
+
+class RetrievalWorkerPool:
+    """
+    Multi-process query serving over a shared, read-only, memory-mapped index
+
+    Every worker process embeds and searches queries with its own
+    RAGRetriever over the current snapshot generation (see
+    Snapshot.publish_generation). The snapshot files, including the BM25
+    weights and the sorted ID columns, are memory-mapped read-only, so all
+    workers share one copy through the page cache and worker memory does
+    not grow with the index. Requests go
+    through one task queue that idle workers pull from, which balances load
+    by itself.
+
+    Hot swap: every request is tagged with the generation the dispatcher
+    currently serves. refresh() (called by a watcher thread when
+    poll_interval is set) checks the CURRENT pointer, verifies a new
+    generation once and switches the tag; each worker reopens its store on
+    its next request, so no request ever mixes two generations.
+
+    Usage:
+        with RetrievalWorkerPool("data/generations", workers=4) as pool:
+            results = pool.retrieve("What was Apple's revenue in 2024?", top_k=5)
+    """
+
+    def __init__(self, root, workers: Optional[int] = None, model_name: str = DEFAULT_MODEL_NAME,
+                 embedding_factory: Optional[Callable[[], Any]] = None,
+                 retriever_kwargs: Optional[Dict[str, Any]] = None, threads_per_worker: int = 1,
+                 poll_interval: Optional[float] = None, max_batch_per_task: int = 32):
+        """
+        Initialize the pool and start its workers
+
+        Args:
+            root: Generations root directory written by publish_generation
+            workers: Worker processes (defaults to CPU count)
+            model_name: Query embedding model; generations built with another model are refused
+            embedding_factory: Picklable zero-argument callable building the embedding manager in each
+                worker (an EmbeddingManager for model_name by default)
+            retriever_kwargs: Extra RAGRetriever arguments (e.g. mmr_lambda)
+            threads_per_worker: Torch threads per worker (0 leaves torch's default)
+            poll_interval: Seconds between checks for a new generation (None only swaps on refresh())
+            max_batch_per_task: Queries of a retrieve_batch call sent to one worker at a time
+        """
+        self.root = Path(root)
+        self.workers = workers or os.cpu_count() or 1
+        self.model_name = model_name
+        self.max_batch_per_task = max_batch_per_task
+        self.generation = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        if not self.refresh():
+            raise FileNotFoundError(f"No snapshot generation published under {self.root}")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(embedding_factory or partial(EmbeddingManager, model_name=model_name),
+                      retriever_kwargs or {}, threads_per_worker))
+
+        self._watcher = None
+        if poll_interval:
+            self._watcher = threading.Thread(target=self._watch, args=(poll_interval,),
+                                             name="generation-watcher", daemon=True)
+            self._watcher.start()
+
+    ### Generations
+
+    def refresh(self) -> bool:
+        """
+        Switch to the generation CURRENT points to, if it changed
+
+        Returns:
+            True if a new generation is now served
+        """
+        directory = current_generation(self.root)
+        if directory is None or str(directory) == self.generation:
+            return False
+        with self._lock:
+            if str(directory) == self.generation:
+                return False
+            # Refuse corrupt or foreign-model generations here, once, instead of in every worker
+            manifest = read_manifest(directory, self.model_name)
+            previous, self.generation = self.generation, str(directory)
+        metrics.increment("generation_swaps_total")
+        log_event("generation_swap", previous=previous, generation=directory.name, records=manifest['count'])
+        return True
+
+    def _watch(self, poll_interval: float):
+        while not self._closed.wait(poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the current generation until a valid one is published
+                logger.exception("Could not switch to the new generation")
+
+    ### Queries
+
+    def submit_batch(self, queries: List[str], **kwargs) -> List[Future]:
+        """
+        Send queries to the workers in tasks of at most max_batch_per_task queries
+
+        Args:
+            queries: The search queries
+            **kwargs: RAGRetriever.retrieve_batch arguments (top_k, score_threshold, where, mode)
+
+        Returns:
+            One future per task, each resolving to the result lists of its queries
+        """
+        generation = self.generation
+        size = max(1, min(self.max_batch_per_task, math.ceil(len(queries) / self.workers)))
+        metrics.increment("pool_queries_total", len(queries))
+        return [self.executor.submit(_worker_retrieve_batch, generation, queries[start:start + size], kwargs)
+                for start in range(0, len(queries), size)]
+
+    def retrieve_batch(self, queries: List[str], **kwargs) -> List[List[Dict[str, Any]]]:
+        """Retrieve many queries in parallel across the workers, results in query order"""
+        queries = list(queries)
+        with metrics.span("pool_retrieve", batch_size=len(queries)):
+            return [result for future in self.submit_batch(queries, **kwargs) for result in future.result()]
+
+    def retrieve(self, query: str, **kwargs) -> List[Dict[str, Any]]:
+        """Retrieve one query on the next free worker"""
+        with metrics.span("pool_retrieve", batch_size=1):
+            return self.submit_batch([query], **kwargs)[0].result()[0]
+
+    def worker_pids(self) -> List[int]:
+        """Process IDs of the running workers"""
+        return list(getattr(self.executor, '_processes', {}) or {})
+
+    def close(self):
+        """Stop the watcher and the worker processes"""
+        self._closed.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,173 @@
+import os
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def context_key(context_ids: List[str]) -> str:
+    """Hash the retrieved chunk IDs so answers are tied to the exact context they were built from"""
+    return hashlib.sha1("\0".join(sorted(context_ids)).encode('utf-8')).hexdigest()
+
+
+class SemanticCache:
+    """
+    Semantic LLM answer cache
+
+    An answer is reused when a new query has the same retrieved context
+    (same chunk IDs) and its embedding is within a cosine threshold of a
+    cached query. Entries expire after ttl_seconds and the in-memory tier is
+    LRU-bounded; an optional SQLite tier keeps answers across restarts.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: Optional[float] = 3600, max_entries: int = 1024,
+                 cache_dir: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            threshold: Minimum cosine similarity between queries for a hit
+            ttl_seconds: Entry lifetime (None never expires)
+            max_entries: Maximum entries kept in memory
+            cache_dir: Directory of the optional on-disk tier
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()     # entry_id -> (context_key, unit embedding, answer, created_at)
+        self._by_context: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+        self._conn = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(str(Path(cache_dir) / "semantic_cache.sqlite"), check_same_thread=False)
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS answers (
+                id TEXT PRIMARY KEY, context_key TEXT NOT NULL, embedding BLOB NOT NULL,
+                answer TEXT NOT NULL, created_at REAL NOT NULL)""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_context ON answers (context_key)")
+            self._conn.commit()
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _drop(self, entry_id: str):
+        key, _, _, _ = self._entries.pop(entry_id)
+        ids = self._by_context.get(key)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_context[key]
+
+    def _insert(self, entry_id: str, key: str, vector: np.ndarray, answer: str, created_at: float):
+        self._entries[entry_id] = (key, vector, answer, created_at)
+        self._by_context.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.counters['evictions'] += 1
+
+    def _best_match(self, vector: np.ndarray, candidates):
+        """Return (similarity, index) of the most similar candidate embedding"""
+        similarities = np.stack(candidates) @ vector
+        best = int(np.argmax(similarities))
+        return float(similarities[best]), best
+
+    def lookup(self, query_embedding: np.ndarray, context_ids: List[str]) -> Optional[str]:
+        """
+        Return a cached answer for a semantically equivalent query over the same context
+
+        Args:
+            query_embedding: Embedding of the incoming query
+            context_ids: IDs of the chunks retrieved for it
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        key = context_key(context_ids)
+        vector = self._unit(query_embedding)
+        now = time.time()
+
+        with self._lock:
+            live = []
+            for entry_id in list(self._by_context.get(key, ())):
+                if self._expired(self._entries[entry_id][3], now):
+                    self._drop(entry_id)
+                    self.counters['expired'] += 1
+                else:
+                    live.append(entry_id)
+
+            if live:
+                similarity, best = self._best_match(vector, [self._entries[entry_id][1] for entry_id in live])
+                if similarity >= self.threshold:
+                    self._entries.move_to_end(live[best])
+                    self.counters['memory_hits'] += 1
+                    return self._entries[live[best]][2]
+
+            if self._conn is not None:
+                rows = self._conn.execute(
+                    "SELECT id, embedding, answer, created_at FROM answers WHERE context_key = ?", (key,)).fetchall()
+                rows = [row for row in rows if not self._expired(row[3], now) and row[0] not in self._entries]
+                if rows:
+                    vectors = [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+                    similarity, best = self._best_match(vector, vectors)
+                    if similarity >= self.threshold:
+                        entry_id, _, answer, created_at = rows[best]
+                        self._insert(entry_id, key, vectors[best], answer, created_at)
+                        self.counters['disk_hits'] += 1
+                        return answer
+
+            self.counters['misses'] += 1
+            return None
+
+    def store(self, query_embedding: np.ndarray, context_ids: List[str], answer: str):
+        """
+        Cache an answer
+
+        Args:
+            query_embedding: Embedding of the query that produced the answer
+            context_ids: IDs of the chunks the answer was generated from
+            answer: LLM answer
+        """
+        key = context_key(context_ids)
+        vector = self._unit(query_embedding)
+        entry_id = uuid.uuid4().hex
+        created_at = time.time()
+
+        with self._lock:
+            self._insert(entry_id, key, vector, answer, created_at)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO answers (id, context_key, embedding, answer, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (entry_id, key, vector.tobytes(), answer, created_at))
+                if self.ttl_seconds is not None:
+                    self._conn.execute("DELETE FROM answers WHERE created_at < ?", (created_at - self.ttl_seconds,))
+                self._conn.commit()
+
+    def clear(self):
+        """Drop every cached answer, e.g. after re-ingestion"""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from src.components.BaseVectorStore import (ALIAS_FIELD, ALIAS_SEPARATOR, BaseVectorStore, create_vector_store,
+                                            may_match, metadata_views)
+
+_MISSING = object()
+
+
+class ShardedVectorStore(BaseVectorStore):
+    """
+    Vector store split into one backend store per value of a metadata field
+
+    Records are routed to a shard by their shard_key metadata (source_file
+    by default, i.e. one shard per filing). A catalog keeps, for every
+    shard, the routing_keys values all of its records share (e.g. company
+    and year). A search with a where filter only visits the shards whose
+    catalog entry can satisfy it, queries those shards in parallel and
+    merges their hits, so latency follows the size of the matching shards
+    rather than the whole corpus.
+    """
+
+    def __init__(self, persist_directory: str = "../data/sharded_store", shard_backend: str = "chroma",
+                 shard_key: str = "source_file", routing_keys: Tuple[str, ...] = ("source_file", "company", "year"),
+                 max_workers: int = 8, collection_name: str = "pdf_documents", **backend_kwargs):
+        """
+        Initialize the store, loading its catalog from persist_directory if it exists
+
+        Args:
+            persist_directory: Directory holding the catalog and every shard
+            shard_backend: Backend of each shard ("chroma", "faiss" or "compressed")
+            shard_key: Metadata field whose value selects the shard of a record
+            routing_keys: Metadata fields recorded per shard for where routing
+            max_workers: Shards searched concurrently
+            collection_name: Prefix of the per-shard Chroma collections
+            **backend_kwargs: Passed to every shard's constructor
+        """
+        self.persist_directory = persist_directory
+        self.backend = shard_backend.lower()
+        if self.backend == "sharded":
+            raise ValueError("Shards cannot themselves be sharded")
+        self.shard_key = shard_key
+        self.routing_keys = tuple(routing_keys)
+        self.max_workers = max_workers
+        self.collection_name = collection_name
+        self.backend_kwargs = backend_kwargs
+
+        self.catalog: Dict[str, Dict[str, Any]] = {}   # shard name -> routing metadata shared by its records
+        self.shards: Dict[str, BaseVectorStore] = {}   # shards opened so far
+        self._executor = None
+
+        os.makedirs(persist_directory, exist_ok=True)
+        if (Path(persist_directory) / "catalog.json").exists():
+            self.load()
+        print(f"Sharded vector store initialized ({self.backend}, by {self.shard_key}). Shards: {len(self.catalog)}")
+
+    @property
+    def filters_aliases(self) -> bool:
+        # Routing expands alias sources, but Chroma shards filter natively
+        return self.backend != "chroma"
+
+    ### Shards
+
+    @staticmethod
+    def shard_name(value: Any) -> str:
+        """Filesystem and collection safe shard name for a shard_key value"""
+        slug = re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_")[:40] or "shard"
+        return f"{slug}_{hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:8]}"
+
+    def _open_shard(self, name: str) -> BaseVectorStore:
+        if self.backend == "chroma":
+            # One Chroma database, one collection per shard
+            return create_vector_store("chroma", collection_name=f"{self.collection_name}_{name}",
+                                       persist_directory=self.persist_directory, **self.backend_kwargs)
+        return create_vector_store(self.backend, persist_directory=str(Path(self.persist_directory) / "shards" / name),
+                                   **self.backend_kwargs)
+
+    def _shard(self, name: str) -> BaseVectorStore:
+        """Return a shard, opening it on first use"""
+        shard = self.shards.get(name)
+        if shard is None:
+            shard = self.shards[name] = self._open_shard(name)
+        return shard
+
+    def _record_attributes(self, name: str, metadata: Dict[str, Any]):
+        """Keep only the routing values every record of the shard agrees on, and all their alias sources"""
+        values = {key: metadata[key] for key in self.routing_keys if key in metadata}
+        attributes = self.catalog.get(name)
+        if attributes is None:
+            attributes = self.catalog[name] = values
+        else:
+            for key in list(attributes):
+                if key != ALIAS_FIELD and values.get(key, _MISSING) != attributes[key]:
+                    del attributes[key]
+        # Filters on a source whose duplicates were dropped must still reach the shard of their canonical chunks
+        aliases = [alias for alias in str(attributes.get(ALIAS_FIELD) or "").split(ALIAS_SEPARATOR) if alias]
+        for alias in str(metadata.get(ALIAS_FIELD) or "").split(ALIAS_SEPARATOR):
+            if alias and alias not in aliases:
+                aliases.append(alias)
+        if aliases:
+            attributes[ALIAS_FIELD] = ALIAS_SEPARATOR.join(aliases)
+
+    def _partition(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+        """Group record positions by destination shard"""
+        partitions = {}
+        for position, (chunk_id, metadata) in enumerate(zip(ids, metadatas)):
+            metadata = metadata or {}
+            if self.shard_key not in metadata:
+                raise ValueError(f"Record {chunk_id} has no '{self.shard_key}' metadata to shard on")
+            name = self.shard_name(metadata[self.shard_key])
+            self._record_attributes(name, metadata)
+            partitions.setdefault(name, []).append(position)
+        return partitions
+
+    def _write(self, method: str, ids: List[str], embeddings: np.ndarray, documents: List[str],
+               metadatas: List[Dict[str, Any]]):
+        embeddings = np.asarray(embeddings)
+        for name, positions in self._partition(ids, metadatas).items():
+            getattr(self._shard(name), method)([ids[i] for i in positions], embeddings[positions],
+                                               [documents[i] for i in positions], [metadatas[i] for i in positions])
+
+    def route(self, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Names of the shards that can hold records matching the filter"""
+        return [name for name, attributes in self.catalog.items() if may_match(attributes, where)]
+
+    def infer_where(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Build a where filter from routing values mentioned in a question
+
+        Every routing key other than the shard key whose catalog values
+        appear as words in the query (e.g. "apple", 2024) becomes a clause.
+
+        Args:
+            query: User question
+
+        Returns:
+            Filter expression, or None if the query names no routing value
+        """
+        words = set(re.findall(r"[a-z0-9]+", query.lower()))
+        clauses = []
+        for key in self.routing_keys:
+            if key == self.shard_key:
+                continue
+            values = {view[key] for attributes in self.catalog.values() for view in metadata_views(attributes)
+                      if key in view}
+            mentioned = sorted((value for value in values if str(value).lower() in words), key=str)
+            if len(mentioned) == 1:
+                clauses.append({key: mentioned[0]})
+            elif mentioned:
+                clauses.append({key: {"$in": mentioned}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    ### BaseVectorStore interface
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert new records into their shards"""
+        self._write("add", ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Insert records, replacing existing records with the same ID"""
+        # Chunk IDs derive from the source file, so a record always lands in the shard holding its old version
+        self._write("upsert", ids, embeddings, documents, metadatas)
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing records in the shards their metadata routes them to"""
+        for name, positions in self._partition(ids, metadatas).items():
+            if name in self.catalog:
+                self._shard(name).update_metadata([ids[i] for i in positions], [metadatas[i] for i in positions])
+
+    def max_batch_size(self) -> Optional[int]:
+        """Smallest batch limit of the open shards (a batch never puts more records in one shard)"""
+        limits = [limit for limit in (shard.max_batch_size() for shard in self.shards.values()) if limit]
+        return min(limits) if limits else None
+
+    def delete(self, ids: List[str]):
+        """Delete records by ID from whichever shard holds them"""
+        if not ids:
+            return
+        for name in self.catalog:
+            self._shard(name).delete(ids)
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Search the shards that can match where, in parallel, and merge their hits
+
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma-style metadata filter (also used for routing)
+            include_embeddings: Also return each hit's stored vector under 'embedding'
+
+        Returns:
+            One list of {'id','content','metadata','distance'} hits per query
+        """
+        queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        names = self.route(where)
+        if not names or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        def search_shard(name):
+            return self._shard(name).search(queries, top_k=top_k, where=where, include_embeddings=include_embeddings)
+
+        if len(names) == 1:
+            per_shard = [search_shard(names[0])]
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="shard-search")
+            per_shard = list(self._executor.map(search_shard, names))
+
+        merged = []
+        for query_index in range(len(queries)):
+            hits = [hit for shard_hits in per_shard for hit in shard_hits[query_index]]
+            hits.sort(key=lambda hit: hit['distance'])
+            merged.append(hits[:top_k])
+        return merged
+
+    def get(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch records by ID from whichever shard holds them (None for unknown IDs)"""
+        found = {}
+        for name in self.catalog:
+            for record in self._shard(name).get(ids):
+                if record is not None:
+                    found[record['id']] = record
+        return [found.get(chunk_id) for chunk_id in ids]
+
+    def count(self) -> int:
+        """Number of stored records across all shards"""
+        return sum(self._shard(name).count() for name in self.catalog)
+
+    def iter_records(self, batch_size: int = 1024):
+        """Yield (ids, embeddings, documents, metadatas) batches, shard by shard"""
+        for name in self.catalog:
+            yield from self._shard(name).iter_records(batch_size)
+
+    def persist(self):
+        """Flush every opened shard and write the catalog"""
+        for shard in self.shards.values():
+            shard.persist()
+
+        directory = Path(self.persist_directory)
+        settings = {'backend': self.backend, 'shard_key': self.shard_key,
+                    'routing_keys': list(self.routing_keys), 'shards': self.catalog}
+        with open(directory / "catalog.json.tmp", 'w', encoding='utf-8') as file_obj:
+            json.dump(settings, file_obj)
+        os.replace(directory / "catalog.json.tmp", directory / "catalog.json")
+
+    def load(self):
+        """(Re)load the catalog; shards are reopened lazily"""
+        directory = Path(self.persist_directory)
+        with open(directory / "catalog.json", 'r', encoding='utf-8') as file_obj:
+            settings = json.load(file_obj)
+        if settings['backend'] != self.backend or settings['shard_key'] != self.shard_key:
+            raise ValueError(f"Store at {directory} holds {settings['backend']} shards by {settings['shard_key']}, "
+                             f"not {self.backend} shards by {self.shard_key}")
+        self.catalog = settings['shards']
+        self.shards = {}
@@ -0,0 +1,500 @@
+"""
+Portable, versioned vector store snapshots
+
+A snapshot directory holds:
+    embeddings.npy            float32 (count, dim) unit vectors, memory-mappable
+    ids.utf8, documents.utf8  UTF-8 string columns, with
+    *.offsets.npy             int64 (count + 1) row offsets into them
+    ids.sorted.npy            the IDs sorted (UTF-8 bytes), with
+    ids.sorted_rows.npy       int64 row of each, so IDs are found by binary search
+    metadata.json             metadata columns, {"columns": {field: [value per row]}}
+    bm25/                     the BM25 index of the exported store, if it had one,
+                              also in the memory-mapped layout of MappedBM25Index
+    pages/                    its PageStore of full page texts, if it had one
+    manifest.json             format version, embedding model, dimension, row count
+                              and the size and SHA-256 of every file above
+
+Export from, and import into, the store selected by VECTOR_STORE_BACKEND:
+    python -m src.components.Snapshot export data/snapshot
+    python -m src.components.Snapshot import data/snapshot
+or serve a snapshot directly with VECTOR_STORE_BACKEND=snapshot. For
+multi-process serving, publish numbered generations under one root
+(gen-000001, gen-000002, ... plus a CURRENT pointer) that a
+RetrievalWorkerPool switches to atomically:
+    python -m src.components.Snapshot publish data/generations
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from src.components.BaseVectorStore import BaseVectorStore, matches_where
+from src.components.BulkWriter import BulkWriter
+from src.components.SparseIndex import BM25Index
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+CURRENT_NAME = "CURRENT"
+
+
+def file_sha256(file_path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_obj:
+        for block in iter(lambda: file_obj.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _StringColumnWriter:
+    """Appends UTF-8 strings to <name>.utf8 and records their offsets in <name>.offsets.npy"""
+
+    def __init__(self, directory: Path, name: str):
+        self.directory = directory
+        self.name = name
+        self.file_obj = open(directory / f"{name}.utf8", 'wb')
+        self.offsets = [0]
+
+    def extend(self, values: List[str]):
+        for value in values:
+            data = (value or "").encode('utf-8')
+            self.file_obj.write(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+
+    def close(self):
+        self.file_obj.close()
+        np.save(self.directory / f"{self.name}.offsets.npy", np.asarray(self.offsets, dtype=np.int64))
+
+
+class _StringColumn:
+    """Memory-mapped string column, rows are decoded on access"""
+
+    def __init__(self, directory: Path, name: str):
+        self.offsets = np.load(directory / f"{name}.offsets.npy", mmap_mode='r')
+        data_path = directory / f"{name}.utf8"
+        # np.memmap cannot map an empty file
+        self.data = np.memmap(data_path, dtype=np.uint8, mode='r') if data_path.stat().st_size \
+            else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+
+def _write_snapshot(store: BaseVectorStore, tmp_directory: Path, model_name: str, batch_size: int,
+                    total: int) -> Dict[str, Any]:
+    """Write the snapshot files and manifest of a store into tmp_directory"""
+    embeddings, rows, metadatas, all_ids = None, 0, [], []
+    ids, documents = _StringColumnWriter(tmp_directory, "ids"), _StringColumnWriter(tmp_directory, "documents")
+    for batch_ids, vectors, batch_documents, batch_metadatas in store.iter_records(batch_size):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(tmp_directory / "embeddings.npy", mode='w+', dtype=np.float32,
+                                                   shape=(total, vectors.shape[1]))
+        if rows + len(vectors) > total:
+            raise ValueError("The vector store changed during the export")
+        # Stored unit-length, so serving scores cosine similarity with a plain dot product
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        embeddings[rows:rows + len(vectors)] = vectors / np.maximum(norms, 1e-12)
+        ids.extend(batch_ids)
+        all_ids.extend(batch_ids)
+        documents.extend(batch_documents)
+        metadatas.extend(dict(metadata or {}) for metadata in batch_metadatas)
+        rows += len(vectors)
+    ids.close()
+    documents.close()
+    if rows != total:
+        raise ValueError(f"The vector store yielded {rows} of its {total} records")
+    dim = embeddings.shape[1]
+    embeddings.flush()
+    del embeddings
+
+    # Serving processes map these instead of each building an ID -> row dict
+    keys = np.array([(chunk_id or "").encode('utf-8') for chunk_id in all_ids], dtype=np.bytes_)
+    order = np.argsort(keys, kind='stable')
+    np.save(tmp_directory / "ids.sorted.npy", keys[order])
+    np.save(tmp_directory / "ids.sorted_rows.npy", order.astype(np.int64))
+
+    fields = sorted({field for metadata in metadatas for field in metadata})
+    with open(tmp_directory / "metadata.json", 'w', encoding='utf-8') as file_obj:
+        json.dump({'columns': {field: [metadata.get(field) for metadata in metadatas] for field in fields}},
+                  file_obj)
+
+    # Chunks of a parent-retrieval store carry no text, the page store is part of the data
+    page_directory = Path(getattr(store, 'persist_directory', "")) / "pages"
+    if getattr(store, 'persist_directory', None) and (page_directory / "pages.json").exists():
+        os.makedirs(tmp_directory / "pages")
+        for name in ("pages.bin", "pages.json"):
+            shutil.copy2(page_directory / name, tmp_directory / "pages" / name)
+
+    files = {}
+    for path in sorted(tmp_directory.rglob("*")):
+        if path.is_file():
+            files[path.relative_to(tmp_directory).as_posix()] = {'bytes': path.stat().st_size,
+                                                                 'sha256': file_sha256(path)}
+    # The BM25 index is convenience data that can be rebuilt, so it is copied but not checksummed
+    sparse_directory = Path(getattr(store, 'persist_directory', "")) / "bm25"
+    if getattr(store, 'persist_directory', None) and sparse_directory.is_dir():
+        shutil.copytree(sparse_directory, tmp_directory / "bm25")
+        sparse_index = BM25Index(str(tmp_directory / "bm25"))
+        if len(sparse_index):
+            sparse_index.export_mapped(tmp_directory / "bm25")
+
+    manifest = {'format': SNAPSHOT_FORMAT, 'model_name': model_name, 'dim': dim, 'count': total,
+                'normalized': True, 'source_backend': type(store).__name__,
+                'created_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"), 'files': files}
+    with open(tmp_directory / MANIFEST_NAME, 'w', encoding='utf-8') as file_obj:
+        json.dump(manifest, file_obj, indent=2)
+
+    return manifest
+
+
+def export_snapshot(store: BaseVectorStore, directory, model_name: str, batch_size: int = 1024) -> Dict[str, Any]:
+    """
+    Write every record of a store to a snapshot directory
+
+    The snapshot is built next to directory and swapped in once complete,
+    so a crash never leaves a half-written snapshot behind.
+
+    Args:
+        store: Any vector store implementing iter_records
+        directory: Snapshot directory (replaced if it exists)
+        model_name: Embedding model that produced the store's vectors
+        batch_size: Records read from the store at a time
+
+    Returns:
+        The snapshot manifest
+    """
+    directory = Path(directory)
+    total = store.count()
+    if total == 0:
+        raise ValueError("The vector store is empty, there is nothing to export")
+
+    tmp_directory = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    try:
+        manifest = _write_snapshot(store, tmp_directory, model_name, batch_size, total)
+    except BaseException:
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        raise
+
+    old_directory = directory.with_name(directory.name + ".old")
+    shutil.rmtree(old_directory, ignore_errors=True)
+    if directory.exists():
+        os.replace(directory, old_directory)
+    os.replace(tmp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    print(f"Exported {total} records ({manifest['dim']}-d, {model_name}) to snapshot {directory}")
+    return manifest
+
+
+def read_manifest(directory, model_name: Optional[str] = None, verify: bool = True) -> Dict[str, Any]:
+    """
+    Read and validate a snapshot manifest
+
+    Args:
+        directory: Snapshot directory
+        model_name: Embedding model the snapshot must have been built with (None skips the check)
+        verify: Check every file's SHA-256 (sizes are always checked)
+
+    Returns:
+        The manifest
+    """
+    directory = Path(directory)
+    with open(directory / MANIFEST_NAME, 'r', encoding='utf-8') as file_obj:
+        manifest = json.load(file_obj)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Snapshot at {directory} has format {manifest.get('format')}, expected {SNAPSHOT_FORMAT}")
+    if model_name is not None and manifest['model_name'] != model_name:
+        raise ValueError(f"Snapshot at {directory} was built with {manifest['model_name']}, not {model_name}; "
+                         f"its vectors are not comparable with this model's queries")
+
+    for name, entry in manifest['files'].items():
+        path = directory / name
+        if not path.exists() or path.stat().st_size != entry['bytes']:
+            raise ValueError(f"Snapshot file {path} is missing or truncated")
+        if verify and file_sha256(path) != entry['sha256']:
+            raise ValueError(f"Snapshot file {path} does not match its checksum")
+    return manifest
+
+
+class SnapshotVectorStore(BaseVectorStore):
+    """
+    Read-only vector store served straight from a memory-mapped snapshot
+
+    Opening it maps the embedding matrix and string columns without
+    copying or parsing them, so a fresh process can serve as soon as the
+    manifest is checked; pages are read in by the OS as searches touch
+    them. Searches are exact, scanning the embeddings block by block.
+    """
+
+    def __init__(self, persist_directory: str = "../data/snapshot", model_name: Optional[str] = None,
+                 verify: bool = True, block_size: int = 65536, mask_cache_size: int = 64):
+        """
+        Open a snapshot
+
+        Args:
+            persist_directory: Snapshot directory
+            model_name: Embedding model of the queries; a snapshot built with another model is refused
+            verify: Check file checksums on load (reads every file once)
+            block_size: Rows scored per block, bounds temporary memory during search
+            mask_cache_size: Number of where filters whose row masks are kept
+        """
+        self.persist_directory = persist_directory
+        self.expected_model = model_name
+        self.verify = verify
+        self.block_size = block_size
+        self.mask_cache_size = mask_cache_size
+        self.load()
+        print(f"Snapshot vector store initialized ({self.model_name}). Existing documents: {self.count()}")
+
+    @property
+    def model_name(self) -> str:
+        return self.manifest['model_name']
+
+    @property
+    def dim(self) -> int:
+        return self.manifest['dim']
+
+    ### Rows
+
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        return {field: values[row] for field, values in self._columns.items() if values[row] is not None}
+
+    def _mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Boolean mask of the rows matching a filter (cached per filter)"""
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches_where(self._metadata(row), where) for row in range(self.count())),
+                               dtype=bool, count=self.count())
+            if len(self._masks) >= self.mask_cache_size:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[key] = mask
+        return mask
+
+    def _row_of(self, chunk_id: str) -> Optional[int]:
+        if self._sorted_ids is not None:
+            key = chunk_id.encode('utf-8')
+            position = int(np.searchsorted(self._sorted_ids, key))
+            if position < len(self._sorted_ids) and self._sorted_ids[position] == key:
+                return int(self._sorted_rows[position])
+            return None
+        # Snapshots written before the sorted ID column existed
+        if self._rows_by_id is None:
+            self._rows_by_id = {self._ids[row]: row for row in range(self.count())}
+        return self._rows_by_id.get(chunk_id)
+
+    ### BaseVectorStore interface
+
+    def add(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError("Snapshot stores are read-only; import the snapshot into a writable backend")
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError("Snapshot stores are read-only; import the snapshot into a writable backend")
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError("Snapshot stores are read-only; import the snapshot into a writable backend")
+
+    def search(self, query_embeddings: np.ndarray, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Exact cosine search over the memory-mapped embeddings
+
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma-style metadata filter
+            include_embeddings: Also return each hit's stored (unit) vector under 'embedding'
+
+        Returns:
+            One list of {'id','content','metadata','distance'} hits per query
+        """
+        queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        results = [[] for _ in range(len(queries))]
+        if self.count() == 0 or top_k <= 0:
+            return results
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match snapshot dimension {self.dim}")
+
+        mask = self._mask(where) if where else None
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.count(), self.block_size):
+            stop = min(start + self.block_size, self.count())
+            if mask is None:
+                rows, block = np.arange(start, stop), self.embeddings[start:stop]
+            else:
+                rows = start + np.flatnonzero(mask[start:stop])
+                if len(rows) == 0:
+                    continue
+                block = self.embeddings[rows]
+            best_scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, (len(queries), len(rows)))], axis=1)
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        for query_index in range(len(queries)):
+            for position in np.argsort(-best_scores[query_index]):
+                row = int(best_rows[query_index, position])
+                results[query_index].append({'id': self._ids[row], 'content': self._documents[row],
+                                             'metadata': self._metadata(row),
+                                             'distance': 1.0 - float(best_scores[query_index, position])})
+                if include_embeddings:
+                    results[query_index][-1]['embedding'] = np.array(self.embeddings[row])
+        return results
+
+    def get(self, ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch records by ID (None for unknown IDs)"""
+        records = []
+        for chunk_id in ids:
+            row = self._row_of(chunk_id)
+            records.append(None if row is None else
+                           {'id': chunk_id, 'content': self._documents[row], 'metadata': self._metadata(row)})
+        return records
+
+    def count(self) -> int:
+        """Number of stored records"""
+        return self.manifest['count']
+
+    def iter_records(self, batch_size: int = 1024):
+        """Yield (ids, embeddings, documents, metadatas) batches in row order"""
+        for start in range(0, self.count(), batch_size):
+            rows = range(start, min(start + batch_size, self.count()))
+            yield ([self._ids[row] for row in rows], np.array(self.embeddings[start:rows.stop]),
+                   [self._documents[row] for row in rows], [self._metadata(row) for row in rows])
+
+    def persist(self):
+        """Snapshots are immutable, nothing to flush"""
+
+    def load(self):
+        """(Re)map the snapshot in persist_directory"""
+        directory = Path(self.persist_directory)
+        self.manifest = read_manifest(directory, self.expected_model, self.verify)
+        self.embeddings = np.load(directory / "embeddings.npy", mmap_mode='r')
+        self._ids = _StringColumn(directory, "ids")
+        self._documents = _StringColumn(directory, "documents")
+        with open(directory / "metadata.json", 'r', encoding='utf-8') as file_obj:
+            self._columns = json.load(file_obj)['columns']
+        self._sorted_ids, self._sorted_rows = None, None
+        if (directory / "ids.sorted.npy").exists():
+            self._sorted_ids = np.load(directory / "ids.sorted.npy", mmap_mode='r')
+            self._sorted_rows = np.load(directory / "ids.sorted_rows.npy", mmap_mode='r')
+        self._rows_by_id = None
+        self._masks = {}
+
+
+def import_snapshot(directory, store: BaseVectorStore, model_name: Optional[str] = None, batch_size: int = 1024,
+                    verify: bool = True) -> int:
+    """
+    Upsert every record of a snapshot into a writable store
+
+    Args:
+        directory: Snapshot directory
+        store: Destination vector store
+        model_name: Embedding model the store is queried with; a snapshot built with another model is refused
+        batch_size: Records written at a time
+        verify: Check file checksums first
+
+    Returns:
+        Number of imported records
+    """
+    snapshot = SnapshotVectorStore(str(directory), model_name=model_name, verify=verify)
+    # The next batch is read from the snapshot while the previous one is written
+    with BulkWriter(store, background=True) as writer:
+        for ids, embeddings, documents, metadatas in snapshot.iter_records(batch_size):
+            writer.write(ids, embeddings, documents, metadatas)
+    store.persist()
+
+    for name in ("bm25", "pages"):
+        if (Path(directory) / name).is_dir() and getattr(store, 'persist_directory', None):
+            shutil.copytree(Path(directory) / name, Path(store.persist_directory) / name, dirs_exist_ok=True)
+    print(f"Imported {snapshot.count()} records from snapshot {directory}")
+    return snapshot.count()
+
+
+### Generations
+
+def current_generation(root) -> Optional[Path]:
+    """Snapshot directory the CURRENT pointer of a generations root names (None before the first publish)"""
+    pointer = Path(root) / CURRENT_NAME
+    if not pointer.exists():
+        return None
+    return Path(root) / pointer.read_text(encoding='utf-8').strip()
+
+
+def publish_generation(store: BaseVectorStore, root, model_name: str, keep: int = 2,
+                       batch_size: int = 1024) -> Path:
+    """
+    Export a store as the next snapshot generation and make it current
+
+    The generation is fully written before the CURRENT pointer is replaced
+    (atomically), so readers only ever see complete generations. Older
+    generations beyond keep are deleted; processes still serving from one
+    keep their memory maps valid until they switch.
+
+    Args:
+        store: Store holding the new index
+        root: Generations root directory
+        model_name: Embedding model that produced the store's vectors
+        keep: Generations kept on disk, the new one included
+        batch_size: Records read from the store at a time
+
+    Returns:
+        The new generation's directory
+    """
+    root = Path(root)
+    os.makedirs(root, exist_ok=True)
+    numbers = [int(path.name.split("-")[1]) for path in root.glob("gen-*") if path.name.split("-")[1].isdigit()]
+    directory = root / f"gen-{max(numbers, default=0) + 1:06d}"
+    export_snapshot(store, directory, model_name, batch_size)
+
+    tmp_pointer = root / (CURRENT_NAME + ".tmp")
+    tmp_pointer.write_text(directory.name, encoding='utf-8')
+    os.replace(tmp_pointer, root / CURRENT_NAME)
+
+    generations = sorted(path for path in root.glob("gen-*") if path.name.split("-")[1].isdigit())
+    for old_directory in generations[:-max(keep, 1)]:
+        shutil.rmtree(old_directory, ignore_errors=True)
+    print(f"Published generation {directory.name}")
+    return directory
+
+
+def main():
+    from src.components.BaseVectorStore import vector_store_from_env
+    from src.components.EmbeddingManager import DEFAULT_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "import", "verify", "publish"))
+    parser.add_argument("directory", help="Snapshot directory (generations root for publish)")
+    parser.add_argument("--data-dir", default=str(Path(__file__).resolve().parent.parent.parent / "data"),
+                        help="Data directory of the store selected by VECTOR_STORE_BACKEND")
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL_NAME),
+                        help="Embedding model recorded on export and required on import")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        manifest = read_manifest(args.directory, args.model)
+        print(f"Snapshot {args.directory} is valid: {manifest['count']} records, {manifest['dim']}-d, "
+              f"{manifest['model_name']}")
+    elif args.command == "export":
+        export_snapshot(vector_store_from_env(args.data_dir), args.directory, args.model, args.batch_size)
+    elif args.command == "publish":
+        publish_generation(vector_store_from_env(args.data_dir), args.directory, args.model,
+                           batch_size=args.batch_size)
+    else:
+        import_snapshot(args.directory, vector_store_from_env(args.data_dir), args.model, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
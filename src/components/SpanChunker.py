@@ -0,0 +1,191 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+class PageSpan:
+    """
+    A chunk addressed as a (page, start, end) span of its page's text
+
+    Quacks like a Langchain document: page_content slices the page text
+    only when it is read (for embedding or storing) and metadata is the
+    page's metadata plus start_index/end_index, built on first access.
+    """
+
+    __slots__ = ('page', 'start', 'end', '_metadata')
+
+    def __init__(self, page: Any, start: int, end: int):
+        self.page = page
+        self.start = start
+        self.end = end
+        self._metadata = None
+
+    @property
+    def page_content(self) -> str:
+        return self.page.page_content[self.start:self.end]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = {**self.page.metadata, 'start_index': self.start, 'end_index': self.end}
+        return self._metadata
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"PageSpan({self.page.metadata.get('source_file')!r}, page={self.page.metadata.get('page')}, " \
+               f"{self.start}:{self.end})"
+
+
+class SpanChunker:
+    """
+    Single-pass recursive chunker working on character offsets
+
+    Uses the separator hierarchy and merge rules of Langchain's
+    RecursiveCharacterTextSplitter (separators kept at the start of the
+    following piece, chunks stripped, chunk_overlap carried over), so it
+    yields the same chunks and start offsets, but never builds intermediate
+    strings: pieces, merges and overlaps are (start, end) offsets into the
+    page text. With a tokenizer, chunks are also capped at max_tokens model
+    tokens, counted from one offset-mapped tokenization per page, so no
+    chunk is silently truncated by the embedding model.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 separators: Sequence[str] = DEFAULT_SEPARATORS, tokenizer: Any = None,
+                 max_tokens: Optional[int] = None):
+        """
+        Initialize the chunker
+
+        Args:
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared between neighbouring chunks
+            separators: Split points tried in order, "" splits anywhere
+            tokenizer: Optional HuggingFace (fast) tokenizer of the embedding model
+            max_tokens: Maximum tokens per chunk, excluding special tokens (needs tokenizer)
+        """
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})")
+        if max_tokens is not None and tokenizer is None:
+            raise ValueError("A token limit needs the embedding model's tokenizer")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def for_embedding_model(cls, model: Any, chunk_size: int = 1000, chunk_overlap: int = 200,
+                            **kwargs) -> "SpanChunker":
+        """Chunker capped at a SentenceTransformer's max sequence length (minus its special tokens)"""
+        tokenizer = model.tokenizer
+        max_tokens = model.max_seq_length - tokenizer.num_special_tokens_to_add()
+        return cls(chunk_size, chunk_overlap, tokenizer=tokenizer, max_tokens=max_tokens, **kwargs)
+
+    ### Measuring
+
+    def _token_starts(self, text: str) -> Optional[List[int]]:
+        """Start offset of every token of the page (None in character-only mode)"""
+        if self.max_tokens is None:
+            return None
+        if getattr(self.tokenizer, 'is_fast', False):
+            offsets = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True,
+                                     return_attention_mask=False, verbose=False)['offset_mapping']
+            return [start for start, _ in offsets]
+        return None
+
+    def _tokens(self, text: str, token_starts: Optional[List[int]], start: int, end: int) -> int:
+        if token_starts is not None:
+            return bisect_left(token_starts, end) - bisect_left(token_starts, start)
+        # Slow tokenizers have no offset mapping, so the span has to be tokenized on its own
+        return len(self.tokenizer.tokenize(text[start:end]))
+
+    def _too_long(self, text: str, token_starts, start: int, end: int, strict: bool = False) -> bool:
+        length = end - start
+        if length > self.chunk_size or (strict and length == self.chunk_size):
+            return True
+        return self.max_tokens is not None and self._tokens(text, token_starts, start, end) > self.max_tokens
+
+    ### Splitting
+
+    @staticmethod
+    def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def _pieces(self, text: str, start: int, end: int, separator: str) -> Iterator[Tuple[int, int]]:
+        """Offsets of the pieces between separators (each separator starts the following piece)"""
+        if separator == "":
+            yield from ((position, position + 1) for position in range(start, end))
+            return
+        piece_start, position = start, text.find(separator, start, end)
+        while position != -1:
+            if position > piece_start:
+                yield piece_start, position
+            piece_start = position
+            position = text.find(separator, position + len(separator), end)
+        if end > piece_start:
+            yield piece_start, end
+
+    def _merge(self, text: str, token_starts, pieces: List[Tuple[int, int]], chunks: List[Tuple[int, int]]):
+        """Pack contiguous pieces into chunks, carrying up to chunk_overlap characters into the next one"""
+        window = deque()
+        for start, end in pieces:
+            if window and self._too_long(text, token_starts, window[0][0], end):
+                chunks.append(self._strip(text, window[0][0], window[-1][1]))
+                while window and (window[-1][1] - window[0][0] > self.chunk_overlap
+                                  or self._too_long(text, token_starts, window[0][0], end)):
+                    window.popleft()
+            window.append((start, end))
+        if window:
+            chunks.append(self._strip(text, window[0][0], window[-1][1]))
+
+    def _split(self, text: str, token_starts, start: int, end: int, separators: Sequence[str],
+               chunks: List[Tuple[int, int]]):
+        separator, remaining = separators[-1], ()
+        for index, candidate in enumerate(separators):
+            if candidate == "" or text.find(candidate, start, end) != -1:
+                separator, remaining = candidate, separators[index + 1:]
+                break
+
+        good = []
+        for piece_start, piece_end in self._pieces(text, start, end, separator):
+            if not self._too_long(text, token_starts, piece_start, piece_end, strict=True):
+                good.append((piece_start, piece_end))
+                continue
+            if good:
+                self._merge(text, token_starts, good, chunks)
+                good = []
+            if remaining:
+                self._split(text, token_starts, piece_start, piece_end, remaining, chunks)
+            else:
+                chunks.append(self._strip(text, piece_start, piece_end))
+        if good:
+            self._merge(text, token_starts, good, chunks)
+
+    def split_text(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of the chunks of a text, empty chunks dropped"""
+        chunks = []
+        if text:
+            self._split(text, self._token_starts(text), 0, len(text), self.separators, chunks)
+        return [(start, end) for start, end in chunks if end > start]
+
+    def split_documents(self, documents: Iterable[Any]) -> Iterator[PageSpan]:
+        """
+        Chunk pages into spans
+
+        Args:
+            documents: Langchain documents (pages)
+
+        Yields:
+            PageSpan chunks, page by page, carrying start_index and end_index metadata
+        """
+        for page in documents:
+            for start, end in self.split_text(page.page_content):
+                yield PageSpan(page, start, end)
@@ -0,0 +1,391 @@
+import os
+import re
+import json
+import numpy as np
+import scipy.sparse as sp
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils import save_object_sparse, load_object_sparse
+from src.components.BaseVectorStore import ALIAS_FIELD, may_match
+
+# Words, fiscal years, product names like "h100" and figures like "26.9" or "1,234"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+# Read-only memory-mappable layout written by BM25Index.export_mapped
+MAPPED_STATE_NAME = "bm25_mapped.json"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a text and split it into BM25 terms"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Sparse BM25 inverted index over chunk texts
+
+    Term frequencies are kept as a scipy.sparse CSR matrix (chunks x terms).
+    The BM25 weight matrix is derived from it lazily after every change, so
+    a batch of queries is scored with one sparse matrix product. Deleted
+    chunks are masked out and dropped from the matrix on persist once they
+    make up more than compact_ratio of the rows.
+
+    Every row also belongs to a group of chunks sharing the same routing
+    metadata (source_file, company, year, alias_sources), so where filters
+    on those fields are applied as a row mask before ranking.
+    """
+
+    def __init__(self, persist_directory: Optional[str] = None, k1: float = 1.5, b: float = 0.75,
+                 compact_ratio: float = 0.2, routing_keys: Tuple[str, ...] = ("source_file", "company", "year")):
+        """
+        Initialize the index, loading it from persist_directory if it was saved there
+
+        Args:
+            persist_directory: Directory holding bm25_tf.npz and bm25_index.json
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            compact_ratio: Fraction of deleted rows that triggers compaction on persist
+            routing_keys: Metadata fields recorded per row group for where filtering
+        """
+        self.persist_directory = persist_directory
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.routing_keys = tuple(routing_keys)
+
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []     # row -> chunk ID, None once deleted
+        self.rows: Dict[str, int] = {}
+        self.groups: List[Dict[str, Any]] = []     # routing metadata shared by a group of rows
+        self.row_groups: List[int] = []            # row -> group
+        self._group_lookup: Dict[str, int] = {}
+        self._tf = sp.csr_matrix((0, 0), dtype=np.float32)
+        self._pending: List[Tuple[List[int], List[int], List[int]]] = []
+        self._weights = None
+
+        if persist_directory and (Path(persist_directory) / "bm25_index.json").exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.rows
+
+    ### Updates
+
+    def _group_of(self, metadata: Optional[Dict[str, Any]]) -> int:
+        attributes = {key: metadata[key] for key in self.routing_keys + (ALIAS_FIELD,) if key in (metadata or {})}
+        key = json.dumps(attributes, sort_keys=True)
+        group = self._group_lookup.get(key)
+        if group is None:
+            group = self._group_lookup[key] = len(self.groups)
+            self.groups.append(attributes)
+        return group
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        """
+        Index chunk texts, replacing chunks that are already indexed under the same ID
+
+        Args:
+            ids: Chunk IDs
+            texts: Chunk texts
+            metadatas: Optional chunk metadata (only the routing keys are kept)
+        """
+        self.delete([chunk_id for chunk_id in ids if chunk_id in self.rows])
+        metadatas = metadatas if metadatas is not None else [None] * len(ids)
+        rows, cols, counts = [], [], []
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            row = len(self.ids)
+            self.ids.append(chunk_id)
+            self.row_groups.append(self._group_of(metadata))
+            self.rows[chunk_id] = row
+            terms, term_counts = np.unique(tokenize(text), return_counts=True)
+            for term, term_count in zip(terms, term_counts):
+                rows.append(row)
+                cols.append(self.vocab.setdefault(str(term), len(self.vocab)))
+                counts.append(int(term_count))
+        self._pending.append((rows, cols, counts))
+        self._weights = None
+
+    def delete(self, ids: List[str]):
+        """Remove chunks by ID (unknown IDs are ignored)"""
+        for chunk_id in ids:
+            row = self.rows.pop(chunk_id, None)
+            if row is not None:
+                self.ids[row] = None
+                self._weights = None
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Move chunks to the row group of their new metadata, e.g. new alias_sources (unknown IDs are ignored)"""
+        for chunk_id, metadata in zip(ids, metadatas):
+            row = self.rows.get(chunk_id)
+            if row is not None:
+                self.row_groups[row] = self._group_of(metadata)
+
+    def _term_frequencies(self) -> sp.csr_matrix:
+        """Fold pending additions into the term frequency matrix"""
+        shape = (len(self.ids), len(self.vocab))
+        if self._pending:
+            rows = np.concatenate([np.asarray(block[0], dtype=np.int64) for block in self._pending])
+            cols = np.concatenate([np.asarray(block[1], dtype=np.int64) for block in self._pending])
+            counts = np.concatenate([np.asarray(block[2], dtype=np.float32) for block in self._pending])
+            added = sp.csr_matrix((counts, (rows, cols)), shape=shape, dtype=np.float32)
+            existing = sp.csr_matrix((self._tf.data, self._tf.indices, self._tf.indptr),
+                                     shape=(self._tf.shape[0], shape[1]))
+            self._tf = sp.vstack([existing, added[self._tf.shape[0]:]], format='csr')
+            self._pending = []
+        elif self._tf.shape != shape:
+            self._tf = sp.csr_matrix((self._tf.data, self._tf.indices, self._tf.indptr), shape=shape)
+        return self._tf
+
+    def _bm25_weights(self) -> sp.csr_matrix:
+        """Per chunk, per term BM25 weights of the live chunks"""
+        if self._weights is not None:
+            return self._weights
+
+        tf = self._term_frequencies()
+        alive = np.array([chunk_id is not None for chunk_id in self.ids], dtype=bool)
+        row_of_entry = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        live_entry = alive[row_of_entry]
+
+        doc_lengths = np.asarray(tf.sum(axis=1)).ravel()
+        live_docs = max(int(alive.sum()), 1)
+        avg_length = max(float(doc_lengths[alive].sum()) / live_docs, 1e-9)
+        doc_freq = np.bincount(tf.indices[live_entry], minlength=tf.shape[1])
+        idf = np.log1p((live_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        data = tf.data * (self.k1 + 1) / (tf.data + norm[row_of_entry]) * idf[tf.indices]
+        data[~live_entry] = 0.0
+
+        weights = sp.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+        weights.eliminate_zeros()
+        self._weights = weights
+        return weights
+
+    ### Search
+
+    def _query_matrix(self, queries: List[str]) -> sp.csc_matrix:
+        """Terms x queries indicator matrix (terms missing from the vocabulary are dropped)"""
+        rows, cols = [], []
+        for query_index, query in enumerate(queries):
+            for term in set(tokenize(query)):
+                col = self.vocab.get(term)
+                if col is not None:
+                    rows.append(col)
+                    cols.append(query_index)
+        data = np.ones(len(rows), dtype=np.float32)
+        return sp.csc_matrix((data, (rows, cols)), shape=(len(self.vocab), len(queries)))
+
+    def _row_mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows whose group can satisfy the filter (None when nothing is excluded)"""
+        if not where:
+            return None
+        allowed = np.fromiter((may_match(attributes, where) for attributes in self.groups), dtype=bool,
+                              count=len(self.groups))
+        if allowed.all():
+            return None
+        return allowed[np.asarray(self.row_groups, dtype=np.int64)]
+
+    def search(self, queries: List[str], top_k: int = 5,
+               where: Optional[Dict[str, Any]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Score every chunk against a batch of queries
+
+        Args:
+            queries: Query texts
+            top_k: Number of hits per query
+            where: Optional filter, applied to the routing metadata of each row
+
+        Returns:
+            One list of (chunk_id, bm25_score) pairs per query, best first,
+            containing only chunks that share at least one term with the query
+        """
+        if not queries:
+            return []
+        if not len(self):
+            return [[] for _ in queries]
+
+        # (chunks x terms) @ (terms x queries): all queries scored in one sparse product
+        scores = (self._bm25_weights() @ self._query_matrix(queries)).T.tocsr()
+        mask = self._row_mask(where)
+
+        results = []
+        for query_index in range(len(queries)):
+            row = scores.getrow(query_index)
+            data, indices = row.data, row.indices
+            if mask is not None:
+                keep = mask[indices]
+                data, indices = data[keep], indices[keep]
+            if len(data) > top_k:
+                top = np.argpartition(-data, top_k - 1)[:top_k]
+            else:
+                top = np.arange(len(data))
+            top = top[np.argsort(-data[top], kind='stable')]
+            results.append([(self._chunk_id(indices[i]), float(data[i])) for i in top])
+        return results
+
+    def _chunk_id(self, row: int) -> str:
+        return self.ids[row]
+
+    ### Persistence
+
+    def _compact(self):
+        """Drop deleted rows and terms no live chunk uses"""
+        tf = self._term_frequencies()
+        alive = np.flatnonzero([chunk_id is not None for chunk_id in self.ids])
+        tf = tf[alive]
+        used = np.flatnonzero(np.bincount(tf.indices, minlength=tf.shape[1]))
+        terms = sorted(self.vocab, key=self.vocab.get)
+
+        self._tf = tf[:, used].tocsr()
+        self.vocab = {terms[col]: new_col for new_col, col in enumerate(used)}
+        self.ids = [self.ids[row] for row in alive]
+        self.row_groups = [self.row_groups[row] for row in alive]
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self._weights = None
+
+    def persist(self):
+        """Write the term frequency matrix and the vocabulary/ID sidecar"""
+        if not self.persist_directory:
+            return
+        if len(self.ids) and 1 - len(self.rows) / len(self.ids) > self.compact_ratio:
+            self._compact()
+
+        directory = Path(self.persist_directory)
+        os.makedirs(directory, exist_ok=True)
+        save_object_sparse(str(directory / "bm25_tf.tmp.npz"), self._term_frequencies())
+        os.replace(directory / "bm25_tf.tmp.npz", directory / "bm25_tf.npz")
+
+        tmp_path = directory / "bm25_index.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file_obj:
+            json.dump({'k1': self.k1, 'b': self.b, 'ids': self.ids,
+                       'terms': sorted(self.vocab, key=self.vocab.get),
+                       'groups': self.groups, 'row_groups': self.row_groups}, file_obj)
+        os.replace(tmp_path, directory / "bm25_index.json")
+
+    def export_mapped(self, directory):
+        """
+        Write the BM25 weights of the live chunks in the layout MappedBM25Index maps
+
+        Rows keep their order, so ties rank as in this index; columns are
+        sorted by term, so query terms are found by binary search instead of
+        through a per-process vocabulary dictionary.
+
+        Args:
+            directory: Output directory (may be the index's own persist_directory)
+        """
+        directory = Path(directory)
+        os.makedirs(directory, exist_ok=True)
+        alive = np.flatnonzero([chunk_id is not None for chunk_id in self.ids])
+        terms = np.array([term.encode('utf-8') for term in sorted(self.vocab, key=self.vocab.get)],
+                         dtype=np.bytes_)
+        term_order = np.argsort(terms, kind='stable')
+        columns = np.empty(len(terms), dtype=np.int64)
+        columns[term_order] = np.arange(len(terms))
+
+        weights = self._bm25_weights()[alive].tocsr()
+        np.save(directory / "bm25_weights_data.npy", weights.data)
+        np.save(directory / "bm25_weights_indices.npy", columns[weights.indices].astype(weights.indices.dtype))
+        np.save(directory / "bm25_weights_indptr.npy", weights.indptr)
+        np.save(directory / "bm25_ids.npy", np.array([self.ids[row].encode('utf-8') for row in alive],
+                                                     dtype=np.bytes_))
+        np.save(directory / "bm25_terms.npy", terms[term_order])
+        np.save(directory / "bm25_row_groups.npy", np.asarray(self.row_groups, dtype=np.int32)[alive])
+        with open(directory / MAPPED_STATE_NAME, 'w', encoding='utf-8') as file_obj:
+            json.dump({'k1': self.k1, 'b': self.b, 'groups': self.groups}, file_obj)
+
+    def load(self):
+        """(Re)load the index from persist_directory"""
+        directory = Path(self.persist_directory)
+        with open(directory / "bm25_index.json", 'r', encoding='utf-8') as file_obj:
+            state = json.load(file_obj)
+        self.k1, self.b = state['k1'], state['b']
+        self.ids = state['ids']
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids) if chunk_id is not None}
+        self.vocab = {term: col for col, term in enumerate(state['terms'])}
+        # Indexes written before row groups existed have a single unconstrained group
+        self.groups = state.get('groups', [{}])
+        self.row_groups = state.get('row_groups', [0] * len(self.ids))
+        self._group_lookup = {json.dumps(attributes, sort_keys=True): group
+                              for group, attributes in enumerate(self.groups)}
+        self._tf = load_object_sparse(str(directory / "bm25_tf.npz")).tocsr().astype(np.float32)
+        self._pending = []
+        self._weights = None
+        print(f"Loaded BM25 index with {len(self.rows)} chunks and {len(self.vocab)} terms")
+
+
+class MappedBM25Index(BM25Index):
+    """
+    Read-only BM25 index served from memory-mapped arrays
+
+    The weight matrix, the sorted vocabulary and the row chunk IDs written
+    by BM25Index.export_mapped are mapped read-only, so every process
+    serving the same directory shares one copy through the page cache
+    instead of each loading the term frequencies and building its own
+    weights, vocabulary and ID dictionaries. Query terms are looked up by
+    binary search.
+    """
+
+    def __init__(self, persist_directory: str):
+        """
+        Map an index written by BM25Index.export_mapped
+
+        Args:
+            persist_directory: Directory holding bm25_mapped.json and the bm25_*.npy arrays
+        """
+        self.persist_directory = persist_directory
+        self.load()
+
+    @staticmethod
+    def exists(directory) -> bool:
+        return (Path(directory) / MAPPED_STATE_NAME).exists()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        # A scan, serving only needs search()
+        return bool(np.any(self.ids == chunk_id.encode('utf-8')))
+
+    def _chunk_id(self, row: int) -> str:
+        return self.ids[row].decode('utf-8')
+
+    def _query_matrix(self, queries: List[str]) -> sp.csc_matrix:
+        rows, cols = [], []
+        for query_index, query in enumerate(queries):
+            for term in set(tokenize(query)):
+                key = term.encode('utf-8')
+                position = int(np.searchsorted(self.terms, key))
+                if position < len(self.terms) and self.terms[position] == key:
+                    rows.append(position)
+                    cols.append(query_index)
+        data = np.ones(len(rows), dtype=np.float32)
+        return sp.csc_matrix((data, (rows, cols)), shape=(len(self.terms), len(queries)))
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        raise NotImplementedError("Mapped BM25 indexes are read-only; update the BM25Index they were exported from")
+
+    def delete(self, ids: List[str]):
+        raise NotImplementedError("Mapped BM25 indexes are read-only; update the BM25Index they were exported from")
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError("Mapped BM25 indexes are read-only; update the BM25Index they were exported from")
+
+    def persist(self):
+        """Mapped indexes are immutable, nothing to flush"""
+
+    def load(self):
+        """(Re)map the index in persist_directory"""
+        directory = Path(self.persist_directory)
+        with open(directory / MAPPED_STATE_NAME, 'r', encoding='utf-8') as file_obj:
+            state = json.load(file_obj)
+        self.k1, self.b = state['k1'], state['b']
+        self.groups = state['groups']
+        self.ids = np.load(directory / "bm25_ids.npy", mmap_mode='r')
+        self.terms = np.load(directory / "bm25_terms.npy", mmap_mode='r')
+        self.row_groups = np.load(directory / "bm25_row_groups.npy", mmap_mode='r')
+        arrays = [np.load(directory / f"bm25_weights_{name}.npy", mmap_mode='r')
+                  for name in ("data", "indices", "indptr")]
+        self._weights = sp.csr_matrix(tuple(arrays), shape=(len(self.ids), len(self.terms)), copy=False)
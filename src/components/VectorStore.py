@@ -1,12 +1,22 @@
 import os
 import chromadb
 import numpy as np
-import uuid
 from chromadb.config import Settings
-from typing import List,Any
+from typing import List,Any,Optional,Dict
+from src.components.BaseVectorStore import BaseVectorStore
 
-class VectorStore:
-    """Manages document embeddings in a ChromaDB vector store"""
+class VectorStore(BaseVectorStore):
+    """
+    Manages document embeddings in a ChromaDB vector store
+
+    Collections are created in Chroma's cosine space, so distances are
+    cosine distances like every other backend's. Collections created
+    earlier in the default L2 space still rank by L2; their hits get
+    cosine distances recomputed from the returned embeddings.
+    """
+
+    # Chroma evaluates where filters itself, it cannot match a chunk by its alias sources
+    filters_aliases = False
 
     def __init__(self, collection_name:str="pdf_documents",persist_directory:str="../data/vector_store"):
         """ 
@@ -20,6 +30,7 @@ class VectorStore:
         self.persist_directory = persist_directory
         self.client = None
         self.collection = None
+        self.space = None
         self._initialize_store()
     
     def _initialize_store(self):
@@ -30,8 +41,12 @@ class VectorStore:
 
             self.collection = self.client.get_or_create_collection(
                 name=self.collection_name,
-                metadata={"description":"PDF document embeddings for RAG"}
+                metadata={"description":"PDF document embeddings for RAG","hnsw:space":"cosine"}
             )
+            self.space = self._distance_space()
+            if self.space != "cosine":
+                print(f"Warning: collection {self.collection_name} uses the {self.space} distance space; "
+                      f"distances are converted to cosine but ranking stays {self.space} until it is rebuilt")
 
             print(f"Vector store initialized. Collection: {self.collection_name}")
             print(f"Existing documents in collection:{self.collection.count()}")
@@ -39,52 +54,132 @@ class VectorStore:
             print(f"Error initializing vector store: {e}")
             raise
     
-    def add_documents(self,documents: List[Any],embeddings:np.ndarray):
+    def _distance_space(self) ->str:
+        """Distance function of the collection (Chroma's default is l2)"""
+        space = (self.collection.metadata or {}).get("hnsw:space")
+        if space is None:
+            configuration = getattr(self.collection,"configuration",None)
+            if isinstance(configuration,dict):
+                space = (configuration.get("hnsw") or {}).get("space")
+        return space or "l2"
+
+    def add(self,ids:List[str],embeddings:np.ndarray,documents:List[str],metadatas:List[Dict[str,Any]]):
+        """Insert new records into the collection"""
+        self.collection.add(
+            ids=list(ids),
+            embeddings=np.asarray(embeddings,dtype=np.float32),
+            metadatas=metadatas,
+            documents=documents
+        )
+
+    def upsert(self,ids:List[str],embeddings:np.ndarray,documents:List[str],metadatas:List[Dict[str,Any]]):
+        """Insert records, replacing existing records with the same ID"""
+        self.collection.upsert(
+            ids=list(ids),
+            embeddings=np.asarray(embeddings,dtype=np.float32),
+            metadatas=metadatas,
+            documents=documents
+        )
+
+    def update_metadata(self,ids:List[str],metadatas:List[Dict[str,Any]]):
+        """Replace the metadata of existing records"""
+        if ids:
+            self.collection.update(ids=list(ids),metadatas=metadatas)
+
+    def max_batch_size(self) ->Optional[int]:
+        """Most records Chroma accepts in one call"""
+        return self.client.get_max_batch_size()
+
+    def delete(self,ids:List[str]):
         """ 
-        Add documents and their embeddings to the vector store
+        Delete documents from the vector store
 
         Args:
-            documents: List of Langchain documents
-            embeddings: Corresponding embeddings for the documents
+            ids: Chunk IDs to remove
         """
-    
-        if len(documents) != len(embeddings):
-            raise ValueError("Number of documents must match number of embeddings")
-        
-        print(f"Adding {len(documents)} documents to vectore store..")
+        if not ids:
+            return
 
-        #Prepare data for ChromaDB
+        try:
+            self.collection.delete(ids=list(ids))
+            print(f"Deleted {len(ids)} documents from vector store.")
+        except Exception as e:
+            print(f"Error deleting documents from vector store: {e}")
+            raise
 
-        ids=[]
-        metadatas=[]
-        documents_text=[]
-        embeddings_list=[]
+    def search(self,query_embeddings:np.ndarray,top_k:int=5,where:Optional[Dict[str,Any]]=None,
+               include_embeddings:bool=False) ->List[List[Dict[str,Any]]]:
+        """ 
+        Query the collection for the nearest documents of each query embedding
 
-        for i,(doc,embedding) in enumerate(zip(documents,embeddings)):
+        Args:
+            query_embeddings: Array of shape (n_queries, dim)
+            top_k: Number of hits per query
+            where: Optional Chroma metadata filter
+            include_embeddings: Also return each hit's stored vector under 'embedding'
 
-            doc_id=f"doc_{uuid.uuid4().hex[:8]}_{i}"
-            ids.append(doc_id)
+        Returns:
+            One list of {'id','content','metadata','distance'} hits per query
+        """
+        convert = self.space != "cosine"
+        queries = np.array(query_embeddings,dtype=np.float32,ndmin=2)
+        results = self.collection.query(
+            query_embeddings=queries.tolist(),
+            n_results=top_k,
+            where=where or None,
+            include=["documents","metadatas","distances"]+(["embeddings"] if include_embeddings or convert else [])
+        )
 
-            metadata = dict(doc.metadata)
-            metadata['doc_index'] = i
-            metadata['content_length'] = len(doc.page_content)
-            metadatas.append(metadata)
+        hits = []
+        for query_index in range(len(results['ids'])):
+            hits.append([
+                {'id': doc_id, 'content': document, 'metadata': metadata, 'distance': distance}
+                for doc_id, document, metadata, distance in zip(
+                    results['ids'][query_index],
+                    results['documents'][query_index],
+                    results['metadatas'][query_index],
+                    results['distances'][query_index])
+            ])
+            if include_embeddings or convert:
+                for hit, embedding in zip(hits[-1], results['embeddings'][query_index]):
+                    hit['embedding'] = np.asarray(embedding, dtype=np.float32)
+            if convert:
+                query = queries[query_index]
+                for hit in hits[-1]:
+                    norms = np.linalg.norm(query)*np.linalg.norm(hit['embedding'])
+                    hit['distance'] = 1.0-float(query @ hit['embedding'])/max(float(norms),1e-12)
+                    if not include_embeddings:
+                        del hit['embedding']
+                hits[-1].sort(key=lambda hit: hit['distance'])
+        return hits
 
-            documents_text.append(doc.page_content)
+    def get(self,ids:List[str]) ->List[Optional[Dict[str,Any]]]:
+        """Fetch records by ID (None for unknown IDs)"""
+        if not ids:
+            return []
+        results = self.collection.get(ids=list(ids),include=["documents","metadatas"])
+        found = {
+            doc_id: {'id': doc_id, 'content': document, 'metadata': metadata}
+            for doc_id, document, metadata in zip(results['ids'],results['documents'],results['metadatas'])
+        }
+        return [found.get(doc_id) for doc_id in ids]
 
-            embeddings_list.append(embedding.tolist())
+    def count(self) ->int:
+        """Number of documents in the collection"""
+        return self.collection.count()
 
+    def iter_records(self,batch_size:int=1024):
+        """Yield (ids, embeddings, documents, metadatas) batches of the whole collection"""
+        for offset in range(0,self.count(),batch_size):
+            results = self.collection.get(include=["embeddings","documents","metadatas"],limit=batch_size,offset=offset)
+            if not results['ids']:
+                break
+            yield (results['ids'],np.asarray(results['embeddings'],dtype=np.float32),
+                   results['documents'],results['metadatas'])
 
-        try:
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings_list,
-                metadatas=metadatas,
-                documents=documents_text
-            )
-            print(f"Sucessfully added {len(documents)} documents to vector store.")
-            print(f"Total documents in collection: {self.collection.count()}")
+    def persist(self):
+        """PersistentClient writes through to disk, nothing to flush"""
 
-        except Exception as e:
-            print(f"Error adding documents to vector store: {e}")
-            raise
\ No newline at end of file
+    def load(self):
+        """Reopen the client and collection from disk"""
+        self._initialize_store()
@@ -1,54 +1,79 @@
 import os
-from langchain_community.document_loaders import DirectoryLoader
-from langchain_community.document_loaders import PyMuPDFLoader,PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import time
+import queue
+import threading
+from itertools import groupby
 from pathlib import Path
 from src.components.EmbeddingManager import EmbeddingManager
-from src.components.VectorStore import VectorStore
+from src.components.BaseVectorStore import ALIAS_FIELD, ALIAS_SEPARATOR, source_attributes, vector_store_from_env
+from src.components.IngestionManifest import IngestionManifest, make_chunk_id, content_hash, file_hash
+from src.components.SparseIndex import BM25Index
+from src.components.PdfExtractor import PdfExtractor
+from src.components.SpanChunker import SpanChunker
+from src.components.PageStore import PageStore
+from src.components.NearDuplicateIndex import NearDuplicateIndex
+
+# Chunk metadata kept in the vector store when page text lives in a PageStore: routing and page addressing only
+PARENT_METADATA_KEYS = ("source_file", "page", "start_index", "end_index", "company", "year")
+
+
+class _SourceCommit:
+    """Marks the end of one source file in the streaming ingestion pipeline"""
+
+    def __init__(self, source, source_hash, chunk_hashes, stale_ids, complete=True):
+        self.source = source
+        self.source_hash = source_hash
+        self.chunk_hashes = chunk_hashes
+        self.stale_ids = stale_ids
+        self.complete = complete   # False if some pages could not be extracted
+
+
+class _AliasUpdate:
+    """Asks the writer to refresh the alias_sources metadata of canonical chunks"""
+
+    def __init__(self, ids):
+        self.ids = ids
+
 
 class DataIngestion:
-    
+
+    def __init__(self, pdf_backend: str = None, pages_per_task: int = 16, token_aware: bool = None):
+        """
+        Initialize the ingestion pipeline
+
+        Args:
+            pdf_backend: "pymupdf" or "pypdf" (PDF_BACKEND environment variable, pymupdf by default);
+                the other backend is the fallback for files the chosen one cannot read
+            pages_per_task: Pages extracted per worker task
+            token_aware: Also cap chunks at the embedding model's max sequence length during streaming
+                ingestion (TOKEN_AWARE_CHUNKS environment variable, off by default)
+        """
+        backend = (pdf_backend or os.getenv("PDF_BACKEND", "pymupdf")).lower()
+        self.pdf_extractor = PdfExtractor(backend=backend, fallback="pypdf" if backend == "pymupdf" else "pymupdf",
+                                          pages_per_task=pages_per_task)
+        if token_aware is None:
+            token_aware = os.getenv("TOKEN_AWARE_CHUNKS", "0").lower() in ("1", "true", "yes")
+        self.token_aware = token_aware
+
+    @staticmethod
+    def _chunker(chunk_size, chunk_overlap, embedding_manager=None) -> SpanChunker:
+        """Character chunker, capped at the model's max sequence length when an embedding manager is given"""
+        if embedding_manager is None:
+            return SpanChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return SpanChunker.for_embedding_model(embedding_manager.model, chunk_size=chunk_size,
+                                               chunk_overlap=chunk_overlap)
+
 ### Read all the pdf's inside the directory
     def process_all_pdfs(self,pdf_directory):
         """Process all PDF files in a directory"""
-        all_documents = []
-        pdf_dir = Path(pdf_directory)
-        
-        # Find all PDF files recursively
-        pdf_files = list(pdf_dir.glob("**/*.pdf"))
-        
-        print(f"Found {len(pdf_files)} PDF files to process")
-        
-        for pdf_file in pdf_files:
-            print(f"\nProcessing: {pdf_file.name}")
-            try:
-                loader = PyPDFLoader(str(pdf_file))
-                documents = loader.load()
-                
-                # Add source information to metadata
-                for doc in documents:
-                    doc.metadata['source_file'] = pdf_file.name
-                    doc.metadata['file_type'] = 'pdf'
-                
-                all_documents.extend(documents)
-                print(f"  ✓ Loaded {len(documents)} pages")
-                
-            except Exception as e:
-                print(f"  ✗ Error: {e}")
-        
+        all_documents = list(self.iter_pdf_pages(pdf_directory))
         print(f"\nTotal documents loaded: {len(all_documents)}")
         return all_documents
     ### Text splitting get into chunks
 
-    def split_documents(self,documents,chunk_size=1000,chunk_overlap=200):
+    def split_documents(self,documents,chunk_size=1000,chunk_overlap=200,embedding_manager=None):
         """Split documents into smaller chunks for better RAG performance"""
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        split_docs = text_splitter.split_documents(documents)
+        split_docs = list(self._chunker(chunk_size, chunk_overlap, embedding_manager).split_documents(documents))
         print(f"Split {len(documents)} documents into {len(split_docs)} chunks")
         
         # Show example of a chunk
@@ -59,25 +84,458 @@ class DataIngestion:
         
         return split_docs
 
+    ### Streaming ingestion
+
+    def iter_pdf_pages(self, pdf_directory, max_workers: int = None, max_in_flight: int = None, pdf_files=None):
+        """
+        Yield PDF pages as soon as they have been extracted
+
+        Files are cut into page ranges extracted in a process pool, so a large
+        filing is parsed by all workers at once. At most max_in_flight ranges
+        are submitted at a time, so memory does not grow with the number or
+        size of the PDFs. Pages of one file are always yielded contiguously
+        and in page order.
+
+        Args:
+            pdf_directory: Directory searched recursively for PDF files
+            max_workers: Number of parser processes (defaults to CPU count)
+            max_in_flight: Maximum number of page ranges parsed or buffered at once
+            pdf_files: Optional explicit list of PDF paths (skips the directory scan)
+
+        Yields:
+            Langchain documents, one per page
+        """
+        if pdf_files is None:
+            pdf_files = sorted(Path(pdf_directory).glob("**/*.pdf"))
+        print(f"Found {len(pdf_files)} PDF files to process")
+        if not pdf_files:
+            return
+
+        attributes = {}
+        for page in self.pdf_extractor.iter_pages(pdf_files, max_workers=max_workers, max_in_flight=max_in_flight):
+            source_file = page.metadata['source_file']
+            if source_file not in attributes:
+                attributes[source_file] = source_attributes(source_file)
+            page.metadata.update(attributes[source_file])
+            yield page
+
+    def iter_chunks(self, pages, chunk_size=1000, chunk_overlap=200, embedding_manager=None):
+        """
+        Split a stream of pages into chunks lazily
+
+        Each page is split in one pass over character offsets; chunk text is
+        only sliced from the page when it is embedded or stored.
+
+        Args:
+            pages: Iterable of Langchain documents
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared between neighbouring chunks
+            embedding_manager: Optional manager whose model's max sequence length also caps each chunk
+
+        Yields:
+            PageSpan chunks with start_index/end_index offsets into their page in their metadata
+        """
+        yield from self._chunker(chunk_size, chunk_overlap, embedding_manager).split_documents(pages)
+
+    def _iter_ingest_work(self, pages, manifest, source_hashes, stats, batch_size, chunk_size, chunk_overlap,
+                          embedding_manager=None, dedup_index=None):
+        """
+        Turn a page stream into chunk batches and per-source commit markers
+
+        With a manifest, chunks whose deterministic ID is already recorded for
+        their source are skipped, and a _SourceCommit is emitted after the last
+        batch of every source so the writer can delete stale chunks and record
+        the source only once all of its chunks are stored. A source with pages
+        the extractor could not read gets an incomplete commit: nothing is
+        deleted, and the manifest keeps its chunks without a file hash, so the
+        next run retries the file.
+
+        With a dedup_index, near-duplicates of chunks already indexed are
+        dropped from each batch before it is embedded (and left out of the
+        manifest); an _AliasUpdate then records their sources on the
+        canonical chunks.
+        """
+        batch = []
+        aliased = set()
+        current = {}
+
+        def unique(batch):
+            if dedup_index is None:
+                return batch
+            canonical = dedup_index.deduplicate([chunk_id for chunk_id, _ in batch],
+                                                [doc.page_content for _, doc in batch],
+                                                [doc.metadata['source_file'] for _, doc in batch])
+            kept = []
+            for (chunk_id, doc), original in zip(batch, canonical):
+                if original is None:
+                    kept.append((chunk_id, doc))
+                    continue
+                stats['duplicate_chunks'] += 1
+                current.pop(chunk_id, None)
+                if dedup_index.alias_sources(original):
+                    aliased.add(original)
+            return kept
+
+        for source, source_pages in groupby(pages, key=lambda page: page.metadata['source_file']):
+            known = manifest.chunk_hashes(source) if manifest is not None else {}
+            current = {}
+
+            for chunk in self.iter_chunks(source_pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                          embedding_manager=embedding_manager):
+                chunk_id = make_chunk_id(chunk)
+                current[chunk_id] = content_hash(chunk.page_content)
+                if chunk_id in known:
+                    stats['skipped_chunks'] += 1
+                    continue
+
+                batch.append((chunk_id, chunk))
+                if len(batch) >= batch_size:
+                    batch = unique(batch)
+                    if batch:
+                        yield batch
+                    batch = []
+
+            if manifest is not None:
+                batch = unique(batch)
+                if batch:
+                    yield batch
+                batch = []
+                if aliased:
+                    yield _AliasUpdate(sorted(aliased))
+                    aliased = set()
+                if source in self.pdf_extractor.failed_sources:
+                    # Chunks of the missing pages may still be stored, keep them recorded
+                    yield _SourceCommit(source, None, {**known, **current}, [], complete=False)
+                else:
+                    stale_ids = [chunk_id for chunk_id in known if chunk_id not in current]
+                    yield _SourceCommit(source, source_hashes[source], current, stale_ids)
+
+        batch = unique(batch)
+        if batch:
+            yield batch
+        if aliased:
+            yield _AliasUpdate(sorted(aliased))
+
+    @staticmethod
+    def _update_aliases(vectorstore, dedup_index, ids, sparse_index=None):
+        """Write each canonical chunk's alias sources into its metadata in the store (and BM25 row groups)"""
+        chunk_ids, metadatas = [], []
+        for chunk_id, record in zip(ids, vectorstore.get(list(ids))):
+            if record is None:
+                continue
+            metadata = dict(record['metadata'] or {})
+            aliases = dedup_index.alias_sources(chunk_id)
+            if aliases:
+                metadata[ALIAS_FIELD] = ALIAS_SEPARATOR.join(aliases)
+            else:
+                metadata.pop(ALIAS_FIELD, None)
+            chunk_ids.append(chunk_id)
+            metadatas.append(metadata)
+        if chunk_ids:
+            vectorstore.update_metadata(chunk_ids, metadatas)
+            if sparse_index is not None:
+                sparse_index.update_metadata(chunk_ids, metadatas)
+
+    def _prepare_incremental(self, pdf_files, manifest, vectorstore, stats, sparse_index=None, page_store=None,
+                             dedup_index=None):
+        """
+        Diff the PDF folder against the manifest before streaming
+
+        Chunks of sources that disappeared are deleted right away. With a
+        dedup_index, changed sources are also cleared up front and re-ingested
+        whole, together with every source whose dropped duplicates pointed at
+        one of their canonical chunks (it must supply its own chunks now).
+
+        Returns:
+            Tuple of (files that are new or changed, {source_file: file hash})
+        """
+        source_hashes = {pdf_file.name: file_hash(pdf_file) for pdf_file in pdf_files}
+
+        def remove(source):
+            removed_ids = manifest.remove(source)
+            vectorstore.delete(removed_ids)
+            if sparse_index is not None:
+                sparse_index.delete(removed_ids)
+            if page_store is not None:
+                page_store.remove_source(source)
+            stats['deleted_chunks'] += len(removed_ids)
+            if dedup_index is None:
+                return removed_ids, []
+            orphaned, touched = dedup_index.remove_source(source)
+            aliased.update(touched)
+            worklist.extend(orphan for orphan in orphaned if orphan in source_hashes and orphan not in cleared)
+            return removed_ids, orphaned
+
+        aliased, worklist, cleared = set(), [], set()
+        for source in manifest.sources():
+            if source not in source_hashes:
+                removed_ids, _ = remove(source)
+                print(f"  ✗ Removed {len(removed_ids)} chunks of deleted source {source}")
+        if dedup_index is not None:
+            worklist.extend(name for name in source_hashes if not manifest.is_unchanged(name, source_hashes[name]))
+            while worklist:
+                source = worklist.pop()
+                if source in cleared:
+                    continue
+                cleared.add(source)
+                _, orphaned = remove(source)
+                if orphaned:
+                    print(f"  ↻ Re-ingesting {', '.join(orphaned)}: duplicates of {source} chunks")
+            self._update_aliases(vectorstore, dedup_index, sorted(aliased))
+            vectorstore.persist()
+            dedup_index.persist()
+        if sparse_index is not None:
+            sparse_index.persist()
+        if page_store is not None:
+            page_store.persist()
+        manifest.save()
+
+        changed_files = [pdf_file for pdf_file in pdf_files
+                         if not manifest.is_unchanged(pdf_file.name, source_hashes[pdf_file.name])]
+        stats['skipped_files'] = len(pdf_files) - len(changed_files)
+        if page_store is not None:
+            # A changed file may have lost pages, its pages are written afresh as it streams
+            for pdf_file in changed_files:
+                page_store.remove_source(pdf_file.name)
+        print(f"{len(changed_files)} new or changed PDF files, {stats['skipped_files']} unchanged")
+        return changed_files, source_hashes
+
+    def ingest_streaming(self, pdf_directory, embedding_manager, vectorstore,
+                         batch_size: int = 64, queue_size: int = 4, max_workers: int = None,
+                         chunk_size: int = 1000, chunk_overlap: int = 200,
+                         manifest: IngestionManifest = None, sparse_index: BM25Index = None,
+                         page_store: PageStore = None, dedup_index: NearDuplicateIndex = None) -> dict:
+        """
+        Parse, split, embed and store PDFs as a pipeline of bounded stages
+
+        Parsing runs in a process pool, embedding and writing each run on
+        their own thread. Stages are connected by queues holding at most
+        queue_size batches, so a slow stage applies backpressure upstream
+        and peak memory stays flat regardless of corpus size.
+
+        When a manifest is given the run is incremental: unchanged files are
+        not parsed, only chunks with new deterministic IDs are embedded and
+        upserted, and chunks of changed or deleted sources that no longer
+        exist are removed from the store.
+
+        With a page_store the run is set up for small-to-big retrieval: every
+        page's full text goes to the page store, and the vector store keeps
+        only each chunk's vector and page address (PARENT_METADATA_KEYS),
+        not its text, which RAGRetriever reads back from the page store for
+        the winning hits only. Pair it with a small chunk_size.
+
+        With a dedup_index, chunks that are near-duplicates of a chunk
+        already indexed (this run or an earlier one) are dropped before
+        embedding, e.g. boilerplate repeated in every annual filing. The
+        canonical chunk's alias_sources metadata lists the sources of its
+        dropped duplicates, joined by ALIAS_SEPARATOR, and where filters on
+        one of those sources match it too. A store that filters natively
+        (Chroma) cannot do that, so it only takes a dedup_index with
+        cross_source=False.
+
+        Args:
+            pdf_directory: Directory searched recursively for PDF files
+            embedding_manager: Manager used to embed each chunk batch
+            vectorstore: Vector store receiving each embedded batch
+            batch_size: Number of chunks embedded and written together
+            queue_size: Maximum number of batches buffered between stages
+            max_workers: Number of PDF parser processes
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared between neighbouring chunks
+            manifest: Optional ingestion manifest enabling incremental re-ingestion
+            sparse_index: Optional BM25 index kept in step with the vector store
+            page_store: Optional PageStore receiving the full page texts
+            dedup_index: Optional NearDuplicateIndex dropping near-duplicate chunks
+
+        Returns:
+            Dictionary with page/chunk counts, elapsed seconds and throughput
+        """
+        if dedup_index is not None and dedup_index.cross_source and not vectorstore.filters_aliases:
+            raise ValueError(f"{type(vectorstore).__name__} cannot filter chunks by their alias sources, "
+                             f"deduplicate within sources only (NearDuplicateIndex(cross_source=False))")
+
+        stats = {'pages': 0, 'chunks': 0, 'batches': 0,
+                 'skipped_files': 0, 'skipped_chunks': 0, 'deleted_chunks': 0, 'duplicate_chunks': 0,
+                 'incomplete_files': 0}
+        embed_queue = queue.Queue(maxsize=queue_size)
+        write_queue = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+        sentinel = object()
+
+        def put(target_queue, item):
+            # Block until there is room, but give up once another stage failed
+            while not stop.is_set():
+                try:
+                    target_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(source_queue):
+            # Wait for the next item, treating a failure elsewhere as end of stream
+            while True:
+                try:
+                    return source_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return sentinel
+
+        def embed_worker():
+            try:
+                while True:
+                    item = get(embed_queue)
+                    if item is sentinel:
+                        break
+                    if isinstance(item, list):
+                        embeddings = embedding_manager.generate_embeddings([doc.page_content for _, doc in item])
+                        item = (item, embeddings)
+                    if not put(write_queue, item):
+                        break
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(write_queue, sentinel)
+
+        def write_worker():
+            try:
+                while True:
+                    item = get(write_queue)
+                    if item is sentinel:
+                        break
+                    if isinstance(item, _SourceCommit):
+                        vectorstore.delete(item.stale_ids)
+                        stats['deleted_chunks'] += len(item.stale_ids)
+                        # Make the source durable in the store before recording it in the manifest
+                        vectorstore.persist()
+                        if sparse_index is not None:
+                            sparse_index.delete(item.stale_ids)
+                            sparse_index.persist()
+                        if page_store is not None:
+                            page_store.persist()
+                        if dedup_index is not None:
+                            dedup_index.persist()
+                        manifest.update(item.source, item.source_hash, item.chunk_hashes)
+                        manifest.save()
+                        if not item.complete:
+                            stats['incomplete_files'] += 1
+                            print(f"  ✗ {item.source} was ingested partially, it is retried on the next run")
+                        continue
+                    if isinstance(item, _AliasUpdate):
+                        self._update_aliases(vectorstore, dedup_index, item.ids, sparse_index)
+                        continue
+
+                    batch, embeddings = item
+                    vectorstore.add_documents([doc for _, doc in batch], embeddings,
+                                              ids=[chunk_id for chunk_id, _ in batch],
+                                              store_text=page_store is None,
+                                              metadata_keys=PARENT_METADATA_KEYS if page_store is not None else None)
+                    if sparse_index is not None:
+                        sparse_index.add([chunk_id for chunk_id, _ in batch], [doc.page_content for _, doc in batch],
+                                         [doc.metadata for _, doc in batch])
+                    stats['chunks'] += len(batch)
+                    stats['batches'] += 1
+                vectorstore.persist()
+                if sparse_index is not None:
+                    sparse_index.persist()
+                if page_store is not None:
+                    page_store.persist()
+                if dedup_index is not None:
+                    dedup_index.persist()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        def count_pages(pages):
+            for page in pages:
+                stats['pages'] += 1
+                if page_store is not None:
+                    page_store.add_pages([page])
+                yield page
+
+        embed_thread = threading.Thread(target=embed_worker, name="ingest-embed", daemon=True)
+        write_thread = threading.Thread(target=write_worker, name="ingest-write", daemon=True)
+
+        start = time.perf_counter()
+        pdf_files = sorted(Path(pdf_directory).glob("**/*.pdf"))
+        source_hashes = {}
+        if manifest is not None:
+            pdf_files, source_hashes = self._prepare_incremental(pdf_files, manifest, vectorstore, stats,
+                                                                 sparse_index, page_store, dedup_index)
+
+        embed_thread.start()
+        write_thread.start()
+        try:
+            pages = count_pages(self.iter_pdf_pages(pdf_directory, max_workers=max_workers, pdf_files=pdf_files))
+            work = self._iter_ingest_work(pages, manifest, source_hashes, stats, batch_size, chunk_size,
+                                          chunk_overlap, embedding_manager if self.token_aware else None,
+                                          dedup_index)
+            for item in work:
+                if not put(embed_queue, item):
+                    break
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            put(embed_queue, sentinel)
+            embed_thread.join()
+            write_thread.join()
+
+        if errors:
+            raise errors[0]
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_s'] = elapsed
+        stats['pages_per_s'] = stats['pages'] / elapsed if elapsed > 0 else 0.0
+        stats['chunks_per_s'] = stats['chunks'] / elapsed if elapsed > 0 else 0.0
+        total_chunks = stats['chunks'] + stats['duplicate_chunks']
+        stats['dedup_shrink'] = stats['duplicate_chunks'] / total_chunks if total_chunks else 0.0
+
+        print(f"Ingested {stats['pages']} pages into {stats['chunks']} chunks in {elapsed:.1f}s "
+              f"({stats['pages_per_s']:.1f} pages/s, {stats['chunks_per_s']:.1f} chunks/s)")
+        if manifest is not None:
+            print(f"Skipped {stats['skipped_files']} unchanged files and {stats['skipped_chunks']} unchanged chunks, "
+                  f"deleted {stats['deleted_chunks']} stale chunks")
+        if dedup_index is not None:
+            print(f"Dropped {stats['duplicate_chunks']} near-duplicate chunks "
+                  f"({stats['dedup_shrink']:.1%} smaller index, {len(dedup_index)} canonical chunks)")
+        return stats
+
 if __name__ == "__main__":
     obj = DataIngestion()
     path = Path(__file__).resolve().parent.parent.parent / "data"
     #print(f"Looking inside: {path.resolve()}")
     #print(f"Exists? {path.exists()}")
     #print(f"Contents: {list(path.glob('*'))}")
-    
-    all_pdf_documents = obj.process_all_pdfs(path)
-    chunks=obj.split_documents(all_pdf_documents)
 
-    embedding_manager=EmbeddingManager()
-    vectorstore=VectorStore()
+    vectorstore=vector_store_from_env(path)
+
+    ### Chunk embeddings are cached on disk so re-chunking only embeds changed text
+    embedding_manager=EmbeddingManager(cache_dir=Path(vectorstore.persist_directory) / "embedding_cache")
+
+    ### Only new or changed PDFs are embedded, tracked by a manifest next to the store
+    manifest=IngestionManifest(Path(vectorstore.persist_directory) / "ingestion_manifest.json")
 
-    ### Convert the text to embeddings
-    texts=[doc.page_content for doc in chunks]
+    ### BM25 index over the same chunks for hybrid lexical + dense retrieval
+    sparse_index=BM25Index(Path(vectorstore.persist_directory) / "bm25")
 
-    ## Generate the Embeddings
+    ### PARENT_RETRIEVAL=1 indexes small chunks and keeps the full pages in a PageStore
+    page_store=None
+    chunk_size=1000
+    if os.getenv("PARENT_RETRIEVAL", "0") == "1":
+        page_store=PageStore(Path(vectorstore.persist_directory) / "pages")
+        chunk_size=int(os.getenv("PARENT_CHUNK_SIZE", "400"))
 
-    embeddings=embedding_manager.generate_embeddings(texts)
+    ### DEDUP_CHUNKS=1 drops near-duplicate chunks (MinHash + LSH) before they are embedded
+    dedup_index=None
+    if os.getenv("DEDUP_CHUNKS", "0") == "1":
+        ## Across sources only where the store's filters can match a chunk by its alias sources
+        dedup_index=NearDuplicateIndex(Path(vectorstore.persist_directory) / "dedup",
+                                       threshold=float(os.getenv("DEDUP_THRESHOLD", "0.8")),
+                                       cross_source=vectorstore.filters_aliases)
 
-    ##store int he vector dtaabase
-    vectorstore.add_documents(chunks,embeddings)
+    ### Parse, split, embed and store the PDFs as a streaming pipeline
+    obj.ingest_streaming(path,embedding_manager,vectorstore,chunk_size=chunk_size,chunk_overlap=min(200,chunk_size//4),
+                         manifest=manifest,sparse_index=sparse_index,page_store=page_store,dedup_index=dedup_index)
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from sub-millisecond store queries to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """ID of the request being served in this thread or task, if any"""
+    return _request_id.get()
+
+
+@contextlib.contextmanager
+def request_context(request_id: Optional[str] = None):
+    """
+    Tag everything logged inside the block with a request ID
+
+    Args:
+        request_id: ID to use (a new random one by default)
+
+    Yields:
+        The request ID
+    """
+    token = _request_id.set(request_id or uuid.uuid4().hex[:12])
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """Write a structured log record (fields end up as JSON keys with LOG_FORMAT=json)"""
+    if logger.isEnabledFor(level):
+        message = " ".join([event] + [f"{key}={value}" for key, value in fields.items() if value is not None])
+        logger.log(level, message, extra={'event': event, **fields})
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus (cumulative, le) semantics"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[slot] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank, seen = q * count, 0
+        for slot, slot_count in enumerate(counts):
+            if seen + slot_count >= rank and slot_count:
+                if slot == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[slot - 1] if slot else 0.0
+                return lower + (self.buckets[slot] - lower) * (rank - seen) / slot_count
+            seen += slot_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for slot_count in counts:
+            running += slot_count
+            cumulative.append(running)
+        return {'buckets': list(self.buckets), 'cumulative_counts': cumulative, 'sum': total, 'count': count,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+
+class _Span:
+    """Times a block into the <name>_seconds histogram"""
+
+    __slots__ = ('metrics', 'name', 'fields', 'start')
+
+    def __init__(self, metrics: "Metrics", name: str, fields: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        self.metrics.observe(f"{self.name}_seconds", duration)
+        if exc_type is not None:
+            self.metrics.increment(f"{self.name}_errors_total")
+        if logger.isEnabledFor(logging.DEBUG):
+            log_event("span", logging.DEBUG, span=self.name, duration_ms=round(duration * 1000, 3),
+                      error=exc_type.__name__ if exc_type else None, **self.fields)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Metrics:
+    """
+    Process-wide registry of counters and latency histograms
+
+    span(name) times a block into the histogram <name>_seconds (and counts
+    failures in <name>_errors_total). When disabled, span returns a shared
+    no-op context manager and increment/observe return immediately, so
+    instrumented code pays one attribute check. snapshot() returns plain
+    dicts that an exporter renders, e.g. as Prometheus text or JSON.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the registry
+
+        Args:
+            enabled: Record measurements (spans are no-ops otherwise)
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **fields):
+        """Context manager timing a stage (fields are added to its debug log record)"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, name, fields)
+
+    def increment(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters and histograms as plain dicts"""
+        with self._lock:
+            counters, histograms = dict(self.counters), dict(self.histograms)
+        return {'counters': counters,
+                'histograms': {name: histogram.snapshot() for name, histogram in histograms.items()}}
+
+    def export(self, exporter: Union[str, Callable[[Dict[str, Any]], str]] = "prometheus",
+               path: Optional[str] = None) -> str:
+        """
+        Render a snapshot with an exporter
+
+        Args:
+            exporter: Name registered in EXPORTERS ("prometheus", "json") or a function of the snapshot
+            path: Also write the rendered text to this file (atomically, e.g. for a textfile collector)
+
+        Returns:
+            The rendered snapshot
+        """
+        render = EXPORTERS[exporter] if isinstance(exporter, str) else exporter
+        text = render(self.snapshot())
+        if path:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file_obj:
+                file_obj.write(text)
+            os.replace(tmp_path, path)
+        return text
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+### Exporters
+
+def to_json(snapshot: Dict[str, Any]) -> str:
+    return json.dumps(snapshot, indent=2)
+
+
+def to_prometheus(snapshot: Dict[str, Any], prefix: str = "rag_") -> str:
+    """Prometheus text exposition format"""
+    lines = []
+    for name, value in sorted(snapshot['counters'].items()):
+        lines += [f"# TYPE {prefix}{name} counter", f"{prefix}{name} {value}"]
+    for name, histogram in sorted(snapshot['histograms'].items()):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        bounds = [repr(float(bound)) for bound in histogram['buckets']] + ["+Inf"]
+        for bound, count in zip(bounds, histogram['cumulative_counts']):
+            lines.append(f'{prefix}{name}_bucket{{le="{bound}"}} {count}')
+        lines += [f"{prefix}{name}_sum {histogram['sum']}", f"{prefix}{name}_count {histogram['count']}"]
+    return "\n".join(lines) + "\n"
+
+
+EXPORTERS: Dict[str, Callable[[Dict[str, Any]], str]] = {'prometheus': to_prometheus, 'json': to_json}
+
+# Set RAG_METRICS=0 to turn instrumentation off
+metrics = Metrics(enabled=os.getenv("RAG_METRICS", "1") != "0")
@@ -1,15 +1,53 @@
 import logging
 import os
+import json
 from datetime import datetime
+from src.instrumentation import current_request_id
 
-LOG_FILE=f"{datetime.now().strftime('%Y-%d-%m_%H-%M-%S')}.log"
-logs_path=os.path.join(os.getcwd(),"logs",LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
+# One log directory, one file per day (LOG_FORMAT=json writes one JSON object per line)
+LOG_DIR=os.getenv("LOG_DIR",os.path.join(os.getcwd(),"logs"))
+LOG_FILE=f"{datetime.now().strftime('%Y-%m-%d')}.log"
+LOG_FILE_PATH=os.path.join(LOG_DIR,LOG_FILE)
+LOG_FORMAT=os.getenv("LOG_FORMAT","text")
 
-LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES=set(vars(logging.LogRecord("",0,"",0,"",None,None)))|{"message","asctime","request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the ID of the request being served (unless the caller passed one in extra=)"""
+
+    def filter(self,record):
+        if getattr(record,'request_id',None) is None:
+            record.request_id=current_request_id() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Structured log lines: time, level, logger, message, request_id and any extra fields"""
+
+    def format(self,record):
+        entry={
+            'time':datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level':record.levelname,
+            'logger':record.name,
+            'message':record.getMessage(),
+            'request_id':getattr(record,'request_id',None),
+        }
+        entry.update({key:value for key,value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exception']=self.formatException(record.exc_info)
+        return json.dumps(entry,default=str)
+
+
+os.makedirs(LOG_DIR,exist_ok=True)
+
+_handler=logging.FileHandler(LOG_FILE_PATH,encoding="utf-8",delay=True)
+_handler.addFilter(RequestIdFilter())
+_handler.setFormatter(JsonFormatter() if LOG_FORMAT=="json" else logging.Formatter(
+    "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - [%(request_id)s] %(message)s"))
 
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
\ No newline at end of file
+    handlers=[_handler],
+    level=os.getenv("LOG_LEVEL","INFO")
+)
@@ -0,0 +1,145 @@
+import time
+from src.components.ContextBuilder import ContextBuilder
+from src.instrumentation import metrics, request_context, current_request_id, log_event
+
+NO_CONTEXT_ANSWER = "No relevant context found to answer the question."
+
+
+def build_rag_prompt(query: str, context: str) -> str:
+    """Build the question-answering prompt sent to the LLM"""
+    return f"""Use the following context to answer the question concisely.
+        Context:
+        {context}
+
+        Question: {query}
+
+        Answer:"""
+
+
+def build_context(results,context_builder=None):
+    """Merge, deduplicate and pack retrieved chunks into the prompt context"""
+    if not results:
+        return ""
+    with metrics.span("context_build"):
+        context,_=(context_builder or ContextBuilder()).build(results)
+    return context
+
+
+def rag_simple(query,retriever,llm,top_k=3,cache=None,context_builder=None):
+    ## every span and log line of this question carries one request id
+    with request_context(current_request_id()),metrics.span("request"):
+        return _rag_simple(query,retriever,llm,top_k,cache,context_builder)
+
+
+def _rag_simple(query,retriever,llm,top_k,cache,context_builder):
+    metrics.increment("requests_total")
+    ## retriever the context
+    with metrics.span("retrieve"):
+        results=retriever.retrieve(query,top_k=top_k)
+    ## overlapping neighbours are merged and duplicates dropped, within a token budget
+    context=build_context(results,context_builder)
+
+    if not context:
+        return NO_CONTEXT_ANSWER
+
+    ## answer from the semantic cache when a near-identical query saw the same context
+    if cache is not None:
+        # The retriever just embedded this query, so this is an embedding cache hit
+        query_embedding=retriever.embedding_manager.generate_embeddings([query])[0]
+        context_ids=[doc['id'] for doc in results]
+        cached_answer=cache.lookup(query_embedding,context_ids)
+        if cached_answer is not None:
+            metrics.increment("answer_cache_hits_total")
+            return cached_answer
+
+    ## generate the answwer using GROQ LLM
+    prompt=build_rag_prompt(query,context)
+
+    with metrics.span("llm"):
+        response=llm.invoke([prompt])
+
+    if cache is not None:
+        cache.store(query_embedding,context_ids,response.content)
+    return response.content
+
+
+def track_stream(tokens, timings=None, start=None):
+    """
+    Pass tokens through, recording time to first token and total time
+
+    Args:
+        tokens: Iterable of text fragments
+        timings: Optional dict receiving 'ttft_s' and 'total_s'
+        start: perf_counter() reference point (defaults to now)
+    """
+    start=time.perf_counter() if start is None else start
+    first=True
+    for token in tokens:
+        if first and timings is not None:
+            timings['ttft_s']=time.perf_counter()-start
+        first=False
+        yield token
+    if timings is not None:
+        timings['total_s']=time.perf_counter()-start
+
+
+async def atrack_stream(tokens, timings=None, start=None):
+    """Async variant of track_stream"""
+    start=time.perf_counter() if start is None else start
+    first=True
+    async for token in tokens:
+        if first and timings is not None:
+            timings['ttft_s']=time.perf_counter()-start
+        first=False
+        yield token
+    if timings is not None:
+        timings['total_s']=time.perf_counter()-start
+
+
+def rag_stream(query,retriever,llm,top_k=3,cache=None,timings=None,context_builder=None):
+    """
+    Streaming variant of rag_simple: yields answer fragments as the LLM produces them
+
+    Timings (retrieval_s, ttft_s, total_s) are measured from the call and
+    written into the optional timings dict as they become known.
+    """
+    start=time.perf_counter()
+    timings=timings if timings is not None else {}
+    # Set only around code that does not yield, since the caller resumes the generator in its own context
+    with request_context(current_request_id()) as request_id:
+        metrics.increment("requests_total")
+        with metrics.span("retrieve"):
+            results=retriever.retrieve(query,top_k=top_k)
+        context=build_context(results,context_builder)
+    timings['retrieval_s']=time.perf_counter()-start
+
+    if not context:
+        yield from track_stream([NO_CONTEXT_ANSWER],timings,start)
+        return
+
+    if cache is not None:
+        query_embedding=retriever.embedding_manager.generate_embeddings([query])[0]
+        context_ids=[doc['id'] for doc in results]
+        cached_answer=cache.lookup(query_embedding,context_ids)
+        if cached_answer is not None:
+            metrics.increment("answer_cache_hits_total")
+            yield from track_stream([cached_answer],timings,start)
+            return
+
+    prompt=build_rag_prompt(query,context)
+    tokens=(chunk.content for chunk in llm.stream([prompt]))
+
+    answer=[]
+    for token in track_stream(tokens,timings,start):
+        answer.append(token)
+        yield token
+
+    llm_s=timings['total_s']-timings['retrieval_s']
+    metrics.observe("llm_seconds",llm_s)
+    metrics.observe("llm_ttft_seconds",timings.get('ttft_s',timings['total_s'])-timings['retrieval_s'])
+    metrics.observe("request_seconds",timings['total_s'])
+    log_event("answered",request_id=request_id,streamed=True,llm_ms=round(llm_s*1000,3),
+              total_ms=round(timings['total_s']*1000,3))
+
+    if cache is not None:
+        cache.store(query_embedding,context_ids,"".join(answer))
@@ -0,0 +1,162 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class ResourceRegistry:
+    """
+    Process-wide registry of expensive, shareable resources
+
+    Each resource (embedding model, vector store, LLM client, ...) is
+    registered as a factory and built on first use, once per process, no
+    matter how many threads or UI sessions ask for it concurrently. Every
+    resource has its own lock, so loading the model does not block a caller
+    that only needs the store.
+
+    Usage:
+        registry.register("embedding_manager", lambda: EmbeddingManager())
+        embedding_manager = registry.get("embedding_manager")
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._resources: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any], replace: bool = False):
+        """
+        Register a factory (a no-op if name is already registered, unless replace is set)
+
+        Args:
+            name: Resource name
+            factory: Zero-argument function building the resource
+            replace: Drop the current factory and any resource it built
+        """
+        with self._lock:
+            if name in self._factories and not replace:
+                return
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._resources.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the resource, building it on first use"""
+        try:
+            return self._resources[name]
+        except KeyError:
+            pass
+        if name not in self._factories:
+            raise KeyError(f"No resource registered under '{name}'")
+
+        with self._locks[name]:
+            # Another thread may have built it while this one waited for the lock
+            if name not in self._resources:
+                self._resources[name] = self._factories[name]()
+            return self._resources[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._resources
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Build resources ahead of the first request and call their warm_up() if they have one
+
+        Args:
+            names: Resources to warm up (all registered ones by default)
+            background: Warm up in a daemon thread instead of blocking
+
+        Returns:
+            The warm-up thread when background is set
+        """
+        names = list(names) if names is not None else list(self._factories)
+
+        def run():
+            for name in names:
+                resource = self.get(name)
+                if callable(getattr(resource, 'warm_up', None)):
+                    resource.warm_up()
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="resource-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def reset(self, name: Optional[str] = None):
+        """Forget built resources (all of them by default) so they are rebuilt on next use"""
+        with self._lock:
+            if name is None:
+                self._resources.clear()
+            else:
+                self._resources.pop(name, None)
+
+
+registry = ResourceRegistry()
+
+
+def register_default_resources(data_dir, llm_model: str = "gemma2-9b-it", token_budget: int = 1500):
+    """
+    Register the RAG application's resources, each built lazily from the environment
+
+    Heavy libraries (torch, sentence_transformers, chromadb, httpx)
+    are imported inside the factories, so registering costs nothing.
+
+    Args:
+        data_dir: Data directory holding the vector store
+        llm_model: Groq chat model name
+        token_budget: Context token budget of the shared ContextBuilder
+    """
+    def embedding_manager():
+        from src.components.EmbeddingManager import EmbeddingManager
+        return EmbeddingManager()
+
+    def vector_store():
+        from src.components.BaseVectorStore import vector_store_from_env
+        from src.components.EmbeddingManager import DEFAULT_MODEL_NAME
+        # A snapshot backend refuses vectors built with a different model than the one embedding queries
+        return vector_store_from_env(data_dir, model_name=DEFAULT_MODEL_NAME)
+
+    def sparse_index():
+        # BM25 index written by ingestion; retrieval falls back to dense-only without it
+        from src.components.SparseIndex import BM25Index
+        index = BM25Index(Path(registry.get("vector_store").persist_directory) / "bm25")
+        return index if len(index) else None
+
+    def page_store():
+        # Full page texts written by parent-retrieval ingestion; chunks carry their own text without it
+        from src.components.PageStore import PageStore
+        directory = Path(registry.get("vector_store").persist_directory) / "pages"
+        if not (directory / "pages.json").exists():
+            return None
+        return PageStore(str(directory)) or None
+
+    def retriever():
+        from src.components.RagRetriever import RAGRetriever
+        # auto_route: questions naming a company/year only search those filings when SHARD_BY is set
+        # RETRIEVAL_MODE=hybrid opts in to BM25 + dense fusion (scores are then RRF, not cosine)
+        return RAGRetriever(registry.get("vector_store"), registry.get("embedding_manager"),
+                            sparse_index=registry.get("sparse_index"), page_store=registry.get("page_store"),
+                            auto_route=True, default_mode=os.getenv("RETRIEVAL_MODE", "dense"))
+
+    def llm():
+        # One pooled, rate-limited gateway per process, shared by every request
+        from src.components.LLMGateway import llm_gateway_from_env
+        return llm_gateway_from_env(llm_model, temperature=0.1, max_tokens=1024)
+
+    def answer_cache():
+        # Near-identical questions over the same retrieved context reuse the previous answer
+        from src.components.SemanticCache import SemanticCache
+        return SemanticCache(threshold=0.95, ttl_seconds=3600)
+
+    def context_builder():
+        from src.components.ContextBuilder import ContextBuilder
+        return ContextBuilder(token_budget=token_budget)
+
+    for name, factory in (("embedding_manager", embedding_manager), ("vector_store", vector_store),
+                          ("sparse_index", sparse_index), ("page_store", page_store), ("retriever", retriever),
+                          ("llm", llm),
+                          ("answer_cache", answer_cache), ("context_builder", context_builder)):
+        registry.register(name, factory)
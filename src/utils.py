@@ -1,7 +1,5 @@
 import os
 import sys
-import dill
-import pandas as pd
 import numpy as np
 import scipy.sparse as sp
 
@@ -13,6 +11,8 @@ def save_object(file_path, obj):
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
 
+        import dill  # only needed for pickled objects, keep it off the import path
+
         with open(file_path, 'wb') as file_obj:
             dill.dump(obj, file_obj)
 
@@ -22,6 +22,8 @@ def save_object(file_path, obj):
     
 def load_object(file_path):
     try:
+        import dill
+
         with open(file_path, 'rb') as file_obj:
             return dill.load(file_obj)
     except Exception as e: